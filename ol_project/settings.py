@@ -11,6 +11,10 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# GeoDjango finds GDAL and GEOS on the library path; set these where they live elsewhere
+GDAL_LIBRARY_PATH = env('GDAL_LIBRARY_PATH')
+GEOS_LIBRARY_PATH = env('GEOS_LIBRARY_PATH')
+
 # Use 'epsg:4326' as projected coordinate system - 'epcg:4326' coordinate system is in meters (Then the buffer distance will be in meters)
 CRS = env('CRS', 'epsg:4326')
 CRS_CARTESIAN = env('CRS_CARTESIAN', 'epsg:3043')
@@ -29,6 +33,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'shapefile_app.middleware.server_timing_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,8 +73,57 @@ TIME_ZONE = 'UTC'
 USE_I18N = True
 USE_TZ = True
 
+# Chunked uploads are assembled under MEDIA_ROOT/uploads/
+MEDIA_ROOT = env('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+# Seconds converting an upload may take: one deadline for all of its layers, which convert in parallel in the geometry pool
+INGEST_TIMEOUT = env('INGEST_TIMEOUT', 600)
+# Seconds a layer export (GeoPackage/Shapefile/GeoParquet/FlatGeobuf) may take to write
+EXPORT_TIMEOUT = env('EXPORT_TIMEOUT', 600)
+# Where layer geometry lives: 'database' (JSON columns) or 'arrow' (memory-mapped files under MEDIA_ROOT/layers/)
+LAYER_STORAGE = env('LAYER_STORAGE', 'database')
+# Processed layers (geometry + spatial index) each process keeps in memory for interactive previews
+FEATURE_CACHE_SIZE = env('FEATURE_CACHE_SIZE', 8)
+# Bytes per chunk the upload page sends
+UPLOAD_CHUNK_SIZE = env('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+# Largest file (bytes) a chunked upload may announce; the disk space is claimed as chunks arrive
+CHUNKED_UPLOAD_MAX_SIZE = env('CHUNKED_UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024)
+# Incomplete chunked uploads older than this many hours are deleted
+UPLOAD_EXPIRY_HOURS = env('UPLOAD_EXPIRY_HOURS', 24)
+
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 #STATICFILES_DIRS = [BASE_DIR / 'staticfiles']
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Process pool for CPU-bound geometry work (merge/cut). 0 runs it inline in the request thread.
+GEOMETRY_WORKERS = env('GEOMETRY_WORKERS', os.cpu_count())
+# Seconds before a geometry task is cancelled
+GEOMETRY_TASK_TIMEOUT = env('GEOMETRY_TASK_TIMEOUT', 60)
+# Most pieces one subdivision (grid cells / equal-area strips) may produce
+SUBDIVIDE_MAX_PARTS = env('SUBDIVIDE_MAX_PARTS', 10000)
+# Default sliver thresholds: area in square metres, thinness ratio 4*pi*area/perimeter^2 (0 disables either)
+SLIVER_MIN_AREA = env('SLIVER_MIN_AREA', 1.0)
+SLIVER_MIN_THINNESS = env('SLIVER_MIN_THINNESS', 0.05)
+# Features per parallel union task of a dissolve
+DISSOLVE_CHUNK_SIZE = env('DISSOLVE_CHUNK_SIZE', 5000)
+# Historical overlays of uploads larger than this many polygons run tile by tile in the pool
+OVERLAY_TILE_SIZE = env('OVERLAY_TILE_SIZE', 2000)
+# Grid size TopoJSON coordinates are quantized to (per axis, over the layer's bounding box)
+TOPOLOGY_QUANTIZATION = env('TOPOLOGY_QUANTIZATION', 1000000)
+
+# Broker for pushing layer edit deltas to browsers (see shapefile_app/events.py)
+SHAPEFILE_EVENT_BROKER = env('SHAPEFILE_EVENT_BROKER', 'shapefile_app.events.InMemoryBroker')
+
+# Request/span logs from shapefile_app.middleware and shapefile_app.instrumentation are
+# one JSON object per line. Set SHAPEFILE_LOG_LEVEL=DEBUG to log every span.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'shapefile_app': {'handlers': ['console'], 'level': env('SHAPEFILE_LOG_LEVEL', 'INFO')},
+    },
+}
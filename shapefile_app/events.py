@@ -0,0 +1,126 @@
+"""
+Per-shapefile event channels for pushing layer edits to open browsers.
+
+Merge and cut publish a compact delta once their save has committed:
+
+    {'type': 'delta', 'layer': 'processed', 'version': 7, 'base_version': 6,
+     'removed': [3, 5], 'added': [<GeoJSON feature>, ...]}
+
+`removed` are feature positions in the base version; the remaining features
+keep their order and `added` are appended after them. ShapefileEventsView
+streams these to the browser as Server-Sent Events.
+
+The broker is chosen with settings.SHAPEFILE_EVENT_BROKER. InMemoryBroker only
+reaches subscribers in the same process, which suits a single ASGI worker;
+multi-process deployments need a broker backed by e.g. Redis pub/sub that
+implements the same publish/subscribe interface.
+"""
+import asyncio
+import functools
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Queue of events for one listener on one channel"""
+
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    async def get(self, timeout=None):
+        """Next event, or None if nothing arrives within `timeout` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def put(self, event):
+        """Queue an event. Must be called on self.loop."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: drop the backlog and tell the client to refetch
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({'type': 'reset'})
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class BaseBroker:
+    def publish(self, channel, event):
+        """Send event (a JSON-serialisable dict) to every subscriber of channel"""
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Return a Subscription; must be called from a running event loop"""
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class InMemoryBroker(BaseBroker):
+    """Single-process broker fanning events out to local asyncio queues"""
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        # Publishers may run in worker threads; hand off to each listener's loop
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # Event loop already closed
+                self.unsubscribe(subscription)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.max_queue)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+
+@functools.lru_cache(maxsize=None)
+def get_broker():
+    broker_path = getattr(settings, 'SHAPEFILE_EVENT_BROKER', 'shapefile_app.events.InMemoryBroker')
+    return import_string(broker_path)()
+
+
+def channel_name(shapefile_id):
+    return f'shapefile.{shapefile_id}'
+
+
+def publish(shapefile_id, event):
+    """Publish an event for a shapefile. Failures are logged, never raised."""
+    try:
+        get_broker().publish(channel_name(shapefile_id), event)
+    except Exception:
+        logger.exception('Could not publish event for shapefile %s', shapefile_id)
+
+
+def subscribe(shapefile_id):
+    return get_broker().subscribe(channel_name(shapefile_id))
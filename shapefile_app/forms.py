@@ -1,11 +1,10 @@
 from django import forms
-from .models import Shapefile
-import os
+from .models import ChunkedUpload, Shapefile
 from django.core.files.uploadedfile import InMemoryUploadedFile
-import zipfile
-import tempfile
-from osgeo import ogr
-import json
+
+from .instrumentation import span
+from .utils import executor
+from .utils.ingest import UPLOAD_EXTENSIONS, convert_upload, layer_features
 
 import logging
 logger = logging.getLogger(__name__)
@@ -13,9 +12,13 @@ logger = logging.getLogger(__name__)
 
 class ShapefileUploadForm(forms.ModelForm):
     shapefile_zip = forms.FileField(
-        label='Shapefile ZIP',
-        help_text='Upload a ZIP file containing .shp, .shx, .dbf, and .prj files'
+        label='Layer file',
+        help_text='A ZIP of shapefiles (.shp, .shx, .dbf, .prj), or a GeoPackage, FlatGeobuf or GeoParquet file',
+        required=False,
+        widget=forms.ClearableFileInput(attrs={'accept': ','.join(UPLOAD_EXTENSIONS)})
     )
+    # Set instead of shapefile_zip when the file was sent in chunks (see ChunkedUploadView)
+    upload_id = forms.UUIDField(required=False, widget=forms.HiddenInput)
 
     class Meta:
         model = Shapefile
@@ -23,125 +26,82 @@ class ShapefileUploadForm(forms.ModelForm):
 
     def clean_shapefile_zip(self):
         zip_file = self.cleaned_data['shapefile_zip']
-        if not zip_file.name.endswith('.zip'):
-            raise forms.ValidationError('Please upload a ZIP file')
+        if zip_file and not zip_file.name.lower().endswith(UPLOAD_EXTENSIONS):
+            raise forms.ValidationError(f'Please upload one of: {", ".join(UPLOAD_EXTENSIONS)}')
         return zip_file
 
     def clean(self):
         cleaned_data = super().clean()
         zip_file = cleaned_data.get('shapefile_zip')
+        upload_id = cleaned_data.get('upload_id')
+        self.chunked_upload = None
+
+        if upload_id and not zip_file:
+            try:
+                self.chunked_upload = ChunkedUpload.objects.get(upload_id=upload_id)
+            except ChunkedUpload.DoesNotExist:
+                raise forms.ValidationError('Upload not found; please upload the file again')
+            if not self.chunked_upload.is_complete:
+                raise forms.ValidationError('Upload is not complete yet')
+            # Convert straight from the assembled file on disk
+            zip_file = self.chunked_upload.path
+        elif not zip_file and not self.errors:
+            raise forms.ValidationError('Please choose a file to upload')
 
         if zip_file:
             try:
-                # Convert shapefile early to validate
-                geojson_data = self.convert_shapefile_to_geojson(zip_file)
-                # Store the converted data for use in save method
-                self.geojson_data = geojson_data
-            except Exception as e:
+                # Every layer in the file, converted and validated in parallel
+                with span('convert'):
+                    self.layers = convert_upload(zip_file)
+            except (ValueError, executor.GeometryTaskError) as e:
                 raise forms.ValidationError(f'Shapefile conversion error: {str(e)}')
+            if all(layer['error'] for layer in self.layers):
+                errors = '; '.join(f"{layer['layer']}: {layer['error']}" for layer in self.layers)
+                raise forms.ValidationError(f'Shapefile conversion error: {errors}')
 
         return cleaned_data
 
     def save(self, commit=True):
+        """Create one Shapefile per converted layer.
+
+        Returns the first; all of them are in self.instances. With several
+        layers each is named '<name> - <layer>'.
+        """
         # Delete previous uploads before saving new one
         Shapefile.delete_previous_uploads()
 
         instance = super().save(commit=False)
-        zip_file = self.cleaned_data['shapefile_zip']
-
-        try:
-            # Extract and convert shapefile to GeoJSON
-            geojson_data = self.convert_shapefile_to_geojson(zip_file)
-            instance.geojson_data = geojson_data
-
-            if commit:
-                instance.save()
-            return instance
-        except Exception as e:
-            raise forms.ValidationError(f'Error converting shapefile: {str(e)}')
-
-    def convert_shapefile_to_geojson(self, zip_file):
-        """Convert uploaded shapefile ZIP to GeoJSON with proper CRS handling"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Extract ZIP file
-            try:
-                with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-                    zip_ref.extractall(temp_dir)
-            except zipfile.BadZipFile:
-                raise forms.ValidationError('Invalid ZIP file')
-
-            # Find .shp file
-            shp_file = None
-            for file in os.listdir(temp_dir):
-                if file.endswith('.shp'):
-                    shp_file = os.path.join(temp_dir, file)
-                    break
-
-            if not shp_file:
-                raise forms.ValidationError('No .shp file found in the ZIP archive')
-
-            # Convert to GeoJSON using GDAL
-            try:
-                driver = ogr.GetDriverByName('ESRI Shapefile')
-                data_source = driver.Open(shp_file, 0)
-
-                if data_source is None:
-                    raise forms.ValidationError('Could not open shapefile. Make sure all required files (.shp, .shx, .dbf) are present.')
-
-                layer = data_source.GetLayer()
-                feature_count = layer.GetFeatureCount()
-
-                if feature_count == 0:
-                    raise forms.ValidationError('Shapefile contains no features')
-
-                # Get spatial reference from shapefile
-                spatial_ref = layer.GetSpatialRef()
-                coord_transform = None
-
-                if spatial_ref:
-                    # Transform to WGS84 (EPSG:4326) if needed
-                    wgs84_ref = ogr.osr.SpatialReference()
-                    wgs84_ref.ImportFromEPSG(4326)
-
-                    if not spatial_ref.IsSame(wgs84_ref):
-                        coord_transform = ogr.osr.CoordinateTransformation(spatial_ref, wgs84_ref)
-
-                # Create GeoJSON structure
-                features = []
-                for feature in layer:
-                    geom = feature.GetGeometryRef()
-                    if geom:
-                        # Transform geometry to WGS84 if needed
-                        if coord_transform:
-                            geom.Transform(coord_transform)
-
-                        geojson_geom = json.loads(geom.ExportToJson())
-                        properties = {}
-                        for i in range(feature.GetFieldCount()):
-                            field_name = feature.GetFieldDefnRef(i).GetName()
-                            properties[field_name] = feature.GetField(i)
-
-                        features.append({
-                            'type': 'Feature',
-                            'geometry': geojson_geom,
-                            'properties': properties
-                        })
-
-                data_source = None
-
-                if not features:
-                    raise forms.ValidationError('No valid geometries found in shapefile')
-
-                return {
-                    'type': 'FeatureCollection',
-                    'crs': {
-                        'type': 'name',
-                        'properties': {
-                            'name': 'EPSG:4326'
-                        }
-                    },
-                    'features': features
-                }
-
-            except Exception as e:
-                raise forms.ValidationError(f'GDAL error: {str(e)}')
+        converted = [layer for layer in self.layers if not layer['error']]
+        base_name = instance.name
+
+        self.instances = []
+        for layer in converted:
+            shapefile = instance if not self.instances else Shapefile()
+            shapefile.name = base_name if len(converted) == 1 else f"{base_name} - {layer['layer']}"
+            # Converted and validated in clean()
+            shapefile.set_original(layer_features(layer))
+            shapefile.validation_report = dict(layer['report'], layer=layer['layer'], timings=layer['timings'])
+            self.instances.append(shapefile)
+
+        if commit:
+            with span('save'):
+                for shapefile in self.instances:
+                    shapefile.save()
+            if self.chunked_upload:
+                self.chunked_upload.delete()
+        return instance
+
+    def layer_summary(self):
+        """One line per layer in the archive: features kept and seconds spent, or why it was skipped"""
+        lines = []
+        for layer in self.layers:
+            if layer['error']:
+                lines.append(f"{layer['layer']}: skipped ({layer['error']})")
+            else:
+                report, timings = layer['report'], layer['timings']
+                lines.append(
+                    f"{layer['layer']}: {report['features_out']} of {report['features_in']} features "
+                    f"({report['repaired']} repaired, {report['dropped']} dropped, {report['non_polygon']} non-polygon) "
+                    f"read {timings['read']:.2f}s, validated {timings['validate']:.2f}s"
+                )
+        return lines
@@ -0,0 +1,103 @@
+"""
+Timed spans for the hot paths, reported as Server-Timing headers, structured
+logs and per-endpoint latency histograms.
+
+    from shapefile_app.instrumentation import span
+
+    with span('to_crs'):
+        gdf = gdf.to_crs(crs)
+
+Spans recorded while ServerTimingMiddleware handles a request are attached to
+that request (they follow sync_to_async into worker threads via contextvars)
+and show up in the browser's network panel. Outside a request they are only
+logged.
+"""
+import bisect
+import contextlib
+import contextvars
+import json
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_request_spans = contextvars.ContextVar('shapefile_request_spans', default=None)
+
+
+@contextlib.contextmanager
+def span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((name, duration_ms))
+        logger.debug('%s', json.dumps({'event': 'span', 'span': name, 'duration_ms': round(duration_ms, 2)}))
+
+
+def start_request():
+    """Begin collecting spans for the current request; returns a token for end_request"""
+    return _request_spans.set([])
+
+
+def end_request(token):
+    """Stop collecting and return the (name, duration_ms) spans recorded"""
+    spans = _request_spans.get() or []
+    _request_spans.reset(token)
+    return spans
+
+
+def server_timing(spans, total_ms=None):
+    """Format spans as a Server-Timing header value, summing repeated names"""
+    totals = {}
+    for name, duration_ms in spans:
+        key = re.sub(r'[^A-Za-z0-9_.-]', '_', name)
+        totals[key] = totals.get(key, 0.0) + duration_ms
+    entries = [f'{name};dur={duration_ms:.1f}' for name, duration_ms in totals.items()]
+    if total_ms is not None:
+        entries.append(f'total;dur={total_ms:.1f}')
+    return ', '.join(entries)
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram with fixed millisecond buckets"""
+    buckets = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, duration_ms):
+        self.counts[bisect.bisect_left(self.buckets, duration_ms)] += 1
+        self.count += 1
+        self.sum_ms += duration_ms
+
+    def as_dict(self):
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            running += count
+            cumulative[str(bound)] = running
+        return {'count': self.count, 'sum_ms': round(self.sum_ms, 2), 'buckets': cumulative}
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def observe_request(endpoint, duration_ms):
+    with _histograms_lock:
+        histogram = _histograms.get(endpoint)
+        if histogram is None:
+            histogram = _histograms[endpoint] = LatencyHistogram()
+        histogram.observe(duration_ms)
+
+
+def latency_snapshot():
+    """Histograms for every endpoint seen by this process"""
+    with _histograms_lock:
+        return {endpoint: histogram.as_dict() for endpoint, histogram in sorted(_histograms.items())}
@@ -0,0 +1,87 @@
+import json
+import statistics
+import threading
+import time
+import urllib.request
+
+from django.core.management.base import BaseCommand
+
+
+def _bbox(geometry):
+    coords = geometry['coordinates']
+    while isinstance(coords[0][0], list):
+        coords = [c for part in coords for c in part]
+    xs = [c[0] for c in coords]
+    ys = [c[1] for c in coords]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure GeoJSON read latency while cuts run concurrently, against a WSGI server '
+        '(sync views) and an ASGI server (async views). Start both first, with one worker each, e.g. '
+        '"gunicorn -w 1 --threads 1 -b :8000 ol_project.wsgi" and '
+        '"uvicorn --port 8001 ol_project.asgi:application". '
+        'Use a scratch database: the editors really cut polygons.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('pk', type=int, help='Shapefile with processed data to read and cut')
+        parser.add_argument('--wsgi-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--asgi-url', default='http://127.0.0.1:8001')
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--editors', type=int, default=1)
+        parser.add_argument('--duration', type=float, default=20.0, help='Seconds per server')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"server":<6} {"reads":>7} {"reads/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"max ms":>8} {"cuts":>6}')
+        for label, base_url in (('WSGI', options['wsgi_url']), ('ASGI', options['asgi_url'] + '/async')):
+            latencies, cuts = self._run(base_url, options)
+            if len(latencies) < 2:
+                self.stdout.write(f'{label:<6} too few reads completed')
+                continue
+            quantiles = statistics.quantiles(latencies, n=20)
+            p50, p95 = quantiles[9], quantiles[18]
+            self.stdout.write(
+                f'{label:<6} {len(latencies):>7} {len(latencies) / options["duration"]:>8.1f} '
+                f'{p50 * 1000:>8.1f} {p95 * 1000:>8.1f} {max(latencies) * 1000:>8.1f} {cuts:>6}'
+            )
+
+    def _run(self, base_url, options):
+        pk = options['pk']
+        read_url = f'{base_url}/shapefile/{pk}/geojson/processed/'
+        cut_url = f'{base_url}/shapefile/{pk}/cut_polygon/'
+        deadline = time.monotonic() + options['duration']
+        latencies = []
+        cuts = []
+        lock = threading.Lock()
+
+        def reader():
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                with urllib.request.urlopen(read_url) as response:
+                    response.read()
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+
+        def editor():
+            while time.monotonic() < deadline:
+                with urllib.request.urlopen(read_url) as response:
+                    features = json.load(response)['features']
+                # Cut feature 0 vertically through the middle of its bbox
+                minx, miny, maxx, maxy = _bbox(features[0]['geometry'])
+                midx = (minx + maxx) / 2
+                body = json.dumps({'feature_id': 0, 'cut_line': [[midx, miny - 1], [midx, maxy + 1]]}).encode()
+                request = urllib.request.Request(cut_url, data=body, headers={'Content-Type': 'application/json'})
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+                with lock:
+                    cuts.append(1)
+
+        threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=editor) for _ in range(options['editors'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, len(cuts)
@@ -0,0 +1,46 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import shapely
+from django.core.management.base import BaseCommand
+
+from shapefile_app.utils import executor
+from shapefile_app.utils.synthetic import grid_polygons
+
+
+class Command(BaseCommand):
+    help = 'Measure geometry pool throughput (unary_union tasks/s) as worker processes are added'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=32, help='Number of union tasks per run')
+        parser.add_argument('--cells', type=int, default=60, help='Each task unions a cells x cells grid')
+        parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+
+    def handle(self, *args, **options):
+        tasks, cells = options['tasks'], options['cells']
+        blocks = [
+            shapely.to_wkb(grid_polygons(cells, cells, origin=(i * cells * 100.0, 0.0)))
+            for i in range(tasks)
+        ]
+        self.stdout.write(f'{tasks} tasks, {cells * cells} polygons each, {os.cpu_count()} cpus')
+
+        start = time.perf_counter()
+        for block in blocks:
+            executor.union_wkb(block)
+        inline = tasks / (time.perf_counter() - start)
+        self.stdout.write(f'{"inline":>8}  {inline:8.1f} tasks/s')
+
+        workers = 1
+        baseline = None
+        while workers <= options['max_workers']:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                # Warm up so process start-up isn't counted
+                list(pool.map(executor.union_wkb, blocks[:workers]))
+                start = time.perf_counter()
+                list(pool.map(executor.union_wkb, blocks))
+                rate = tasks / (time.perf_counter() - start)
+            baseline = baseline or rate
+            self.stdout.write(f'{workers:>8}  {rate:8.1f} tasks/s  x{rate / baseline:.2f}')
+            workers *= 2
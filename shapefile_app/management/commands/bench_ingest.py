@@ -0,0 +1,57 @@
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from shapefile_app.utils import executor
+from shapefile_app.utils.ingest import convert_upload
+from shapefile_app.utils.synthetic import parcels_gdf, shapefile_zip
+
+FORMATS = ['shp', 'gpkg', 'fgb', 'parquet']
+
+
+class Command(BaseCommand):
+    help = (
+        'Time upload ingest (read + validate) of the same synthetic parcel layer written as a '
+        'zipped shapefile, GeoPackage, FlatGeobuf and GeoParquet, in a projected CRS so every '
+        'format is also reprojected. Reports file size and the read/validate split per format.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+        parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS)
+
+    def handle(self, *args, **options):
+        # Start the geometry pool now so worker start-up isn't counted
+        executor.run(abs, 0)
+        self.stdout.write(f'{"parcels":>8} {"format":<8} {"MB":>7} {"read s":>7} {"valid s":>7} {"total s":>8} {"features":>9}')
+        for size in options['sizes']:
+            gdf = parcels_gdf(size).to_crs('epsg:28350')
+            with tempfile.TemporaryDirectory() as temp_dir:
+                for fmt in options['formats']:
+                    path = self._write(gdf, fmt, temp_dir)
+                    start = time.perf_counter()
+                    layer = convert_upload(path)[0]
+                    total = time.perf_counter() - start
+                    megabytes = os.path.getsize(path) / 2**20
+                    if layer['error']:
+                        self.stdout.write(f'{size:>8} {fmt:<8} {megabytes:>7.1f} failed: {layer["error"]}')
+                        continue
+                    self.stdout.write(
+                        f'{size:>8} {fmt:<8} {megabytes:>7.1f} {layer["timings"]["read"]:>7.2f} '
+                        f'{layer["timings"]["validate"]:>7.2f} {total:>8.2f} {layer["report"]["features_out"]:>9}'
+                    )
+
+    def _write(self, gdf, fmt, temp_dir):
+        if fmt == 'shp':
+            path = os.path.join(temp_dir, 'parcels.zip')
+            with open(path, 'wb') as f:
+                f.write(shapefile_zip(gdf).getvalue())
+        elif fmt == 'parquet':
+            path = os.path.join(temp_dir, 'parcels.parquet')
+            gdf.to_parquet(path)
+        else:
+            path = os.path.join(temp_dir, f'parcels.{fmt}')
+            gdf.to_file(path, driver={'gpkg': 'GPKG', 'fgb': 'FlatGeobuf'}[fmt], layer='parcels')
+        return path
@@ -0,0 +1,43 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from shapefile_app.utils import executor
+from shapefile_app.utils.overlay import overlay_geometries, overlay_partitioned
+from shapefile_app.utils.synthetic import grid_polygons
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the historical overlay on synthetic grids: one task inline versus tiled in the '
+        'geometry pool (GEOMETRY_WORKERS processes). The historical layer is a coarser grid '
+        'offset by half a cell, so every source polygon is split.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 40000, 160000],
+                            help='Source polygon counts (rounded to squares)')
+        parser.add_argument('--tile-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        # Start the geometry pool now so worker start-up isn't counted
+        executor.run(abs, 0)
+        self.stdout.write(f'{executor.max_workers()} workers, tile size {options["tile_size"]}')
+        self.stdout.write(f'{"sources":>8} {"hist":>7} {"pieces":>8} {"single s":>9} {"tiled s":>8}')
+        for size in options['sizes']:
+            side = int(np.sqrt(size))
+            source = grid_polygons(side, side, size=10.0)
+            hist = grid_polygons(side // 2 + 1, side // 2 + 1, size=20.0, origin=(-5.0, -5.0))
+
+            start = time.perf_counter()
+            pieces = len(overlay_geometries(source, hist)[0])
+            single = time.perf_counter() - start
+
+            start = time.perf_counter()
+            tiled_pieces = len(overlay_partitioned(source, hist, options['tile_size'])[0])
+            tiled = time.perf_counter() - start
+
+            if tiled_pieces != pieces:
+                self.stderr.write(f'piece count differs: {pieces} single, {tiled_pieces} tiled')
+            self.stdout.write(f'{len(source):>8} {len(hist):>7} {pieces:>8} {single:>9.2f} {tiled:>8.2f}')
@@ -0,0 +1,100 @@
+import contextlib
+import resource
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from shapefile_app.models import Shapefile
+from shapefile_app.utils import executor
+from shapefile_app.utils.ingest import convert_upload, layer_features
+from shapefile_app.utils.synthetic import parcels_gdf, shapefile_zip
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark upload conversion, merge, cut and the GeoJSON endpoints on synthetic '
+        'parcel tessellations. Reports wall time and peak traced memory (Python and NumPy '
+        'allocations, not GEOS/GDAL) per phase; tracing slows JSON-heavy phases, so use '
+        '--no-memory for clean timings. '
+        'Runs inside a transaction that is rolled back, so the database is left untouched.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                            help='Parcel counts to benchmark (e.g. 1000 10000 500000)')
+        parser.add_argument('--no-memory', action='store_true', help='Skip memory tracing')
+
+    def handle(self, *args, **options):
+        self.trace_memory = not options['no_memory']
+        # Start the geometry pool now so worker start-up isn't billed to merge
+        executor.run(abs, 0)
+
+        self.stdout.write(f'{"parcels":>8}  {"phase":<16} {"seconds":>9} {"peak MB":>9}')
+        for size in options['sizes']:
+            self.results = []
+            with transaction.atomic():
+                self._run(size)
+                transaction.set_rollback(True)
+            for phase, seconds, peak in self.results:
+                peak_mb = f'{peak / 2**20:.1f}' if peak is not None else '-'
+                self.stdout.write(f'{size:>8}  {phase:<16} {seconds:>9.3f} {peak_mb:>9}')
+        maxrss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(f'process max RSS {maxrss_mb:.0f} MB')
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = None
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            self.results.append((name, elapsed, peak))
+
+    def _run(self, size):
+        with self.phase('generate'):
+            gdf = parcels_gdf(size)
+        with self.phase('zip shapefile'):
+            zip_file = shapefile_zip(gdf)
+        del gdf
+
+        with self.phase('convert'):
+            features = layer_features(convert_upload(zip_file)[0])
+        with self.phase('save'):
+            shapefile = Shapefile(name=f'bench-{size}')
+            shapefile.set_original(features)
+            shapefile.set_processed(features)
+            shapefile.save()
+        del features
+
+        client = Client(HTTP_HOST='localhost')
+        with self.phase('GET geojson'):
+            client.get(reverse('get_shapefile_geojson', args=[shapefile.pk])).content
+        with self.phase('GET processed'):
+            client.get(reverse('get_shapefile_geojson_processed', args=[shapefile.pk])).content
+
+        # Parcels 0 and 1 are neighbours in the tessellation
+        shapefile = Shapefile.objects.get(pk=shapefile.pk)
+        with self.phase('merge'):
+            success, message = shapefile.merge_selected_polygons(['0', '1'])
+        if not success:
+            self.stderr.write(f'merge failed: {message}')
+
+        # Cut feature 0 vertically through the middle of its bounding box
+        shapefile = Shapefile.objects.get(pk=shapefile.pk)
+        geometry = shapefile.processed_features().geometries[0]
+        minx, miny, maxx, maxy = geometry.bounds
+        midx = (minx + maxx) / 2
+        with self.phase('cut'):
+            success, message = shapefile.cut_polygon(0, [[midx, miny - 0.01], [midx, maxy + 0.01]])
+        if not success:
+            self.stderr.write(f'cut failed: {message}')
@@ -0,0 +1,55 @@
+import time
+
+import geopandas as gpd
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from shapefile_app.utils.render import new_figure
+from shapefile_app.utils.synthetic import parcels_gdf
+
+PALETTE = ['tab:red', 'tab:green', 'tab:orange', 'not-a-colour', None]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time plot_geodataframe (draw + Agg render, no labels) on synthetic parcel layers with a '
+        'colour column, against the old one-GeoDataFrame-per-feature loop for small layers'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[500, 5000, 10000, 50000])
+        parser.add_argument('--legacy-max', type=int, default=500,
+                            help='Largest layer to time with the per-feature loop (it is slow)')
+
+    def handle(self, *args, **options):
+        # plot_canvas pulls in Tk; only needed here
+        from shapefile_app.utils.plot_canvas import plot_geodataframe
+
+        self.stdout.write(f'{"features":>9} {"collection s":>13} {"per-feature s":>14}')
+        for size in options['sizes']:
+            gdf = parcels_gdf(size)
+            gdf['colour'] = np.resize(PALETTE, size)
+
+            fig = new_figure(1000, 1000)
+            start = time.perf_counter()
+            plot_geodataframe(fig.add_subplot(), gdf, 'bench', annotate=False)
+            fig.canvas.draw()
+            collection = time.perf_counter() - start
+
+            legacy = '-'
+            if size <= options['legacy_max']:
+                fig = new_figure(1000, 1000)
+                start = time.perf_counter()
+                self._legacy_plot(fig.add_subplot(), gdf)
+                fig.canvas.draw()
+                legacy = f'{time.perf_counter() - start:.3f}'
+            self.stdout.write(f'{size:>9} {collection:>13.3f} {legacy:>14}')
+
+    @staticmethod
+    def _legacy_plot(ax, gdf):
+        for geometry, color in zip(gdf.geometry, gdf['colour']):
+            temp_gdf = gpd.GeoDataFrame([{'geometry': geometry}], crs=gdf.crs)
+            try:
+                temp_gdf.plot(ax=ax, color=color, alpha=0.7, edgecolor='black', linewidth=0.8)
+            except (ValueError, TypeError):
+                temp_gdf.plot(ax=ax, color='steelblue', alpha=0.7, edgecolor='black', linewidth=0.8)
@@ -0,0 +1,34 @@
+import json
+import os
+
+import geopandas as gpd
+from django.core.management.base import BaseCommand, CommandError
+
+from shapefile_app.models import HistoricalLayer
+
+
+class Command(BaseCommand):
+    help = 'Store a vector file (shapefile, zipped shapefile, GeoJSON, GeoPackage...) as a historical layer for overlays'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--name', help='Layer name (default: file name)')
+        parser.add_argument('--layer', help='Layer to read from multi-layer sources')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist')
+
+        read_kwargs = {'layer': options['layer']} if options['layer'] else {}
+        gdf = gpd.read_file(path, **read_kwargs)
+        if gdf.crs is None:
+            raise CommandError(f'{path} has no CRS')
+        # Stored like uploads: GeoJSON in WGS84, polygons only
+        gdf = gdf[gdf.geom_type.isin(['Polygon', 'MultiPolygon'])].to_crs('epsg:4326')
+
+        layer = HistoricalLayer.objects.create(
+            name=options['name'] or os.path.splitext(os.path.basename(path))[0],
+            geojson_data=json.loads(gdf.to_json()),
+        )
+        self.stdout.write(f'Stored historical layer {layer.pk} "{layer.name}" ({len(gdf)} polygons)')
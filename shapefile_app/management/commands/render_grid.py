@@ -0,0 +1,65 @@
+import os
+
+import geopandas as gpd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from shapefile_app.models import Shapefile
+from shapefile_app.utils.small_multiples import render_grid
+
+
+class Command(BaseCommand):
+    help = (
+        'Render layers side by side on a shared extent and colour mapping, as one PNG or a '
+        'paged PDF (chosen by the output extension). Panels are rendered in the geometry pool. '
+        'Layers come from stored shapefiles (--shapefiles) and/or files geopandas can read (--files), '
+        'in that order.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Output path ending in .png or .pdf')
+        parser.add_argument('--shapefiles', type=int, nargs='*', default=[], help='Shapefile pks')
+        parser.add_argument('--layer', choices=['original', 'processed', 'both'], default='processed',
+                            help='Layer(s) of each stored shapefile to render')
+        parser.add_argument('--files', nargs='*', default=[], help='Vector files to add as panels')
+        parser.add_argument('--cols', type=int, default=4)
+        parser.add_argument('--per-page', type=int, default=None, help='Panels per PDF page')
+        parser.add_argument('--panel-size', default='500x400', help='Panel size in pixels, WxH')
+        parser.add_argument('--colour-by', default=None,
+                            help="Column (or 'index') giving the shared colour categories")
+        parser.add_argument('--no-labels', action='store_true')
+
+    def handle(self, *args, **options):
+        fmt = os.path.splitext(options['output'])[1].lstrip('.').lower()
+        if fmt not in ('png', 'pdf'):
+            raise CommandError('Output must end in .png or .pdf')
+        try:
+            width, height = (int(v) for v in options['panel_size'].lower().split('x'))
+        except ValueError:
+            raise CommandError('--panel-size must look like 500x400')
+
+        gdfs, titles = [], []
+        layers = ['original', 'processed'] if options['layer'] == 'both' else [options['layer']]
+        for pk in options['shapefiles']:
+            try:
+                shapefile = Shapefile.objects.get(pk=pk)
+            except Shapefile.DoesNotExist:
+                raise CommandError(f'Shapefile {pk} does not exist')
+            for layer in layers:
+                gdf = shapefile.gdf_processed() if layer == 'processed' else shapefile.gdf_shp()
+                gdfs.append(gdf)
+                titles.append(f'{shapefile.name} ({layer}): {len(gdf)} polys')
+        for path in options['files']:
+            gdf = gpd.read_file(path).to_crs(settings.CRS_CARTESIAN)
+            gdfs.append(gdf)
+            titles.append(f'{os.path.basename(path)}: {len(gdf)} polys')
+        if not gdfs:
+            raise CommandError('Nothing to render: give --shapefiles and/or --files')
+
+        content = render_grid(
+            gdfs, titles=titles, ncols=options['cols'], panel_size=(width, height), fmt=fmt,
+            per_page=options['per_page'], colour_by=options['colour_by'], annotate=not options['no_labels'],
+        )
+        with open(options['output'], 'wb') as f:
+            f.write(content)
+        self.stdout.write(f'Wrote {len(gdfs)} panels to {options["output"]}')
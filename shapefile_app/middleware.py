@@ -0,0 +1,63 @@
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+
+from . import instrumentation
+
+logger = logging.getLogger('shapefile_app.requests')
+
+# Not worth timing: the metrics endpoint itself and the SSE stream (long-lived)
+UNTIMED_VIEWS = {'metrics', 'shapefile_events'}
+
+
+@sync_and_async_middleware
+def server_timing_middleware(get_response):
+    """Add a Server-Timing header with the request's spans, log it and record its latency"""
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = instrumentation.start_request()
+            start = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                spans = instrumentation.end_request(token)
+            _finish(request, response, spans, start)
+            return response
+
+        markcoroutinefunction(middleware)
+    else:
+        def middleware(request):
+            token = instrumentation.start_request()
+            start = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                spans = instrumentation.end_request(token)
+            _finish(request, response, spans, start)
+            return response
+
+    return middleware
+
+
+def _finish(request, response, spans, start):
+    match = getattr(request, 'resolver_match', None)
+    view_name = match.view_name if match else None
+    if view_name in UNTIMED_VIEWS:
+        return
+
+    total_ms = (time.perf_counter() - start) * 1000
+    endpoint = f'{request.method} {view_name or "unresolved"}'
+    response['Server-Timing'] = instrumentation.server_timing(spans, total_ms)
+    instrumentation.observe_request(endpoint, total_ms)
+    logger.info('%s', json.dumps({
+        'event': 'request',
+        'endpoint': endpoint,
+        'path': request.path,
+        'status': response.status_code,
+        'duration_ms': round(total_ms, 2),
+        'spans': [{'name': name, 'duration_ms': round(duration_ms, 2)} for name, duration_ms in spans],
+    }))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shapefile_app', '0003_shapefile_geojson_data_processed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shapefile',
+            name='processed_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shapefile_app', '0004_shapefile_processed_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricalLayer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('geojson_data', models.JSONField(default=dict)),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
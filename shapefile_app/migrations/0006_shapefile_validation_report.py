@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 00:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shapefile_app', '0005_historicallayer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shapefile',
+            name='validation_report',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='Geometry validation/repair report from upload'),
+        ),
+    ]
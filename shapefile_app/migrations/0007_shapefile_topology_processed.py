@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shapefile_app', '0006_shapefile_validation_report'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shapefile',
+            name='topology_processed',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='Shared-arc topology of the processed layer'),
+        ),
+    ]
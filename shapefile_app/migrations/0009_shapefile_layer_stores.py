@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shapefile_app', '0008_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shapefile',
+            name='original_store',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Arrow file of the uploaded layer (LAYER_STORAGE = arrow)'),
+        ),
+        migrations.AddField(
+            model_name='shapefile',
+            name='processed_store',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Arrow file of the processed layer (LAYER_STORAGE = arrow)'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-19 11:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shapefile_app', '0009_shapefile_layer_stores'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='shapefile',
+            name='topology_processed',
+        ),
+    ]
@@ -1,63 +1,396 @@
+import logging
 import math
+import os
+import uuid
+from datetime import timedelta
 from django.conf import settings
-from django.db import models
-from django.contrib.gis.geos import GEOSGeometry, MultiPolygon, Polygon
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.utils import timezone
 import json
 
+from asgiref.sync import sync_to_async
+import numpy as np
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import shape, Polygon, MultiPolygon, LineString
-from shapely.ops import unary_union
+import shapely
+from shapely.geometry import Polygon, MultiPolygon, LineString
+
+from shapefile_app import events
+from shapefile_app.instrumentation import span
+from shapefile_app.utils import executor, layer_store
+from shapefile_app.utils import feature_store
+from shapefile_app.utils.dissolve import check_request as check_dissolve, dissolve_layer
+from shapefile_app.utils.feature_store import FeatureStore
+from shapefile_app.utils.overlay import overlay_layers
+from shapefile_app.utils.render import render_preview_wkb
+from shapefile_app.utils.slivers import find_slivers, merge_slivers_wkb
+from shapefile_app.utils.subdivide import count_grid_cells, subdivide_wkb
+from shapefile_app.utils.topology import build_topology_wkb, replace_geometries, to_topojson
+from shapefile_app.utils.topology import merge as merge_topology
+from shapefile_app.utils.uploads import chunk_error
+
+logger = logging.getLogger(__name__)
+
+
+def area_m2(geometries):
+    """Areas in square metres (to 0.1) of EPSG:4326 geometries, measured in settings.CRS_GDA94 like the overlay's"""
+    return gpd.GeoSeries(geometries, crs='EPSG:4326').to_crs(settings.CRS_GDA94).area.round(1).to_numpy()
+
+
+class HistoricalLayer(models.Model):
+    """Reference polygons (e.g. past treatments) that uploaded layers are overlaid with"""
+    name = models.CharField(max_length=255)
+    geojson_data = models.JSONField(default=dict)
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+    def gdf(self, crs='epsg:28350'):
+        with span('parse'):
+            gdf = gpd.read_file(json.dumps(self.geojson_data))
+        with span('to_crs'):
+            return gdf.to_crs(crs)
+
+
+class ChunkedUpload(models.Model):
+    """A large upload sent in Content-Range chunks and assembled on disk.
+
+    `received` is the length of the contiguous prefix written so far; a
+    client that lost its connection resumes from there.
+    """
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    filename = models.CharField(max_length=255)
+    total_size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f'{self.filename} ({self.received}/{self.total_size})'
+
+    @property
+    def path(self):
+        # Keeps the extension: it tells the ingest which reader to use
+        extension = os.path.splitext(self.filename)[1].lower()
+        return os.path.join(settings.MEDIA_ROOT, 'uploads', f'{self.upload_id}{extension}')
+
+    @property
+    def is_complete(self):
+        return self.completed_at is not None
+
+    def create_file(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'wb'):
+            pass
+
+    def write_chunk(self, stream, start, end, block_size=1024 * 1024):
+        """Copy bytes start..end (inclusive) from a readable stream into the file.
+
+        The chunk may overlap what was already received (a retried chunk) but
+        may not leave a gap. Returns (success, message).
+        """
+        error = chunk_error(start, end, self.received, self.total_size)
+        if error:
+            return False, error
+
+        remaining = end - start + 1
+        with open(self.path, 'r+b') as f:
+            f.seek(start)
+            while remaining:
+                block = stream.read(min(block_size, remaining))
+                if not block:
+                    break
+                f.write(block)
+                remaining -= len(block)
+        if remaining:
+            # Connection dropped mid-chunk: the client resends it from `received`
+            return False, f"Chunk ended {remaining} bytes early"
+
+        # Concurrent chunks only ever move the offset forward, and only from
+        # an offset at or past `start`: checked and moved in one UPDATE
+        moved = ChunkedUpload.objects.filter(pk=self.pk, received__gte=start).update(
+            received=Greatest(F('received'), end + 1)
+        )
+        self.refresh_from_db(fields=['received', 'completed_at'])
+        if not moved:
+            return False, chunk_error(start, end, self.received, self.total_size)
+        if self.received == self.total_size and not self.is_complete:
+            ChunkedUpload.objects.filter(pk=self.pk, completed_at__isnull=True).update(completed_at=timezone.now())
+            self.refresh_from_db(fields=['completed_at'])
+        return True, f"Received {self.received} of {self.total_size} bytes"
+
+    def delete(self, *args, **kwargs):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        return super().delete(*args, **kwargs)
+
+    @classmethod
+    def delete_stale(cls):
+        """Delete uploads (and their files) not completed within UPLOAD_EXPIRY_HOURS"""
+        cutoff = timezone.now() - timedelta(hours=settings.UPLOAD_EXPIRY_HOURS)
+        for upload in cls.objects.filter(created_at__lt=cutoff):
+            upload.delete()
 
-from shapefile_app.utils.plot_utils import plot_gdf, plot_multi, plot_overlay
 
 class Shapefile(models.Model):
     name = models.CharField(max_length=255)
     geojson_data = models.JSONField(default=dict)
     geojson_data_processed = models.JSONField('Source Polygon intersected with hist and split (multi) polygon geometry', blank=True, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    processed_version = models.PositiveIntegerField(default=0, editable=False)
+    validation_report = models.JSONField('Geometry validation/repair report from upload', blank=True, null=True, editable=False)
+    original_store = models.CharField('Arrow file of the uploaded layer (LAYER_STORAGE = arrow)', max_length=255, blank=True, editable=False)
+    processed_store = models.CharField('Arrow file of the processed layer (LAYER_STORAGE = arrow)', max_length=255, blank=True, editable=False)
+
+    # Set when the last edit was refused because another edit saved first
+    edit_conflict = False
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """Layers given to set_original()/set_processed() in arrow mode are written to their files first"""
+        pending = getattr(self, '_pending_layers', None)
+        if not pending:
+            return super().save(*args, **kwargs)
+
+        created = self.pk is None
+        if created:
+            # Files are stored under the primary key
+            super().save(*args, **kwargs)
+        replaced = {layer: getattr(self, f'{layer}_store') for layer in pending}
+        with span('store'):
+            for layer in pending:
+                version = self.processed_version if layer == 'processed' else 0
+                setattr(self, f'{layer}_store', layer_store.write_store(self.pk, layer, version, self._layer_features[layer]))
+        stores = {f'{layer}_store': getattr(self, f'{layer}_store') for layer in pending}
+        self._pending_layers = set()
+        if created:
+            Shapefile.objects.filter(pk=self.pk).update(**stores)
+        else:
+            super().save(*args, **kwargs)
+        for layer in pending:
+            path = getattr(self, f'{layer}_store')
+            transaction.on_commit(lambda layer=layer, path=path: layer_store.prune(self.pk, layer, path, replaced[layer]))
+
+    def set_original(self, data):
+        """Replace the uploaded layer with a FeatureCollection or a FeatureStore (kept in its own file in arrow mode)"""
+        self._set_layer('original', data)
+
+    def set_processed(self, data):
+        """Replace the processed layer with a FeatureCollection or a FeatureStore (kept in its own file in arrow mode)"""
+        self._set_layer('processed', data)
+
+    def _set_layer(self, layer, data):
+        field = 'geojson_data' if layer == 'original' else 'geojson_data_processed'
+        features = data if isinstance(data, FeatureStore) else None
+        if layer_store.enabled():
+            if features is None:
+                features = FeatureStore.from_feature_collection(data)
+            self._pending_layers = (getattr(self, '_pending_layers', None) or set()) | {layer}
+            setattr(self, field, {} if layer == 'original' else None)
+        else:
+            # The database keeps GeoJSON
+            setattr(self, field, data if features is None else features.to_feature_collection())
+            setattr(self, f'{layer}_store', '')
+        self.__dict__.setdefault('_layer_features', {})[layer] = features
+
+    def _pending_layer(self, layer):
+        return layer in (getattr(self, '_pending_layers', None) or ())
+
+    def _store_path(self, layer):
+        """Stored file of a layer, unless a replacement is waiting to be saved"""
+        if self._pending_layer(layer):
+            return None
+        return getattr(self, f'{layer}_store') or None
+
+    @property
+    def has_processed_data(self):
+        return self._pending_layer('processed') or bool(self.processed_store) or self.geojson_data_processed is not None
+
+    def layer_features(self, layer='original'):
+        """A layer as a FeatureStore, read once per instance (None if there is no processed layer)"""
+        cache = self.__dict__.setdefault('_layer_features', {})
+        if cache.get(layer) is None:
+            if getattr(self, f'{layer}_store'):
+                with span('store_read'):
+                    cache[layer] = self._read_store(layer, layer_store.read_store)
+            else:
+                data = self.get_geojson_feature_collection() if layer == 'original' else self.get_processed_geojson_feature_collection()
+                if not data:
+                    return None
+                with span('from_features'):
+                    cache[layer] = FeatureStore.from_feature_collection(data)
+        return cache[layer]
+
+    def processed_features(self):
+        return self.layer_features('processed')
+
+    def layer_geojson_text(self, layer='original'):
+        """FeatureCollection text straight from the layer's file, or None if the layer is kept in the database"""
+        if self._store_path(layer) is None:
+            return None
+        with span('store_read'):
+            return self._read_store(layer, layer_store.geojson_text)
+
+    def _read_store(self, layer, read):
+        """read(path) of a layer's file. Edits keep only the current and previous
+        files, so a reader whose pointer is older than that moves on to the
+        current version."""
+        try:
+            return read(getattr(self, f'{layer}_store'))
+        except FileNotFoundError:
+            self.refresh_from_db(fields=[f'{layer}_store', 'processed_version'])
+            return read(getattr(self, f'{layer}_store'))
+
     def gdf_shp(self, crs='epsg:28350'):
-        return  gpd.read_file(json.dumps(self.geojson_data)).to_crs(crs)
+        with span('parse'):
+            gdf = self.layer_features('original').to_gdf()
+        with span('to_crs'):
+            return gdf.to_crs(crs)
 
     def gdf_processed(self, crs='epsg:28350'):
-        return  gpd.read_file(json.dumps(self.geojson_data_processed)).to_crs(crs)
+        with span('parse'):
+            gdf = self.processed_features().to_gdf()
+        with span('to_crs'):
+            return gdf.to_crs(crs)
+
+    def _stored_feature_collection(self, layer):
+        features = self.__dict__.get('_layer_features', {}).get(layer)
+        if features is not None:
+            return features.to_feature_collection()
+        return self._read_store(layer, layer_store.feature_collection)
 
     def get_geojson_feature_collection(self):
         """Return GeoJSON data as a FeatureCollection"""
+        if self._pending_layer('original') or self.original_store:
+            return self._stored_feature_collection('original')
         if isinstance(self.geojson_data, str):
             return json.loads(self.geojson_data)
         return self.geojson_data
 
     def get_processed_geojson_feature_collection(self):
         """Return processed GeoJSON data as a FeatureCollection"""
+        if self._pending_layer('processed') or self.processed_store:
+            return self._stored_feature_collection('processed')
         if not self.geojson_data_processed:
             return None
         if isinstance(self.geojson_data_processed, str):
             return json.loads(self.geojson_data_processed)
         return self.geojson_data_processed
 
+    def processed_topology(self):
+        """Shared-arc topology of the processed layer (see utils/topology.py).
+
+        Derived data, so it is not stored with the layer: it lives in the cache
+        under the layer version, put there by the edit that produced the
+        version or built from the features on first use.
+        """
+        key = self._topology_key(self.processed_version)
+        topology = cache.get(key)
+        if topology is not None:
+            return topology
+        features = self.processed_features()
+        if features is None:
+            return None
+        with span('topology'):
+            topology = executor.run(build_topology_wkb, features.to_wkb())
+        cache.set(key, topology, timeout=None)
+        return topology
+
+    def _topology_key(self, version):
+        # Keyed by upload time too: primary keys can be reused after deletes
+        return f'shapefile-topology:{self.pk}:{int(self.uploaded_at.timestamp())}:{version}'
+
+    def get_processed_topojson(self):
+        """Processed layer as TopoJSON: shared arcs, quantized and delta-encoded.
+
+        None if there is no processed layer, or if it holds points or lines:
+        the topology is built from polygons only and would drop them.
+        """
+        features = self.processed_features()
+        if features is None or not features.is_polygonal():
+            return None
+        topology = self.processed_topology()
+        properties = features.records()
+        with span('to_topojson'):
+            return to_topojson(topology, properties, name='processed', quantization=settings.TOPOLOGY_QUANTIZATION)
+
+    def content_version(self, layer='original'):
+        """Token that changes whenever the layer's geometry changes (for cache keys)"""
+        if layer == 'processed':
+            return f'p{self.processed_version}'
+        return f'o{int(self.uploaded_at.timestamp())}'
+
+    def render_preview(self, layer='original', width=400, height=400, fmt='png'):
+        """Thumbnail image bytes of a layer, rendered in the geometry pool"""
+        gdf = self.gdf_processed(crs=settings.CRS_GDA94) if layer == 'processed' else self.gdf_shp(crs=settings.CRS_GDA94)
+        with span('render'):
+            return executor.run(render_preview_wkb, shapely.to_wkb(gdf.geometry.values), None, width, height, fmt)
+
+    def overlay_historical(self, historical_layer, min_area=1.0):
+        """Split the uploaded polygons by a historical layer into geojson_data_processed"""
+        try:
+            gdf_source = self.gdf_shp(crs=settings.CRS_GDA94)
+            gdf_hist = historical_layer.gdf(crs=settings.CRS_GDA94)
+            if gdf_source.empty:
+                return False, "No source data available for the overlay"
+
+            with span('overlay'):
+                gdf = overlay_layers(gdf_source, gdf_hist, min_area=min_area)
+            gdf['hist_layer'] = historical_layer.name
+            gdf = gdf.to_crs('epsg:4326')
+            self.set_processed(FeatureStore.from_gdf(gdf))
+            # Rebuilt from the new layer when next needed
+            self._next_topology = None
+
+            # Whole layer replaced: listeners reload it
+            self._edit_delta = None
+            n_cut = int((gdf['origin'] == 'CUT').sum())
+            return self._commit_processed(
+                f"Overlay with '{historical_layer.name}' produced {len(gdf)} polygons ({n_cut} intersecting historical polygons)"
+            )
+
+        except executor.GeometryTaskError as e:
+            return False, f"Error running overlay: {str(e)}"
+        except Exception as e:
+            logger.exception("Overlay failed for shapefile %s", self.pk)
+            return False, f"Error running overlay: {str(e)}"
+
     @classmethod
     def delete_previous_uploads(cls):
         """Delete all previously uploaded shapefiles"""
+        for pk in cls.objects.values_list('pk', flat=True):
+            layer_store.delete(pk)
         cls.objects.all().delete()
 
     def merge_selected_polygons(self, selected_feature_ids):
         """Merge selected polygons from processed data using GeoPandas"""
+        success, message = self._compute_merge(selected_feature_ids)
+        if success:
+            success, message = self._commit_processed(message)
+        return success, message
+
+    async def amerge_selected_polygons(self, selected_feature_ids):
+        """Async merge_selected_polygons: geometry work runs off the event loop"""
+        success, message = await sync_to_async(self._compute_merge, thread_sensitive=False)(selected_feature_ids)
+        if success:
+            success, message = await self._acommit_processed(message)
+        return success, message
+
+    def _compute_merge(self, selected_feature_ids):
+        """Merge selected polygons into geojson_data_processed without saving"""
         try:
-            source_data = self.get_processed_geojson_feature_collection()
             source_field = 'processed'
 
-            if not source_data or 'features' not in source_data:
+            features = self.processed_features()
+            if features is None:
                 return False, "No source data available for merging"
 
-            # Convert to GeoDataFrame
-            gdf = gpd.GeoDataFrame.from_features(source_data['features'])
-
             # Filter selected features
             selected_indices = [int(idx) for idx in selected_feature_ids if idx.isdigit()]
 
@@ -65,19 +398,34 @@ class Shapefile(models.Model):
                 return False, "Please select at least 2 polygons to merge"
 
             # Check if all selected indices are valid
-            valid_indices = [idx for idx in selected_indices if idx < len(gdf)]
+            valid_indices = [idx for idx in selected_indices if idx < len(features)]
             if len(valid_indices) < 2:
                 return False, "Invalid polygon indices selected"
 
-            selected_gdf = gdf.iloc[valid_indices].copy()
-            remaining_gdf = gdf.drop(valid_indices)
+            selected_gdf = gpd.GeoDataFrame(geometry=features.geometries[valid_indices])
 
-            # Check if polygons are adjacent/touching using GeoPandas
-            if not self._are_polygons_adjacent_geopandas(selected_gdf):
-                return False, "Selected polygons are not adjacent/touching"
+            # Shared-arc merge: drop the arcs the selected polygons share, so the
+            # outline is made of the same arcs as its neighbours' (no gaps)
+            with span('topology_merge'):
+                topology = self.processed_topology()
+                merged_geometry, merged_polygons = merge_topology(topology, valid_indices)
+
+            if isinstance(merged_geometry, Polygon) and merged_geometry.is_valid:
+                self._next_topology = replace_geometries(topology, valid_indices, [merged_polygons])
+            else:
+                # Not adjacent, or edges not shared vertex for vertex: union instead
+                # Union once in the geometry pool; adjacency check and merge share it
+                with span('union'):
+                    combined_geometry = executor.unary_union(selected_gdf.geometry)
 
-            # Merge polygons using GeoPandas
-            merged_geometry = self._merge_polygons_geopandas(selected_gdf)
+                # Check if polygons are adjacent/touching using GeoPandas
+                if not self._are_polygons_adjacent_geopandas(selected_gdf, combined_geometry):
+                    return False, "Selected polygons are not adjacent/touching"
+
+                # Merge polygons using GeoPandas
+                merged_geometry = self._merge_polygons_geopandas(selected_gdf, combined_geometry)
+                # Rebuilt from the merged layer when next needed
+                self._next_topology = None
 
             if merged_geometry is None or merged_geometry.is_empty:
                 return False, "Failed to merge polygons - resulting geometry is empty"
@@ -96,43 +444,27 @@ class Shapefile(models.Model):
                 }
             }
 
-            # Convert remaining features back to GeoJSON features
-            remaining_features = []
-            for idx, row in remaining_gdf.iterrows():
-                feature = {
-                    'type': 'Feature',
-                    'geometry': row.geometry.__geo_interface__,
-                    'properties': row.drop('geometry').to_dict()
-                }
-                remaining_features.append(feature)
-
-            # Add the merged feature
-            remaining_features.append(merged_feature)
-
-            # Create new processed data
-            processed_data = {
-                'type': 'FeatureCollection',
-                'features': remaining_features
-            }
-
-            # Save to processed field
-            self.geojson_data_processed = processed_data
-            self.save()
+            # Remaining features keep their order; the merged one goes last
+            with span('replace'):
+                self.set_processed(features.replace(valid_indices, [merged_geometry], [merged_feature['properties']]))
+            self._edit_delta = {'removed': sorted(valid_indices), 'added': [merged_feature]}
 
             return True, f"Successfully merged polygons {selected_feature_ids} (Area: {merged_feature['properties']['area_sq_km']} sq km)"
 
+        except executor.GeometryTaskError as e:
+            return False, f"Error merging polygons: {str(e)}"
         except Exception as e:
-            print(f"GeoPandas merge error: {e}")
-            # Fallback to GEOS method if GeoPandas fails
-            #return self._merge_selected_polygons_fallback(selected_feature_ids)
+            logger.exception("Merge failed for shapefile %s", self.pk)
+            return False, f"Error merging polygons: {str(e)}"
 
-    def _are_polygons_adjacent_geopandas(self, gdf):
+    def _are_polygons_adjacent_geopandas(self, gdf, combined_geometry=None):
         """Check if polygons are adjacent/touching using GeoPandas spatial operations"""
         if len(gdf) < 2:
             return False
 
         # Create a union of all geometries to check connectivity
-        combined_geometry = gdf.unary_union
+        if combined_geometry is None:
+            combined_geometry = executor.unary_union(gdf.geometry)
 
         # If the union is a single polygon (not multi), they are connected
         if isinstance(combined_geometry, (Polygon)):
@@ -149,369 +481,459 @@ class Shapefile(models.Model):
 
         return False
 
-    def _merge_polygons_geopandas(self, gdf):
+    def _merge_polygons_geopandas(self, gdf, merged_geometry=None):
         """Merge multiple polygons into one using GeoPandas"""
         try:
             # Use unary_union for robust merging
-            merged_geometry = gdf.unary_union
+            if merged_geometry is None:
+                merged_geometry = executor.unary_union(gdf.geometry)
+
+            # Layers repaired at upload are valid, and so is the union of valid polygons
+            if self.validation_report is not None:
+                return merged_geometry
 
             # Ensure we have a valid geometry
             if merged_geometry.is_valid:
                 return merged_geometry
             else:
                 # Try to fix invalid geometry
-                merged_geometry = merged_geometry.buffer(0)
+                merged_geometry = executor.buffer0(merged_geometry)
                 if merged_geometry.is_valid:
                     return merged_geometry
                 else:
                     return None
 
-        except Exception as e:
-            print(f"GeoPandas merge error: {e}")
+        except executor.GeometryTaskError:
+            raise
+        except Exception:
+            logger.exception("Merging polygons failed for shapefile %s", self.pk)
             return None
 
     def cut_polygon(self, feature_id, cut_line):
         """Cut a polygon using a line segment - with better error handling"""
-        try:
-            import geopandas as gpd
-            from shapely.geometry import Polygon, LineString
-            from shapely.ops import split
-            import json
-
-            source_data = self.get_processed_geojson_feature_collection()
-
-            if not source_data or 'features' not in source_data:
-                return False, "No source data available for cutting"
-
-            # Validate cut line
-            if len(cut_line) < 2:
-                return False, "Cut line must have at least 2 points"
-            linestring = LineString(cut_line)
-            gdf = self.gdf_processed(crs=settings.CRS)
-
-            # Get the feature to cut
-            feature_idx = int(feature_id)
-            if feature_idx >= len(gdf):
-                return False, f"Invalid feature ID: {feature_id}"
-
-            #target_feature = gdf.iloc[feature_idx]
-            #target_geometry = target_feature.geometry
-
-            #cut_line = [[115.9108077401263, -34.15361264163583], [115.9148041754924, -34.15477445913835]]
-            gdf_single = gdf.iloc[[feature_idx]]
-            #gdf_excl_single = gpd.overlay(gdf_single, gdf, how='symmetric_difference')
-            gdf_excl_single = gdf.drop(feature_idx)
-
-            polygon_single = gdf_single.iloc[0].geometry
-            split_result = split(polygon_single, linestring)
-            partitioned_polygons = list(split_result.geoms)
-            gdf_partitioned = gpd.GeoDataFrame(geometry=partitioned_polygons)
-            gdf_partitioned.set_crs(gdf.crs, inplace=True)
-            #plot_gdf(gdf_partitioned)
-
-            # Debug: print what we got from the split
-            if len(gdf_partitioned) < 2:
-                return False, f"Cut operation produced only {len(gdf_partitioned)} valid polygon(s)."
-
-            print(f"Split produced {len(gdf_partitioned)} geometries:")
-            print(gdf_partitioned)
-
-            for idx, row in gdf_partitioned.iterrows():
-                row['cut_part'] = idx + 1
-                row['original_feature'] = feature_id
-                row['area'] = round(row.geometry.area, 2)
-
-            # Save to processed field
-            #self.geojson_data_processed = processed_data
-            #import ipdb; ipdb.set_trace()
-            gdf_rejoin = gpd.GeoDataFrame(pd.concat([gdf_partitioned, gdf_excl_single], ignore_index=True))
-            gdf_rejoin.reset_index(drop=True, inplace=True)
-            gdf_rejoin['id'] = gdf_rejoin.index
-            self.geojson_data_processed = json.loads(gdf_rejoin.set_crs(settings.CRS).to_json())
-            self.save()
-
-            return True, f"Successfully cut polygon {feature_id} into {len(gdf_partitioned)} parts)"
-
-        except Exception as e:
-            import traceback
-            print(f"Cut polygon error: {e}")
-            print(traceback.format_exc())
-            return False, f"Error cutting polygon: {str(e)}"
+        success, message = self._compute_cut(feature_id, cut_line)
+        if success:
+            success, message = self._commit_processed(message)
+        return success, message
+
+    async def acut_polygon(self, feature_id, cut_line):
+        """Async cut_polygon: geometry work runs off the event loop"""
+        success, message = await sync_to_async(self._compute_cut, thread_sensitive=False)(feature_id, cut_line)
+        if success:
+            success, message = await self._acommit_processed(message)
+        return success, message
+
+    @staticmethod
+    def _cut_pieces(features, feature_idx, cut_line):
+        """Pieces (EPSG:4326) feature `feature_idx` splits into along a line in settings.CRS.
+
+        Returns (pieces, None), or (None, reason) when the cut can't be made.
+        """
+        # Validate cut line
+        if len(cut_line) < 2:
+            return None, "Cut line must have at least 2 points"
+        linestring = LineString(cut_line)
+        if not 0 <= feature_idx < len(features):
+            return None, f"Invalid feature ID: {feature_idx}"
+
+        polygon = features.geometries[feature_idx]
+        reproject = settings.CRS.lower() != 'epsg:4326'
+        if reproject:
+            polygon = gpd.GeoSeries([polygon], crs='EPSG:4326').to_crs(settings.CRS).iloc[0]
+        with span('split'):
+            pieces = executor.split(polygon, linestring)
+        if len(pieces) < 2:
+            return None, f"Cut operation produced only {len(pieces)} valid polygon(s)."
+        if reproject:
+            pieces = list(gpd.GeoSeries(pieces, crs=settings.CRS).to_crs('EPSG:4326'))
+        return pieces, None
 
+    @classmethod
+    def cached_processed_features(cls, pk):
+        """(processed_version, FeatureStore or None) from the per-process cache; a hit costs one small query"""
+        version, uploaded_at = cls.objects.values_list('processed_version', 'uploaded_at').get(pk=pk)
+        features = feature_store.cache_get((pk, uploaded_at, version))
+        if features is None:
+            shapefile = cls.objects.get(pk=pk)
+            version, features = shapefile.processed_version, shapefile.processed_features()
+            if features is not None:
+                shapefile._cache_processed_features()
+        return version, features
 
-    def _cut_polygon(self, feature_id, cut_line):
-        """Cut a polygon using a line segment - with better error handling"""
+    @classmethod
+    def preview_cut(cls, pk, feature_id, cut_line):
+        """Dry run of cut_polygon on the cached layer: (success, message, version, pieces). Nothing is saved.
+
+        pieces is a FeatureStore of the would-be parts, each with its area
+        in square metres (see area_m2).
+        """
+        version, features = cls.cached_processed_features(pk)
+        if features is None:
+            return False, "No source data available for cutting", version, None
+        feature_idx = int(feature_id)
+        if 0 <= feature_idx < len(features) and len(cut_line) >= 2:
+            # The cached spatial index rejects lines nowhere near the polygon without splitting
+            line = LineString(cut_line)
+            if settings.CRS.lower() != 'epsg:4326':
+                line = gpd.GeoSeries([line], crs=settings.CRS).to_crs('EPSG:4326').iloc[0]
+            if feature_idx not in features.tree.query(line, predicate='intersects'):
+                return False, f"Cut line does not cross polygon {feature_idx}", version, None
         try:
-            import geopandas as gpd
-            from shapely.geometry import Polygon, LineString
-            from shapely.ops import split
-            import json
-
-            # Use processed data as source, fallback to original
-            if self.geojson_data_processed:
-                source_data = self.get_processed_geojson_feature_collection()
-            else:
-                source_data = self.get_geojson_feature_collection()
-
-            if not source_data or 'features' not in source_data:
+            pieces, error = cls._cut_pieces(features, feature_idx, cut_line)
+        except executor.GeometryTaskError as e:
+            return False, f"Error cutting polygon: {str(e)}", version, None
+        if error:
+            return False, error, version, None
+        records = [{'part': i + 1, 'area_m2': float(area)} for i, area in enumerate(area_m2(pieces))]
+        return True, f"Cut would produce {len(pieces)} parts", version, FeatureStore.from_records(pieces, records)
+
+    def _commit_processed(self, message):
+        """Save an edit of the processed layer as the next version and broadcast its delta once committed.
+
+        Returns (success, message): an edit computed from a version that
+        another edit has already replaced is not saved.
+        """
+        base_version = self.processed_version
+        self.processed_version = base_version + 1
+        # Edits that patch the topology leave it for the version they produce
+        topology = self.__dict__.pop('_next_topology', None)
+        with span('save'):
+            saved = self._save_edit(base_version)
+        if not saved:
+            current = Shapefile.objects.filter(pk=self.pk).values_list('processed_version', flat=True).first()
+            self._reload()
+            self.edit_conflict = True
+            return False, f"The layer was changed by another edit (now version {current}); reload it and try again"
+        event = self._edit_event()
+        transaction.on_commit(lambda: events.publish(self.pk, event))
+        transaction.on_commit(self._cache_processed_features)
+        if topology is not None:
+            key = self._topology_key(self.processed_version)
+            transaction.on_commit(lambda: cache.set(key, topology, timeout=None))
+        return True, message
+
+    async def _acommit_processed(self, message):
+        # Async ORM runs in autocommit, so on_commit callbacks run right away
+        return await sync_to_async(self._commit_processed)(message)
+
+    def _save_edit(self, base_version):
+        """Write the edited processed layer if the row is still at base_version; False if it is not.
+
+        The version check and the write are one conditional UPDATE, so of two
+        edits computed from the same version only the first is saved.
+        """
+        fields = {
+            'processed_version': self.processed_version,
+            'geojson_data_processed': self.geojson_data_processed,
+            'processed_store': self.processed_store,
+        }
+        if self._pending_layer('processed'):
+            with span('store'):
+                fields['processed_store'] = layer_store.write_store(
+                    self.pk, 'processed', self.processed_version, self._layer_features['processed'])
+        updated = Shapefile.objects.filter(pk=self.pk, processed_version=base_version).update(**fields)
+        if not updated:
+            if fields['processed_store'] != self.processed_store:
+                layer_store.discard(fields['processed_store'])
+            return False
+        if self._pending_layer('processed'):
+            path, replaced = fields['processed_store'], self.processed_store
+            self.processed_store = path
+            self._pending_layers.discard('processed')
+            transaction.on_commit(lambda: layer_store.prune(self.pk, 'processed', path, replaced))
+        return True
+
+    def _reload(self):
+        """Drop unsaved layer changes and read the row again"""
+        self._pending_layers = set()
+        self.__dict__.pop('_layer_features', None)
+        self.refresh_from_db()
+
+    def _cache_processed_features(self):
+        """The edited layer is already in memory: keep it for previews of the next edit"""
+        features = self.__dict__.get('_layer_features', {}).get('processed')
+        if features is not None:
+            # Keyed by upload time too: primary keys can be reused after deletes
+            feature_store.cache_put((self.pk, self.uploaded_at, self.processed_version), features)
+
+    def _edit_event(self):
+        """Delta for the last edit: positions removed, features appended at the end.
+
+        An edit that sets _edit_delta to None replaced the whole layer and is
+        sent as a reset.
+        """
+        delta = getattr(self, '_edit_delta', None)
+        if delta is None:
+            return {'type': 'reset', 'layer': 'processed', 'version': self.processed_version}
+        return {
+            'type': 'delta',
+            'layer': 'processed',
+            'version': self.processed_version,
+            'base_version': self.processed_version - 1,
+            'removed': delta['removed'],
+            'added': delta['added'],
+        }
+
+    def _compute_cut(self, feature_id, cut_line):
+        """Cut a polygon into geojson_data_processed without saving"""
+        try:
+            features = self.processed_features()
+            if features is None:
                 return False, "No source data available for cutting"
 
-            # Convert to GeoDataFrame
-            gdf = gpd.GeoDataFrame.from_features(source_data['features'])
-
-            # Get the feature to cut
             feature_idx = int(feature_id)
-            if feature_idx >= len(gdf):
-                return False, f"Invalid feature ID: {feature_id}"
-
-            target_feature = gdf.iloc[feature_idx]
-            target_geometry = target_feature.geometry
-
-            # Validate cut line
-            if len(cut_line) < 2:
-                return False, "Cut line must have at least 2 points"
-
-            # Create LineString from cut points
-            cut_line_geom = LineString(cut_line)
-
-            # Ensure geometries are valid
-            target_geometry = target_geometry.buffer(0)
-            if not target_geometry.is_valid or target_geometry.is_empty:
-                return False, "Target polygon geometry is invalid or empty"
-
-            # Extend line to ensure it cuts completely through the polygon
-            extended_line = self._create_cutting_line(target_geometry, cut_line_geom)
-
-            # Perform the split operation
-            result = split(target_geometry, extended_line)
-
-            # Check if split was successful
-            if result.is_empty:
-                return False, "Cut line does not intersect the polygon properly"
-
-            # Extract ALL geometries from the result, not just Polygons
-            partitioned_geometries = []
-            for geom in result.geoms:
-                # Buffer to ensure validity
-                valid_geom = geom.buffer(0)
-                if valid_geom.is_valid and not valid_geom.is_empty:
-                    partitioned_geometries.append(valid_geom)
-
-            # Debug: print what we got from the split
-            print(f"Split produced {len(partitioned_geometries)} geometries:")
-            for i, geom in enumerate(partitioned_geometries):
-                print(f"  {i}: {geom.geom_type} - area: {geom.area}")
-
-            # Convert MultiPolygons to individual Polygons
-            all_polygons = []
-            for geom in partitioned_geometries:
-                if isinstance(geom, Polygon):
-                    all_polygons.append(geom)
-                elif hasattr(geom, 'geoms'):  # MultiPolygon, GeometryCollection, etc.
-                    for sub_geom in geom.geoms:
-                        if isinstance(sub_geom, Polygon):
-                            valid_sub = sub_geom.buffer(0)
-                            if valid_sub.is_valid and not valid_sub.is_empty:
-                                all_polygons.append(valid_sub)
-
-            print(f"After processing, we have {len(all_polygons)} polygons")
-
-            # We need at least 2 polygons to consider it a successful cut
-            if len(all_polygons) < 2:
-                # Try alternative cutting method
-                all_polygons = self._try_alternative_cut(target_geometry, extended_line)
-                if len(all_polygons) < 2:
-                    return False, f"Cut operation produced only {len(all_polygons)} valid polygon(s). Try a different cut line that crosses the polygon completely."
-
-            # Create new features from cut results
-            new_features = []
-            for i, polygon_geom in enumerate(all_polygons):
-                # Convert geometry to GeoJSON-compatible dict
-                geometry_dict = self._geometry_to_geojson_dict(polygon_geom)
-                if not geometry_dict:
-                    print(f"Failed to convert polygon {i} to GeoJSON")
-                    continue
-
-                new_properties = target_feature.drop('geometry').to_dict()
-                new_properties.update({
-                    'cut_part': i + 1,
-                    'original_feature': feature_id,
-                    'area_sq_km': round(polygon_geom.area * 10000, 2)
-                })
-
-                new_feature = {
-                    'type': 'Feature',
-                    'geometry': geometry_dict,
-                    'properties': new_properties
-                }
-                new_features.append(new_feature)
-
-            print(f"Created {len(new_features)} new features")
-
-            if len(new_features) < 2:
-                return False, f"Only created {len(new_features)} valid feature(s) from cut operation"
-
-            # Remove the original feature and add the cut parts
-            remaining_gdf = gdf.drop(feature_idx)
-            remaining_features = []
-
-            for idx, row in remaining_gdf.iterrows():
-                geometry_dict = self._geometry_to_geojson_dict(row.geometry)
-                if not geometry_dict:
-                    continue
-
-                feature = {
-                    'type': 'Feature',
-                    'geometry': geometry_dict,
-                    'properties': row.drop('geometry').to_dict()
-                }
-                remaining_features.append(feature)
-
-            # Combine all features
-            all_features = remaining_features + new_features
-
-            # Create new processed data
-            processed_data = {
-                'type': 'FeatureCollection',
-                'features': all_features
+            parts, error = self._cut_pieces(features, feature_idx, cut_line)
+            if error:
+                return False, error
+
+            logger.debug("Split produced %d geometries", len(parts))
+
+            # Parts go last so that other features keep their relative order (see _edit_event)
+            with span('replace'):
+                processed = features.replace([feature_idx], parts, [{}] * len(parts))
+            self.set_processed(processed)
+            self._edit_delta = {
+                'removed': [feature_idx],
+                'added': processed.features(range(len(processed) - len(parts), len(processed))),
             }
 
-            # Validate the entire GeoJSON structure before saving
-            if not self._is_valid_geojson(processed_data):
-                return False, "Generated GeoJSON data is not valid"
-
-            # Save to processed field
-            #self.geojson_data_processed = processed_data
-            import ipdb; ipdb.set_trace()
-            gdf = gpd.GeoDataFrame.from_features(processed_data['features'])
-            self.geojson_data_processed = json.loads(gdf.set_crs(settings.CRS).to_json())
-
-            self.save()
-
-            total_parts = len(new_features)
-            total_area = sum(feat['properties']['area_sq_km'] for feat in new_features)
-            return True, f"Successfully cut polygon {feature_id} into {total_parts} parts (Total area: {total_area} sq km)"
+            return True, f"Successfully cut polygon {feature_id} into {len(parts)} parts)"
 
+        except executor.GeometryTaskError as e:
+            return False, f"Error cutting polygon: {str(e)}"
         except Exception as e:
-            import traceback
-            print(f"Cut polygon error: {e}")
-            print(traceback.format_exc())
+            logger.exception("Cut failed for shapefile %s", self.pk)
             return False, f"Error cutting polygon: {str(e)}"
 
-    def _try_alternative_cut(self, polygon, line):
-        """Try alternative methods to cut the polygon"""
-        from shapely.geometry import Polygon
-        from shapely.ops import split
-
-        all_polygons = []
-
-        # Method 1: Try with a slightly buffered line
+    def subdivide_polygons(self, selected_feature_ids, mode, value):
+        """Split selected polygons into grid cells of `value` metres, or into `value` equal-area strips"""
+        success, message = self._compute_subdivide(selected_feature_ids, mode, value)
+        if success:
+            success, message = self._commit_processed(message)
+        return success, message
+
+    async def asubdivide_polygons(self, selected_feature_ids, mode, value):
+        """Async subdivide_polygons: geometry work runs off the event loop"""
+        success, message = await sync_to_async(self._compute_subdivide, thread_sensitive=False)(selected_feature_ids, mode, value)
+        if success:
+            success, message = await self._acommit_processed(message)
+        return success, message
+
+    def _compute_subdivide(self, selected_feature_ids, mode, value):
+        """Subdivide polygons into geojson_data_processed without saving.
+
+        All selected polygons are cut in one vectorized call, laid out in
+        settings.CRS_GDA94 so cell sizes and areas are in metres (the CRS
+        the overlay measures in). Each piece keeps its polygon's properties
+        plus subdivided_from, part and area_m2.
+        """
         try:
-            buffered_line = line.buffer(0.0001)
-            result = split(polygon, buffered_line)
-            for geom in result.geoms:
-                valid_geom = geom.buffer(0)
-                if valid_geom.is_valid and not valid_geom.is_empty and isinstance(valid_geom, Polygon):
-                    all_polygons.append(valid_geom)
-        except:
-            pass
-
-        if len(all_polygons) >= 2:
-            return all_polygons
-
-        # Method 2: Use difference operation
-        try:
-            buffered_line = line.buffer(0.0001)
-            difference = polygon.difference(buffered_line)
-            if hasattr(difference, 'geoms'):
-                for geom in difference.geoms:
-                    valid_geom = geom.buffer(0)
-                    if valid_geom.is_valid and not valid_geom.is_empty and isinstance(valid_geom, Polygon):
-                        all_polygons.append(valid_geom)
-        except:
-            pass
+            features = self.processed_features()
+            if features is None:
+                return False, "No source data available for subdividing"
+
+            selected_indices = sorted({int(idx) for idx in selected_feature_ids if str(idx).isdigit()})
+            valid_indices = [idx for idx in selected_indices if idx < len(features)]
+            if not valid_indices:
+                return False, "Please select at least 1 polygon to subdivide"
+
+            try:
+                if mode == 'grid':
+                    value = float(value)
+                    if not (math.isfinite(value) and value > 0):
+                        return False, "Cell size must be greater than 0"
+                elif mode == 'strips':
+                    value = int(value)
+                    if value < 2:
+                        return False, "Number of parts must be at least 2"
+                else:
+                    return False, f"Unknown subdivision mode: {mode}"
+            except (TypeError, ValueError):
+                return False, f"Invalid {'cell size' if mode == 'grid' else 'number of parts'}: {value}"
+
+            geoms = features.geometries[valid_indices]
+            max_parts = getattr(settings, 'SUBDIVIDE_MAX_PARTS', 10000)
+            if mode == 'grid':
+                with span('to_crs'):
+                    metric = gpd.GeoSeries(geoms, crs='EPSG:4326').to_crs(settings.CRS_GDA94).values.to_numpy()
+                n_parts = count_grid_cells(metric, value)
+            else:
+                n_parts = value * len(geoms)
+            if n_parts > max_parts:
+                return False, f"Subdivision would produce up to {n_parts} parts (limit {max_parts}); use a larger cell size or fewer parts"
+
+            # Laid out in CRS_GDA94, cut in EPSG:4326 (see utils/subdivide.py)
+            with span('subdivide'):
+                wkbs, source = executor.run(subdivide_wkb, shapely.to_wkb(geoms), mode, value, settings.CRS_GDA94)
+            pieces = shapely.from_wkb(wkbs)
+            if not len(pieces):
+                return False, "Subdivision produced no polygons"
+
+            # Pieces inherit their polygon's properties
+            source_ids = np.asarray(valid_indices)[source]
+            sources = features.take(source_ids)
+            properties = sources.properties
+            properties['subdivided_from'] = source_ids
+            properties['part'] = properties.groupby('subdivided_from').cumcount() + 1
+            with span('to_crs'):
+                properties['area_m2'] = area_m2(pieces)
+
+            # Pieces go last, in selection order (see _edit_event)
+            with span('replace'):
+                processed = features.replace(valid_indices, pieces, properties, sources.absent)
+            self.set_processed(processed)
+            # Rebuilt from the subdivided layer when next needed
+            self._next_topology = None
+            self._edit_delta = {
+                'removed': valid_indices,
+                'added': processed.features(range(len(processed) - len(pieces), len(processed))),
+            }
 
-        return all_polygons
+            return True, f"Subdivided {len(valid_indices)} polygon(s) into {len(pieces)} parts"
 
-    def _geometry_to_geojson_dict(self, geometry):
-        """Convert a Shapely geometry to a GeoJSON-compatible dictionary"""
+        except executor.GeometryTaskError as e:
+            return False, f"Error subdividing polygons: {str(e)}"
+        except Exception as e:
+            logger.exception("Subdivide failed for shapefile %s", self.pk)
+            return False, f"Error subdividing polygons: {str(e)}"
+
+    def _sliver_thresholds(self, min_area, min_thinness):
+        """Thresholds as floats, settings defaults for missing ones; ValueError if invalid"""
+        min_area = float(getattr(settings, 'SLIVER_MIN_AREA', 1.0) if min_area is None else min_area)
+        min_thinness = float(getattr(settings, 'SLIVER_MIN_THINNESS', 0.05) if min_thinness is None else min_thinness)
+        if not (math.isfinite(min_area) and min_area >= 0 and 0 <= min_thinness <= 1):
+            raise ValueError("min_area must be >= 0 and min_thinness between 0 and 1")
+        return min_area, min_thinness
+
+    def _metric_geometries(self, features):
+        """The layer's geometries in settings.CRS_GDA94, so sliver areas are in the metres area_m2 reports"""
+        with span('to_crs'):
+            return gpd.GeoSeries(features.geometries, crs='EPSG:4326').to_crs(settings.CRS_GDA94).values.to_numpy()
+
+    def sliver_ids(self, min_area=None, min_thinness=None):
+        """Positions of the processed polygons under the area or thinness threshold"""
+        features = self.processed_features()
+        if features is None:
+            return []
+        min_area, min_thinness = self._sliver_thresholds(min_area, min_thinness)
+        return np.flatnonzero(find_slivers(self._metric_geometries(features), min_area, min_thinness)).tolist()
+
+    def merge_slivers(self, min_area=None, min_thinness=None):
+        """Merge every sliver of the processed layer into its longest-boundary neighbour, in one save"""
+        success, message = self._compute_merge_slivers(min_area, min_thinness)
+        if success:
+            success, message = self._commit_processed(message)
+        return success, message
+
+    async def amerge_slivers(self, min_area=None, min_thinness=None):
+        """Async merge_slivers: geometry work runs off the event loop"""
+        success, message = await sync_to_async(self._compute_merge_slivers, thread_sensitive=False)(min_area, min_thinness)
+        if success:
+            success, message = await self._acommit_processed(message)
+        return success, message
+
+    def _compute_merge_slivers(self, min_area, min_thinness):
+        """Merge slivers into geojson_data_processed without saving (see utils/slivers.py).
+
+        Each polygon that absorbed slivers keeps its properties and lists
+        them in merged_slivers.
+        """
         try:
-            # Use __geo_interface__ to get the GeoJSON representation
-            geo_interface = geometry.__geo_interface__
-
-            # Ensure it's a valid GeoJSON geometry
-            if not isinstance(geo_interface, dict):
-                return None
-
-            required_keys = ['type', 'coordinates']
-            if not all(key in geo_interface for key in required_keys):
-                return None
+            features = self.processed_features()
+            if features is None:
+                return False, "No source data available for merging slivers"
+            try:
+                min_area, min_thinness = self._sliver_thresholds(min_area, min_thinness)
+            except (TypeError, ValueError) as e:
+                return False, f"Invalid sliver thresholds: {e}"
+
+            metric = self._metric_geometries(features)
+            with span('slivers'):
+                targets, wkbs, groups, unresolved = executor.run(
+                    merge_slivers_wkb, features.to_wkb(), shapely.to_wkb(metric), min_area, min_thinness
+                )
+            if not len(targets):
+                if len(unresolved):
+                    return False, f"Found {len(unresolved)} sliver(s), none with a neighbour to merge into"
+                return False, f"No slivers found (area < {min_area} m² or thinness < {min_thinness})"
+
+            kept = features.take(targets)
+            properties = kept.properties
+            properties['merged_slivers'] = pd.Series(groups, dtype=object)
+            removed = sorted(targets.tolist() + [idx for group in groups for idx in group])
+
+            # Merged polygons go last (see _edit_event)
+            with span('replace'):
+                processed = features.replace(removed, shapely.from_wkb(wkbs), properties, kept.absent)
+            self.set_processed(processed)
+            # Rebuilt from the cleaned layer when next needed
+            self._next_topology = None
+            self._edit_delta = {
+                'removed': removed,
+                'added': processed.features(range(len(processed) - len(targets), len(processed))),
+            }
 
-            return geo_interface
+            message = f"Merged {len(removed) - len(targets)} sliver(s) into {len(targets)} neighbouring polygon(s)"
+            if len(unresolved):
+                message += f"; {len(unresolved)} sliver(s) have no neighbour to merge into"
+            return True, message
 
+        except executor.GeometryTaskError as e:
+            return False, f"Error merging slivers: {str(e)}"
         except Exception as e:
-            print(f"Geometry to GeoJSON conversion error: {e}")
-            return None
-
-    def _is_valid_geojson(self, geojson_data):
-        """Validate that the GeoJSON structure is valid and JSON-serializable"""
+            logger.exception("Sliver merge failed for shapefile %s", self.pk)
+            return False, f"Error merging slivers: {str(e)}"
+
+    def dissolve(self, by, aggregations=None):
+        """Union the processed features that share the values of the `by` columns, in one save"""
+        success, message = self._compute_dissolve(by, aggregations)
+        if success:
+            success, message = self._commit_processed(message)
+        return success, message
+
+    async def adissolve(self, by, aggregations=None):
+        """Async dissolve: geometry work runs off the event loop"""
+        success, message = await sync_to_async(self._compute_dissolve, thread_sensitive=False)(by, aggregations)
+        if success:
+            success, message = await self._acommit_processed(message)
+        return success, message
+
+    def _compute_dissolve(self, by, aggregations):
+        """Dissolve geojson_data_processed without saving (see utils/dissolve.py).
+
+        `aggregations` maps other columns to 'first' (the default), 'sum' or
+        'list'. Each feature gets dissolved_count, and area_m2 (see
+        area_m2()) unless that column is aggregated itself.
+        """
         try:
-            # Test JSON serialization
-            json.dumps(geojson_data)
-            return True
+            features = self.processed_features()
+            if features is None or not len(features):
+                return False, "No source data available for dissolving"
+            by = [by] if isinstance(by, str) else list(by or [])
+            aggregations = aggregations or {}
+            error = check_dissolve(features.properties, by, aggregations)
+            if error:
+                return False, error
+
+            with span('dissolve'):
+                geoms, properties = dissolve_layer(
+                    features.geometries, features.properties, by, aggregations,
+                    chunk_size=getattr(settings, 'DISSOLVE_CHUNK_SIZE', 5000),
+                )
+            if 'area_m2' not in aggregations:
+                with span('to_crs'):
+                    properties['area_m2'] = area_m2(geoms)
+
+            self.set_processed(FeatureStore(geoms, properties))
+            # Rebuilt from the dissolved layer when next needed
+            self._next_topology = None
+            # Whole layer replaced: listeners reload it
+            self._edit_delta = None
+
+            return True, f"Dissolved {len(features)} features into {len(geoms)} by {', '.join(map(str, by))}"
+
+        except executor.GeometryTaskError as e:
+            return False, f"Error dissolving layer: {str(e)}"
         except Exception as e:
-            print(f"GeoJSON validation error: {e}")
-            return False
-
-    def _create_cutting_line(self, polygon, original_line):
-        """Create a line that properly cuts through the polygon"""
-        from shapely.geometry import LineString, Point
-
-        # Get line coordinates
-        coords = list(original_line.coords)
-        if len(coords) < 2:
-            return original_line
-
-        start_point = Point(coords[0])
-        end_point = Point(coords[-1])
-
-        # Calculate direction vector
-        dx = end_point.x - start_point.x
-        dy = end_point.y - start_point.y
-
-        # If line is degenerate, create a meaningful cutting line
-        if abs(dx) < 1e-10 and abs(dy) < 1e-10:
-            bounds = polygon.bounds
-            # Create a diagonal cutting line through the polygon
-            return LineString([
-                (bounds[0], bounds[1]),  # southwest
-                (bounds[2], bounds[3])   # northeast
-            ])
-
-        # Calculate line length for normalization
-        line_length = ((dx ** 2) + (dy ** 2)) ** 0.5
-
-        # Get polygon bounds for extension
-        bounds = polygon.bounds
-        poly_width = bounds[2] - bounds[0]
-        poly_height = bounds[3] - bounds[1]
-        max_dimension = max(poly_width, poly_height)
-
-        # Extend line significantly beyond polygon bounds to ensure complete cut
-        extension_distance = max_dimension * 2.0  # Increased extension
-
-        # Normalize direction vector
-        norm_dx = dx / line_length
-        norm_dy = dy / line_length
-
-        # Extend both ends of the line
-        extended_start = (
-            start_point.x - norm_dx * extension_distance,
-            start_point.y - norm_dy * extension_distance
-        )
-        extended_end = (
-            end_point.x + norm_dx * extension_distance,
-            end_point.y + norm_dy * extension_distance
-        )
-
-        return LineString([extended_start, extended_end])
+            logger.exception("Dissolve failed for shapefile %s", self.pk)
+            return False, f"Error dissolving layer: {str(e)}"
@@ -14,6 +14,13 @@ class PolygonCutter {
         this.cutLineSource = null;
         this.drawInteraction = null;
 
+        // Dry-run preview of the pieces while the line is drawn
+        this.previewSource = null;
+        this.previewLayer = null;
+        this.previewTimer = null;
+        this.previewController = null;
+        this.previewDelay = 150;
+
         // UI Elements
         this.cuttingToggleBtn = null;
         this.cuttingPanel = null;
@@ -23,9 +30,28 @@ class PolygonCutter {
 
     init() {
         this.createCutLineLayer();
+        this.createPreviewLayer();
         this.setupEventListeners();
     }
 
+    createPreviewLayer() {
+        const colors = ['rgba(255, 193, 7, 0.45)', 'rgba(13, 202, 240, 0.45)', 'rgba(25, 135, 84, 0.45)', 'rgba(214, 51, 132, 0.45)'];
+        this.previewSource = new ol.source.Vector();
+        this.previewLayer = new ol.layer.Vector({
+            source: this.previewSource,
+            style: (feature) => new ol.style.Style({
+                fill: new ol.style.Fill({
+                    color: colors[(feature.get('part') - 1) % colors.length]
+                }),
+                stroke: new ol.style.Stroke({
+                    color: '#333333',
+                    width: 1.5
+                })
+            }),
+            zIndex: 1000
+        });
+    }
+
     createCutLineLayer() {
         this.cutLineSource = new ol.source.Vector();
         this.cutLineLayer = new ol.layer.Vector({
@@ -94,6 +120,7 @@ class PolygonCutter {
         this.cuttingToggleBtn.title = 'Disable Polygon Cutting';
         this.cuttingPanel.style.display = 'block';
 
+        this.map.addLayer(this.previewLayer);
         this.map.addLayer(this.cutLineLayer);
         this.setupCuttingInteractions();
 
@@ -109,6 +136,7 @@ class PolygonCutter {
 
         this.cleanupCuttingInteractions();
         this.map.removeLayer(this.cutLineLayer);
+        this.map.removeLayer(this.previewLayer);
         this.clearCutting();
 
         this.showStatusMessage('Polygon cutting disabled', 'info');
@@ -126,6 +154,13 @@ class PolygonCutter {
         };
         this.map.on('click', this.mapClickHandler);
 
+        // Preview the cut with the line's next point at the cursor
+        this.pointerMoveHandler = (evt) => {
+            if (evt.dragging || !this.selectedPolygon || this.cutLinePoints.length === 0) return;
+            this.schedulePreview(this.cutLinePoints.concat([evt.coordinate]));
+        };
+        this.map.on('pointermove', this.pointerMoveHandler);
+
         // Use existing select interaction for polygon selection
         this.selectInteraction.setActive(true);
     }
@@ -135,6 +170,9 @@ class PolygonCutter {
         if (this.mapClickHandler) {
             this.map.un('click', this.mapClickHandler);
         }
+        if (this.pointerMoveHandler) {
+            this.map.un('pointermove', this.pointerMoveHandler);
+        }
 
         // Restore original select behavior
         if (this.originalSelectHandler) {
@@ -199,6 +237,7 @@ class PolygonCutter {
         // Enable cut button if we have at least 2 points
         if (this.cutLinePoints.length >= 2) {
             this.cutPolygonBtn.disabled = false;
+            this.schedulePreview(this.cutLinePoints);
         }
 
         this.showStatusMessage(`Point ${this.cutLinePoints.length} placed`, 'info');
@@ -249,10 +288,77 @@ class PolygonCutter {
     clearCutLine() {
         this.cutLinePoints = [];
         this.cutLineSource.clear();
+        this.clearPreview();
         this.updateLineStatus();
         this.cutPolygonBtn.disabled = true;
     }
 
+    schedulePreview(coordinates) {
+        // Debounced: only the line the cursor rests on is sent
+        clearTimeout(this.previewTimer);
+        this.previewTimer = setTimeout(() => this.requestPreview(coordinates), this.previewDelay);
+    }
+
+    async requestPreview(coordinates) {
+        if (!this.selectedPolygon || coordinates.length < 2) return;
+
+        // A newer preview makes the one in flight obsolete
+        if (this.previewController) {
+            this.previewController.abort();
+        }
+        const controller = new AbortController();
+        this.previewController = controller;
+
+        const shapefileId = this.selectedPolygon.get('shapefileId');
+        try {
+            const response = await fetch(`/shapefile/${shapefileId}/cut_polygon/preview/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': this.getCookie('csrftoken')
+                },
+                body: JSON.stringify({
+                    feature_id: this.selectedPolygon.get('featureId'),
+                    cut_line: coordinates.map(coord => ol.proj.toLonLat(coord))
+                }),
+                signal: controller.signal
+            });
+            const data = await response.json();
+            if (controller !== this.previewController) return;
+            this.showPreview(data);
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                console.error('Cut preview error:', error);
+            }
+        }
+    }
+
+    showPreview(data) {
+        this.previewSource.clear();
+        if (!data.success) {
+            this.cuttingLineStatus.innerHTML = `<span class="text-warning">${data.message}</span>`;
+            return;
+        }
+        const features = new ol.format.GeoJSON().readFeatures({type: 'FeatureCollection', features: data.pieces}, {
+            dataProjection: 'EPSG:4326',
+            featureProjection: 'EPSG:3857'
+        });
+        this.previewSource.addFeatures(features);
+        const areas = data.pieces.map(piece => `${Math.round(piece.properties.area_m2).toLocaleString()} m²`);
+        this.cuttingLineStatus.innerHTML = `<span class="text-success">${data.pieces.length} pieces: ${areas.join(', ')}</span>`;
+    }
+
+    clearPreview() {
+        clearTimeout(this.previewTimer);
+        if (this.previewController) {
+            this.previewController.abort();
+            this.previewController = null;
+        }
+        if (this.previewSource) {
+            this.previewSource.clear();
+        }
+    }
+
     clearCutting() {
         if (this.selectedPolygon) {
             this.selectInteraction.getFeatures().remove(this.selectedPolygon);
@@ -301,8 +407,11 @@ class PolygonCutter {
                 this.showStatusMessage(data.message, 'success');
                 this.clearCutting();
 
-                // Reload the processed layer to show the cut result
-                this.reloadProcessedLayer(shapefileId);
+                // Reload the processed layer to show the cut result, unless the
+                // edit delta is pushed to us over the event stream
+                if (!(typeof liveUpdatesConnected === 'function' && liveUpdatesConnected(shapefileId))) {
+                    this.reloadProcessedLayer(shapefileId);
+                }
 
             } else {
                 this.showStatusMessage('Error: ' + data.message, 'danger');
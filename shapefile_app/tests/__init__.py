@@ -0,0 +1,9 @@
+"""
+Tests for shapefile_app: `python manage.py test shapefile_app`.
+
+Set GDAL_LIBRARY_PATH / GEOS_LIBRARY_PATH where GeoDjango can't find the
+libraries itself. Modules named after a utility (test_topology, test_dissolve,
+...) import only shapefile_app.utils and also run without GDAL:
+
+    DJANGO_SETTINGS_MODULE=ol_project.settings python -m unittest shapefile_app.tests.test_topology
+"""
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import shapely
+from django.test import SimpleTestCase, override_settings
+
+from shapefile_app.models import Shapefile, area_m2
+from shapefile_app.tests.test_views import EditViewTestCase
+from shapefile_app.utils.dissolve import dissolve_layer, group_codes, union_groups
+
+
+@override_settings(GEOMETRY_WORKERS=0)
+class DissolveTests(SimpleTestCase):
+    def setUp(self):
+        self.geoms = np.array([shapely.box(0, 0, 1, 1), shapely.box(1, 0, 2, 1), shapely.box(5, 0, 6, 1), shapely.box(8, 0, 9, 1), shapely.box(3, 0, 4, 1)])
+        self.properties = pd.DataFrame({
+            'zone': ['a', 'a', 'b', None, 'a'],
+            'area': [1.0, 2.0, 3.0, 4.0, 5.0],
+            'name': ['x', 'y', 'z', 'w', 'v'],
+        })
+
+    def test_group_codes_in_key_order_with_nulls(self):
+        self.assertEqual(group_codes(self.properties, ['zone']).tolist(), [0, 0, 1, 2, 0])
+
+    def test_dissolve(self):
+        geoms, properties = dissolve_layer(self.geoms, self.properties, ['zone'], {'area': 'sum', 'name': 'list'})
+        self.assertEqual(properties['zone'].tolist()[:2], ['a', 'b'])
+        self.assertEqual(properties['area'].tolist(), [8.0, 3.0, 4.0])
+        self.assertEqual(properties['name'].tolist(), [['x', 'y', 'v'], ['z'], ['w']])
+        self.assertEqual(properties['dissolved_count'].tolist(), [3, 1, 1])
+        # Touching squares are unioned; the separate one stays a separate part
+        self.assertEqual(geoms[0].geom_type, 'MultiPolygon')
+        self.assertEqual(len(geoms[0].geoms), 2)
+        self.assertAlmostEqual(geoms[0].area, 3.0)
+        self.assertTrue(geoms[1].equals(self.geoms[2]))
+
+    def test_dissolve_in_small_chunks(self):
+        geoms, _ = dissolve_layer(self.geoms, self.properties, ['zone'], chunk_size=1)
+        self.assertEqual(shapely.area(geoms).tolist(), [3.0, 1.0, 1.0])
+
+    def test_groups_with_points_and_lines(self):
+        geoms = np.array([shapely.box(0, 0, 1, 1), shapely.Point(5, 5), shapely.box(3, 0, 4, 1), shapely.LineString([(8, 0), (9, 1)]), shapely.Point(0, 9)])
+        result = union_groups(geoms, np.array([0, 0, 1, 1, 2]))
+        self.assertEqual([geom.geom_type for geom in result], ['GeometryCollection', 'GeometryCollection', 'Point'])
+        self.assertEqual(sorted(part.geom_type for part in result[0].geoms), ['Point', 'Polygon'])
+        self.assertAlmostEqual(result[1].area, 1.0)
+
+    def test_invalid_requests(self):
+        for by, aggregations in [([], {}), (['nope'], {}), (['zone'], {'name': 'sum'}), (['zone'], {'area': 'mean'})]:
+            with self.subTest(by=by, aggregations=aggregations), self.assertRaises(ValueError):
+                dissolve_layer(self.geoms, self.properties, by, aggregations)
+
+
+class DissolveViewTests(EditViewTestCase):
+    def test_dissolve(self):
+        original = self.shapefile.processed_features()
+        response = self.post('dissolve', {'by': 'zone', 'aggregations': {'parcel_id': 'list'}})
+        self.assertEqual(response.json()['success'], True)
+
+        features = self.processed()
+        records = features.records()
+        self.assertEqual([record['zone'] for record in records], list(range(7)))
+        self.assertEqual(records[0]['parcel_id'], [0, 7, 14])
+        self.assertEqual(sum(record['dissolved_count'] for record in records), 16)
+        # area_m2 is measured in CRS_GDA94, like the overlay's
+        self.assertAlmostEqual(records[0]['area_m2'], area_m2(original.geometries[[0, 7, 14]]).sum(), delta=0.5)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.post('dissolve', {}).status_code, 400)
+        response = self.post('dissolve', {'by': ['nope']})
+        self.assertEqual(response.json()['success'], False)
+        self.assertIn('Unknown column', response.json()['message'])
+
+    async def test_async_dissolve(self):
+        response = await self.apost('dissolve_async', {'by': ['zone']})
+        self.assertEqual(response.json()['success'], True)
+        shapefile = await Shapefile.objects.aget(pk=self.shapefile.pk)
+        self.assertEqual(shapefile.processed_version, 1)
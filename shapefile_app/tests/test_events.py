@@ -0,0 +1,97 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from shapefile_app import events
+from shapefile_app.models import Shapefile
+from shapefile_app.tests.test_views import create_shapefile, cut_line
+
+
+@override_settings(GEOMETRY_WORKERS=0, CRS='epsg:4326')
+class StaleEditTests(TestCase):
+    def setUp(self):
+        self.shapefile = create_shapefile()
+
+    def test_edit_from_a_replaced_version_is_refused(self):
+        first = Shapefile.objects.get(pk=self.shapefile.pk)
+        second = Shapefile.objects.get(pk=self.shapefile.pk)
+        self.assertTrue(first.merge_selected_polygons(['0', '1'])[0])
+
+        success, message = second.merge_selected_polygons(['4', '5'])
+        self.assertFalse(success)
+        self.assertTrue(second.edit_conflict)
+        self.assertIn('version 1', message)
+        # The refused edit left the saved layer alone and reloaded it
+        self.assertEqual(second.processed_version, 1)
+        self.assertEqual(len(Shapefile.objects.get(pk=self.shapefile.pk).processed_features()), 15)
+
+    def test_view_answers_conflict(self):
+        compute_merge = Shapefile._compute_merge
+
+        def racing_merge(shapefile, selected_feature_ids):
+            # Another request saves an edit while this one computes
+            result = compute_merge(shapefile, selected_feature_ids)
+            other = Shapefile.objects.get(pk=shapefile.pk)
+            other.cut_polygon(8, cut_line(other.processed_features().geometries[8]))
+            return result
+
+        with mock.patch.object(Shapefile, '_compute_merge', racing_merge):
+            response = self.client.post(
+                reverse('merge_polygons', args=[self.shapefile.pk]),
+                json.dumps({'selected_features': ['0', '1']}), content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['success'], False)
+        self.assertEqual(response.json()['version'], 1)
+        self.assertEqual(len(Shapefile.objects.get(pk=self.shapefile.pk).processed_features()), 17)
+
+
+@override_settings(GEOMETRY_WORKERS=0, CRS='epsg:4326')
+class EditEventTests(TestCase):
+    def setUp(self):
+        self.shapefile = create_shapefile()
+
+    def test_delta_is_published_on_commit(self):
+        with mock.patch.object(events, 'publish') as publish:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.assertTrue(self.shapefile.merge_selected_polygons(['0', '1'])[0])
+            publish.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        (pk, event), _ = publish.call_args
+        self.assertEqual(pk, self.shapefile.pk)
+        self.assertEqual(event['type'], 'delta')
+        self.assertEqual((event['base_version'], event['version']), (0, 1))
+        self.assertEqual(event['removed'], [0, 1])
+        self.assertEqual(len(event['added']), 1)
+
+    def test_nothing_is_published_for_a_failed_edit(self):
+        with mock.patch.object(events, 'publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            self.assertFalse(self.shapefile.merge_selected_polygons(['0'])[0])
+        publish.assert_not_called()
+
+    async def test_event_stream(self):
+        response = await self.async_client.get(reverse('shapefile_events', args=[self.shapefile.pk]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+
+        # The subscription is made when the stream starts; publish once it has
+        next_chunk = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)
+        events.publish(self.shapefile.pk, {'type': 'reset', 'layer': 'processed', 'version': 3})
+        chunk = await asyncio.wait_for(next_chunk, 5)
+        self.assertEqual(chunk, b'event: reset\ndata: {"type": "reset", "layer": "processed", "version": 3}\n\n')
+        await stream.aclose()
+
+    def test_event_stream_needs_asgi(self):
+        response = self.client.get(reverse('shapefile_events', args=[self.shapefile.pk]))
+        self.assertEqual(response.status_code, 204)
+
+    async def test_event_stream_of_unknown_shapefile(self):
+        response = await self.async_client.get(reverse('shapefile_events', args=[999]))
+        self.assertEqual(response.status_code, 404)
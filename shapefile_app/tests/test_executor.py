@@ -0,0 +1,44 @@
+import time
+
+import shapely
+from django.test import SimpleTestCase, override_settings
+
+from shapefile_app.utils import executor
+
+
+class InlineTests(SimpleTestCase):
+    @override_settings(GEOMETRY_WORKERS=0)
+    def test_runs_in_the_calling_process(self):
+        self.assertEqual(executor.run(abs, -3, timeout=0), 3)
+        self.assertEqual(executor.run_many(abs, [(-1,), (-2,)]), [1, 2])
+        merged = executor.unary_union([shapely.box(0, 0, 1, 1), shapely.box(1, 0, 2, 1)])
+        self.assertTrue(merged.equals(shapely.box(0, 0, 2, 1)))
+        self.assertEqual(len(executor.split(shapely.box(0, 0, 2, 1), shapely.LineString([(1, -1), (1, 2)]))), 2)
+
+
+@override_settings(GEOMETRY_WORKERS=1)
+class PoolTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(executor.shutdown, terminate=True)
+        # Start the worker outside the timed part
+        self.assertEqual(executor.run(abs, -1, timeout=30), 1)
+
+    def test_timeout_keeps_the_pool(self):
+        start = time.monotonic()
+        with self.assertRaises(executor.GeometryTaskTimeout):
+            executor.run(time.sleep, 2, timeout=0.5)
+        self.assertLess(time.monotonic() - start, 1.5)
+
+        # The abandoned task finishes in its worker; later tasks still run
+        pool = executor.get_pool()
+        self.assertEqual(executor.run_many(abs, [(-1,), (-2,)], timeout=30), [1, 2])
+        self.assertIs(executor.get_pool(), pool)
+
+    def test_run_many_timeout_bounds_the_whole_call(self):
+        start = time.monotonic()
+        with self.assertRaises(executor.GeometryTaskTimeout):
+            executor.run_many(time.sleep, [(0.4,)] * 6, timeout=1)
+        self.assertLess(time.monotonic() - start, 1.8)
+
+    def test_results_come_back_in_order(self):
+        self.assertEqual(executor.run_many(pow, [(2, i) for i in range(8)], timeout=30), [2 ** i for i in range(8)])
@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import zipfile
+
+import geopandas as gpd
+import shapely
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from shapefile_app.models import Shapefile
+from shapefile_app.tests.test_views import create_shapefile
+from shapefile_app.utils import export
+from shapefile_app.utils.export import EXPORT_FORMATS, write_export
+
+
+class WriteExportTests(SimpleTestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        self.geometries = [shapely.box(115.9, -34.2, 115.901, -34.199), shapely.box(115.901, -34.2, 115.902, -34.199)]
+        self.records = [{'name': 'a', 'area': 1.5}, {'name': 'Merged Polygon', 'area': 2.5, 'merged_features': ['0', '1']}]
+
+    def read(self, fmt):
+        path = os.path.join(self.temp_dir, f'layer.{EXPORT_FORMATS[fmt][0]}')
+        write_export(shapely.to_wkb(self.geometries), self.records, fmt, path)
+        self.assertEqual(os.listdir(self.temp_dir), [os.path.basename(path)])
+        if fmt == 'parquet':
+            return gpd.read_parquet(path)
+        if fmt == 'shp':
+            with zipfile.ZipFile(path) as zip_ref:
+                self.assertIn('processed.shp', zip_ref.namelist())
+            return gpd.read_file(f'zip://{path}')
+        return gpd.read_file(path)
+
+    def test_formats(self):
+        for fmt in EXPORT_FORMATS:
+            with self.subTest(fmt=fmt):
+                gdf = self.read(fmt)
+                self.assertEqual(len(gdf), 2)
+                self.assertTrue(gdf.crs.equals('EPSG:4326'))
+                self.assertEqual(sorted(gdf['name']), ['Merged Polygon', 'a'])
+                self.assertAlmostEqual(shapely.area(gdf.geometry.to_numpy()).sum(), 2e-6)
+                for path in os.listdir(self.temp_dir):
+                    os.remove(os.path.join(self.temp_dir, path))
+
+    def test_lists_are_written_as_json(self):
+        gdf = self.read('gpkg')
+        self.assertEqual(gdf.loc[gdf['name'] == 'Merged Polygon', 'merged_features'].item(), '["0", "1"]')
+
+
+# The export is written by a background thread with its own connection
+@override_settings(GEOMETRY_WORKERS=0)
+class ExportViewTests(TransactionTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.shapefile = create_shapefile(4)
+        self.url = reverse('export_shapefile', args=[self.shapefile.pk])
+
+    def wait_for_export(self, fmt):
+        job = export._jobs.get((self.shapefile.pk, self.shapefile.processed_version, fmt))
+        if job is not None:
+            job.join(30)
+
+    def test_export_is_written_then_served(self):
+        response = self.client.get(self.url, {'format': 'gpkg'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Retry-After'], '1')
+        self.wait_for_export('gpkg')
+
+        response = self.client.head(self.url, {'format': 'gpkg'})
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response['Content-Length']), 0)
+
+        response = self.client.get(self.url, {'format': 'gpkg'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/geopackage+sqlite3')
+        self.assertIn('parcels-processed.gpkg', response['Content-Disposition'])
+        self.assertEqual(response['X-Layer-Version'], '0')
+        self.assertEqual(len(b''.join(response.streaming_content)), os.path.getsize(
+            export.export_path(self.shapefile.pk, 'p0', 'gpkg')
+        ))
+
+    def test_new_version_replaces_old_export(self):
+        self.client.get(self.url, {'format': 'parquet'})
+        self.wait_for_export('parquet')
+        self.assertTrue(self.shapefile.merge_selected_polygons(['0', '1'])[0])
+
+        self.assertEqual(self.client.get(self.url, {'format': 'parquet'}).status_code, 202)
+        self.wait_for_export('parquet')
+        self.assertEqual(os.listdir(export.export_dir()), [f'{self.shapefile.pk}-p1.parquet'])
+        self.assertEqual(len(gpd.read_parquet(export.export_path(self.shapefile.pk, 'p1', 'parquet'))), 3)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get(self.url, {'format': 'kml'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_shapefile', args=[999])).status_code, 404)
+        shapefile = Shapefile.objects.create(name='unprocessed')
+        self.assertEqual(self.client.get(reverse('export_shapefile', args=[shapefile.pk])).status_code, 404)
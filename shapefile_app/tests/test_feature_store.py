@@ -0,0 +1,69 @@
+import json
+
+import shapely
+from django.test import SimpleTestCase, override_settings
+
+from shapefile_app.tests.test_validation import feature
+from shapefile_app.utils import feature_store
+from shapefile_app.utils.feature_store import FeatureStore
+
+
+class FeatureStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.features = [
+            feature(shapely.box(0, 0, 1, 1), id=7, name='a', area=1.5, flag=True),
+            feature(shapely.box(1, 0, 2, 1), id=None, name=None, area=2.0, flag=False),
+            feature(shapely.box(2, 0, 3, 1), id=9, name='c'),
+        ]
+        self.store = FeatureStore.from_features(self.features)
+
+    def test_round_trip_keeps_types_and_keys(self):
+        self.assertEqual(self.store.records(), [f['properties'] for f in self.features])
+        for original, out in zip(self.features, self.store.features()):
+            self.assertTrue(shapely.from_geojson(json.dumps(out['geometry'])).equals(shapely.from_geojson(json.dumps(original['geometry']))))
+        self.assertEqual(str(self.store.properties['id'].dtype), 'Int64')
+        self.assertEqual(str(self.store.properties['flag'].dtype), 'boolean')
+
+    def test_replace_keeps_order_and_absent_keys(self):
+        edited = self.store.replace([0], [shapely.box(5, 5, 6, 6)], [{'name': 'new'}])
+        self.assertEqual([f['id'] for f in edited.features()], [0, 1, 2])
+        self.assertEqual(edited.records(), [self.features[1]['properties'], self.features[2]['properties'], {'name': 'new'}])
+        # The store it came from is unchanged
+        self.assertEqual(len(self.store), 3)
+
+    def test_take(self):
+        self.assertEqual(self.store.take([2, 0]).records(), [self.features[2]['properties'], self.features[0]['properties']])
+
+    def test_query_bbox(self):
+        self.assertEqual(self.store.query_bbox(1.5, 0.5, 2.5, 0.6).tolist(), [1, 2])
+
+    def test_geojson_of_some_features_keeps_positions_as_ids(self):
+        collection = json.loads(self.store.to_geojson_text([2, 0]))
+        self.assertEqual([f['id'] for f in collection['features']], [2, 0])
+        self.assertEqual(collection['features'][0]['properties'], self.features[2]['properties'])
+
+    def test_missing_geometry(self):
+        store = FeatureStore.from_features([{'type': 'Feature', 'geometry': None, 'properties': {}}])
+        self.assertIsNone(store.features()[0]['geometry'])
+
+    def test_is_polygonal(self):
+        self.assertTrue(self.store.is_polygonal())
+        mixed = self.store.replace([], [shapely.Point(0, 0)], [{}])
+        self.assertFalse(mixed.is_polygonal())
+
+
+@override_settings(FEATURE_CACHE_SIZE=2)
+class FeatureCacheTests(SimpleTestCase):
+    def setUp(self):
+        feature_store._cache.clear()
+        self.addCleanup(feature_store._cache.clear)
+
+    def test_least_recently_used_is_dropped(self):
+        stores = [FeatureStore([shapely.box(0, 0, 1, 1)]) for _ in range(3)]
+        feature_store.cache_put('a', stores[0])
+        feature_store.cache_put('b', stores[1])
+        self.assertIs(feature_store.cache_get('a'), stores[0])
+        feature_store.cache_put('c', stores[2])
+        self.assertIsNone(feature_store.cache_get('b'))
+        self.assertIs(feature_store.cache_get('a'), stores[0])
+        self.assertIs(feature_store.cache_get('c'), stores[2])
@@ -0,0 +1,152 @@
+import importlib.util
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from shapefile_app.models import Shapefile
+from shapefile_app.utils.ingest import convert_upload, find_layers, layer_features
+from shapefile_app.utils.synthetic import parcels_gdf, shapefile_zip
+
+HAS_OGR = importlib.util.find_spec('osgeo') is not None
+
+
+def two_layer_zip():
+    """A ZIP holding the layers `parcels` (9 polygons) and `empty` (no features)"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_ref:
+        for gdf, name in ((parcels_gdf(9), 'parcels'), (parcels_gdf(9).iloc[:0], 'empty')):
+            with zipfile.ZipFile(shapefile_zip(gdf, name)) as layer_zip:
+                for member in layer_zip.namelist():
+                    zip_ref.writestr(f'{name}/{member}', layer_zip.read(member))
+    buffer.seek(0)
+    buffer.name = 'layers.zip'
+    return buffer
+
+
+@override_settings(GEOMETRY_WORKERS=0)
+class ZipIngestTests(SimpleTestCase):
+    def test_find_layers(self):
+        names = ['a/roads.shp', 'a/roads.dbf', '__MACOSX/a/._roads.shp', 'b/Parcels.SHP', 'readme.txt']
+        self.assertEqual(find_layers(names), ['a/roads.shp', 'b/Parcels.SHP'])
+
+    def test_invalid_zip(self):
+        with self.assertRaisesMessage(ValueError, 'Invalid ZIP file'):
+            convert_upload(io.BytesIO(b'not a zip'), name='layers.zip')
+
+    def test_zip_without_shapefile(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zip_ref:
+            zip_ref.writestr('readme.txt', 'no layers here')
+        with self.assertRaisesMessage(ValueError, 'No .shp file'):
+            convert_upload(buffer, name='layers.zip')
+
+    def test_unsupported_extension(self):
+        with self.assertRaisesMessage(ValueError, 'Unsupported file type'):
+            convert_upload(io.BytesIO(b''), name='layers.txt')
+
+    def test_each_layer_is_converted(self):
+        if not HAS_OGR:
+            self.skipTest('reading shapefiles needs the GDAL Python bindings (osgeo)')
+        parcels, empty = convert_upload(two_layer_zip())
+        self.assertEqual(parcels['layer'], 'parcels')
+        self.assertIsNone(parcels['error'])
+        self.assertEqual(len(layer_features(parcels)), 9)
+        self.assertEqual(parcels['report']['features_out'], 9)
+        # A layer that fails does not stop the others
+        self.assertEqual(empty['layer'], 'empty')
+        self.assertIsNotNone(empty['error'])
+
+
+@override_settings(GEOMETRY_WORKERS=0)
+class ColumnarIngestTests(SimpleTestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        # A bowtie to repair and a point to keep, in a projected CRS
+        gdf = parcels_gdf(9).to_crs('epsg:28350')
+        extra = gpd.GeoDataFrame({'parcel_id': [9, 10], 'name': ['Bowtie', 'Point'], 'zone': [0, 0]}, geometry=[
+            shapely.Polygon([(400000, 6200000), (400010, 6200010), (400010, 6200000), (400000, 6200010)]),
+            shapely.Point(400000, 6200000),
+        ], crs=gdf.crs)
+        self.gdf = pd.concat([gdf, extra], ignore_index=True)
+
+    def path(self, name):
+        return os.path.join(self.temp_dir, name)
+
+    def check_layer(self, layer, name):
+        self.assertEqual(layer['layer'], name)
+        self.assertIsNone(layer['error'])
+        self.assertEqual(layer['report']['features_out'], 11)
+        self.assertEqual((layer['report']['repaired'], layer['report']['non_polygon']), (1, 1))
+
+        features = layer_features(layer)
+        # FlatGeobuf stores features in spatial index order
+        order = np.argsort([record['parcel_id'] for record in features.records()])
+        features = features.take(order)
+        self.assertEqual([record['parcel_id'] for record in features.records()], list(range(11)))
+        self.assertEqual([record['geom_valid'] for record in features.records()], [True] * 9 + [False, True])
+        self.assertEqual(features.geometries[9].geom_type, 'MultiPolygon')
+        # Reprojected to WGS84
+        minx, miny, maxx, maxy = shapely.total_bounds(features.geometries)
+        self.assertTrue(-180 <= minx <= maxx <= 180 and -90 <= miny <= maxy <= 90)
+
+    def test_geoparquet(self):
+        self.gdf.to_parquet(self.path('parcels.parquet'))
+        [layer] = convert_upload(self.path('parcels.parquet'))
+        self.check_layer(layer, 'parcels')
+
+    def test_flatgeobuf(self):
+        self.gdf.to_file(self.path('parcels.fgb'), driver='FlatGeobuf')
+        [layer] = convert_upload(self.path('parcels.fgb'))
+        self.check_layer(layer, 'parcels')
+
+    def test_each_geopackage_table_is_a_layer(self):
+        self.gdf.to_file(self.path('layers.gpkg'), layer='parcels', driver='GPKG')
+        self.gdf.iloc[:0].to_file(self.path('layers.gpkg'), layer='empty', driver='GPKG')
+        parcels, empty = convert_upload(self.path('layers.gpkg'))
+        self.check_layer(parcels, 'parcels')
+        self.assertEqual(empty['layer'], 'empty')
+        self.assertEqual(empty['error'], 'No valid geometries found')
+        self.assertIsNone(layer_features(empty))
+
+
+@override_settings(GEOMETRY_WORKERS=0)
+class UploadFormTests(TestCase):
+    def upload(self):
+        buffer = io.BytesIO()
+        parcels_gdf(9).to_parquet(buffer)
+        upload = SimpleUploadedFile('parcels.parquet', buffer.getvalue())
+        return self.client.post(reverse('upload_shapefile'), {'name': 'parcels', 'shapefile_zip': upload})
+
+    def check_saved(self):
+        shapefile = Shapefile.objects.get()
+        self.assertEqual(shapefile.name, 'parcels')
+        self.assertEqual(shapefile.validation_report['features_out'], 9)
+        records = shapefile.layer_features('original').records()
+        self.assertEqual(records[0], {'parcel_id': 0, 'name': 'Parcel 0', 'zone': 0, 'geom_valid': True})
+        return shapefile
+
+    @override_settings(LAYER_STORAGE='database')
+    def test_upload_to_database(self):
+        self.assertEqual(self.upload().status_code, 302)
+        shapefile = self.check_saved()
+        self.assertEqual(len(shapefile.geojson_data['features']), 9)
+
+    def test_upload_to_layer_store(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        with self.settings(LAYER_STORAGE='arrow', MEDIA_ROOT=media_root):
+            self.assertEqual(self.upload().status_code, 302)
+            shapefile = self.check_saved()
+            self.assertTrue(shapefile.original_store)
@@ -0,0 +1,81 @@
+import json
+import os
+import shutil
+import tempfile
+
+import pyarrow as pa
+import shapely
+from django.test import SimpleTestCase, override_settings
+
+from shapefile_app.tests.test_validation import feature
+from shapefile_app.utils import layer_store
+from shapefile_app.utils.feature_store import FeatureStore
+
+
+class LayerStoreTests(SimpleTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.features = [
+            feature(shapely.box(0, 0, 1, 1), id=7, name='a', area=1.5, flag=True, merged=['0', '1']),
+            feature(shapely.box(1, 0, 2, 1), id=None, name=None, area=2.0, flag=False, merged=None),
+            feature(shapely.box(2, 0, 3, 1), id=9, name='c'),
+        ]
+
+    def round_trip(self, features):
+        store = FeatureStore.from_features(features)
+        path = layer_store.write_store(1, 'processed', 3, store)
+        return store, path, layer_store.read_store(path)
+
+    def test_round_trip(self):
+        store, path, read = self.round_trip(self.features)
+        self.assertEqual(read.records(), [f['properties'] for f in self.features])
+        self.assertTrue(all(shapely.equals_exact(a, b) for a, b in zip(read.geometries, store.geometries)))
+        self.assertEqual(layer_store.feature_collection(path), store.to_feature_collection())
+
+    def test_properties_are_parsed_in_bulk(self):
+        _, path, read = self.round_trip(self.features)
+        self.assertIsNotNone(layer_store.read_properties(layer_store.read_table(path)))
+        self.assertEqual(
+            {column: str(dtype) for column, dtype in read.properties.dtypes.items() if column != 'name'},
+            {'id': 'Int64', 'area': 'float64', 'flag': 'boolean', 'merged': 'object'},
+        )
+        self.assertEqual(read.absent.to_dict('list')['area'], [False, False, True])
+        # Edits on a layer read back keep the keys a feature lacks
+        edited = read.replace([0], [shapely.box(5, 5, 6, 6)], [{'name': 'new'}])
+        self.assertEqual(edited.records(), [self.features[1]['properties'], self.features[2]['properties'], {'name': 'new'}])
+
+    def test_values_arrow_would_change_are_parsed_row_by_row(self):
+        for properties in ({'when': '2024-01-31T10:00:00'}, {'tags': {'a': 1}}, {'code': 1}):
+            features = [feature(shapely.box(0, 0, 1, 1), **properties), feature(shapely.box(1, 0, 2, 1), code='A1')]
+            with self.subTest(properties=properties):
+                _, path, read = self.round_trip(features)
+                self.assertIsNone(layer_store.read_properties(layer_store.read_table(path)))
+                self.assertEqual(read.records(), [f['properties'] for f in features])
+
+    def test_files_without_absent_keys_marker(self):
+        # Written before the absent column: a null and a missing key look alike
+        path = 'layers/1/processed-v0-old.arrow'
+        os.makedirs(layer_store.layer_dir(1))
+        old = pa.table({
+            'geometry': pa.array(shapely.to_wkb([shapely.box(0, 0, 1, 1)] * 2), pa.binary()),
+            'properties': pa.array(['{"a":1,"b":null}', '{"a":2}'], pa.string()),
+        }, metadata={'crs': 'EPSG:4326', 'encoding': 'WKB'})
+        with pa.OSFile(layer_store.full_path(path), 'wb') as sink, pa.ipc.new_file(sink, old.schema) as writer:
+            writer.write_table(old)
+        self.assertEqual(layer_store.read_store(path).records(), [{'a': 1, 'b': None}, {'a': 2}])
+        self.assertEqual(json.loads(layer_store.geojson_text(path))['features'][1]['properties'], {'a': 2})
+
+    def test_empty_layer(self):
+        _, path, read = self.round_trip([])
+        self.assertEqual(len(read), 0)
+        self.assertEqual(layer_store.feature_collection(path), {'type': 'FeatureCollection', 'features': []})
+
+    def test_join_uses_64_bit_offsets(self):
+        # A string result would overflow its offsets past 2 GB
+        joined = layer_store._join(pa.chunked_array([['a', 'b'], ['c']]), ',')
+        self.assertEqual(joined.type, pa.large_string())
+        self.assertEqual(joined.as_py(), 'a,b,c')
@@ -0,0 +1,54 @@
+import numpy as np
+import shapely
+from django.test import SimpleTestCase, override_settings
+
+from shapefile_app.utils.overlay import BASE, CUT, overlay_geometries, overlay_partitioned, tile_keys
+from shapefile_app.utils.synthetic import grid_polygons
+
+
+class OverlayTests(SimpleTestCase):
+    def setUp(self):
+        self.source = np.array([shapely.box(0, 0, 10, 10), shapely.box(20, 0, 30, 10), shapely.box(10, 0, 20, 10)])
+        # Two historical polygons over the first source, none over the second
+        self.hist = np.array([shapely.box(-5, -5, 4, 15), shapely.box(6, 2, 8, 4)])
+
+    def test_pieces(self):
+        geoms, source_index, hist_index, origin = overlay_geometries(self.source, self.hist)
+        self.assertEqual(source_index.tolist(), [0, 0, 0, 1, 2])
+        self.assertEqual(hist_index.tolist(), [-1, 0, 1, -1, -1])
+        self.assertEqual(origin.tolist(), [BASE, CUT, CUT, BASE, BASE])
+        self.assertEqual(shapely.area(geoms).tolist(), [56.0, 40.0, 4.0, 100.0, 100.0])
+        self.assertTrue(all(geom.geom_type == 'Polygon' for geom in geoms))
+
+    def test_pieces_cover_each_source(self):
+        geoms, source_index, _, _ = overlay_geometries(self.source, self.hist)
+        for i, source in enumerate(self.source):
+            self.assertAlmostEqual(shapely.union_all(geoms[source_index == i]).symmetric_difference(source).area, 0)
+
+    def test_min_area_drops_small_pieces(self):
+        _, _, hist_index, _ = overlay_geometries(self.source, self.hist, min_area=5)
+        self.assertNotIn(1, hist_index.tolist())
+
+    def test_multipart_pieces_are_exploded(self):
+        # A U-shaped historical polygon: two strips of the source inside it, three outside
+        hist = np.array([shapely.Polygon([(2, -1), (4, -1), (4, 11), (6, 11), (6, -1), (8, -1), (8, 12), (2, 12)])])
+        geoms, source_index, _, origin = overlay_geometries(self.source[:1], hist)
+        self.assertEqual(origin.tolist(), [BASE] * 3 + [CUT] * 2)
+        self.assertEqual(source_index.tolist(), [0] * len(geoms))
+
+
+@override_settings(GEOMETRY_WORKERS=0)
+class PartitionedOverlayTests(SimpleTestCase):
+    def test_tiles_give_the_same_pieces(self):
+        source = grid_polygons(12, 12, size=10.0)
+        hist = np.array([shapely.Point(40, 40).buffer(25), shapely.box(85, -5, 95, 130)])
+        whole = overlay_geometries(source, hist, min_area=1e-6)
+        tiled = overlay_partitioned(source, hist, tile_size=10, min_area=1e-6)
+        for a, b in zip(whole[1:], tiled[1:]):
+            self.assertEqual(a.tolist(), b.tolist())
+        self.assertTrue(all(shapely.equals_exact(a, b) for a, b in zip(whole[0], tiled[0])))
+
+    def test_tile_keys(self):
+        keys = tile_keys(grid_polygons(10, 10), tile_size=25)
+        self.assertEqual(len(np.unique(keys)), 4)
+        self.assertEqual(np.bincount(keys).tolist(), [25] * 4)
@@ -0,0 +1,83 @@
+import json
+
+import numpy as np
+import shapely
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from shapefile_app.models import Shapefile
+from shapefile_app.tests.test_validation import feature
+from shapefile_app.utils.slivers import find_slivers, merge_targets, union_groups
+
+
+class SliverTests(SimpleTestCase):
+    def setUp(self):
+        self.geoms = np.array([
+            shapely.box(0, 0, 10, 10),
+            shapely.box(10, 0, 20, 10),
+            shapely.box(20, 0, 20.1, 10),    # sliver along polygon 1
+            shapely.box(20.1, 0, 20.2, 10),  # sliver touching only the other sliver
+            shapely.box(50, 50, 50.1, 60),   # island sliver
+        ])
+
+    def test_find_slivers(self):
+        self.assertEqual(find_slivers(self.geoms, min_thinness=0.05).tolist(), [False, False, True, True, True])
+        self.assertEqual(find_slivers(self.geoms, min_area=50).tolist(), [False, False, True, True, True])
+        self.assertFalse(find_slivers(self.geoms).any())
+
+    def test_targets(self):
+        target = merge_targets(self.geoms, find_slivers(self.geoms, min_thinness=0.05))
+        self.assertEqual(target.tolist(), [-1, -1, 1, 1, -1])
+
+    def test_union_groups(self):
+        target = merge_targets(self.geoms, find_slivers(self.geoms, min_thinness=0.05))
+        targets, merged, groups = union_groups(self.geoms, target)
+        self.assertEqual(targets.tolist(), [1])
+        self.assertEqual(groups, [[2, 3]])
+        self.assertTrue(merged[0].equals(shapely.box(10, 0, 20.2, 10)))
+
+
+@override_settings(GEOMETRY_WORKERS=0, CRS='epsg:4326')
+class SliverViewTests(TestCase):
+    def setUp(self):
+        # Two ~92 x 111 m parcels, a ~1 m wide strip along the second and a
+        # strip on its own, all of about 100 m²
+        geometries = [
+            shapely.box(115.900, -34.200, 115.901, -34.199),
+            shapely.box(115.901, -34.200, 115.902, -34.199),
+            shapely.box(115.902, -34.200, 115.90201, -34.199),
+            shapely.box(115.910, -34.200, 115.91001, -34.199),
+        ]
+        collection = {'type': 'FeatureCollection', 'features': [feature(geometry, n=i) for i, geometry in enumerate(geometries)]}
+        self.shapefile = Shapefile(name='slivers')
+        self.shapefile.set_original(collection)
+        self.shapefile.set_processed(collection)
+        self.shapefile.save()
+        self.url = reverse('merge_slivers', args=[self.shapefile.pk])
+
+    def test_list_slivers(self):
+        self.assertEqual(self.client.get(self.url).json()['slivers'], [2, 3])
+        # Areas are in square metres of CRS_GDA94
+        self.assertEqual(self.client.get(self.url, {'min_area': 150, 'min_thinness': 0}).json()['slivers'], [2, 3])
+        self.assertEqual(self.client.get(self.url, {'min_area': 50, 'min_thinness': 0}).json()['slivers'], [])
+
+    def test_merge_slivers(self):
+        response = self.client.post(self.url, '{}', content_type='application/json')
+        data = response.json()
+        self.assertEqual(data['success'], True)
+        self.assertIn('1 sliver(s) have no neighbour', data['message'])
+
+        features = Shapefile.objects.get(pk=self.shapefile.pk).processed_features()
+        records = features.records()
+        self.assertEqual([record['n'] for record in records], [0, 3, 1])
+        self.assertEqual(records[-1]['merged_slivers'], [2])
+        self.assertTrue(features.geometries[-1].equals(shapely.box(115.901, -34.200, 115.90201, -34.199)))
+
+    def test_no_slivers(self):
+        response = self.client.post(self.url, json.dumps({'min_thinness': 0, 'min_area': 0}), content_type='application/json')
+        self.assertEqual(response.json()['success'], False)
+
+    def test_invalid_thresholds(self):
+        response = self.client.post(self.url, json.dumps({'min_thinness': 2}), content_type='application/json')
+        self.assertEqual(response.json()['success'], False)
+        self.assertIn('Invalid sliver thresholds', response.json()['message'])
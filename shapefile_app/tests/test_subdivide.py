@@ -0,0 +1,74 @@
+import numpy as np
+import shapely
+from django.test import SimpleTestCase, override_settings
+
+from shapefile_app.models import Shapefile, area_m2
+from shapefile_app.tests.test_views import EditViewTestCase
+from shapefile_app.utils.subdivide import subdivide
+
+
+class SubdivideTests(SimpleTestCase):
+    def test_grid_cells(self):
+        pieces, source = subdivide([shapely.box(0, 0, 100, 100), shapely.box(200, 0, 250, 50)], 'grid', 50.0)
+        self.assertEqual(len(pieces), 5)
+        self.assertEqual(np.bincount(source).tolist(), [4, 1])
+        self.assertTrue(all(piece.geom_type == 'Polygon' for piece in pieces))
+        self.assertAlmostEqual(shapely.area(pieces[source == 0]).sum(), 10000.0)
+
+    def test_equal_area_strips(self):
+        triangle = shapely.Polygon([(0, 0), (100, 0), (0, 40)])
+        pieces, source = subdivide([triangle], 'strips', 4)
+        self.assertEqual(len(pieces), 4)
+        np.testing.assert_allclose(shapely.area(pieces), 500.0, rtol=1e-5)
+        self.assertLess(shapely.union_all(pieces).symmetric_difference(triangle).area, 1e-6)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            subdivide([shapely.box(0, 0, 1, 1)], 'hexagons', 1)
+
+
+class SubdivideViewTests(EditViewTestCase):
+    def test_strips(self):
+        original = self.shapefile.processed_features()
+        response = self.post('subdivide_polygons', {'selected_features': ['0', '5'], 'mode': 'strips', 'parts': 4})
+        self.assertEqual(response.json()['success'], True)
+
+        features = self.processed()
+        self.assertEqual(len(features), 22)
+        pieces = features.take(range(14, 22))
+        records = pieces.records()
+        self.assertEqual([record['subdivided_from'] for record in records], [0] * 4 + [5] * 4)
+        self.assertEqual([record['part'] for record in records], [1, 2, 3, 4] * 2)
+        self.assertEqual(records[0]['parcel_id'], 0)
+        # Equal areas in metres, measured in CRS_GDA94
+        expected = area_m2(original.geometries[[0, 5]]) / 4
+        np.testing.assert_allclose([record['area_m2'] for record in records], np.repeat(expected, 4), rtol=1e-3)
+
+    def test_grid(self):
+        polygon = self.shapefile.processed_features().geometries[0]
+        response = self.post('subdivide_polygons', {'selected_features': ['0'], 'mode': 'grid', 'cell_size': 50})
+        self.assertEqual(response.json()['success'], True)
+        pieces = self.processed().take(range(15, len(self.processed())))
+        self.assertGreater(len(pieces), 4)
+        self.assertLess(shapely.union_all(pieces.geometries).symmetric_difference(polygon).area, 1e-12)
+        self.assertLessEqual(max(record['area_m2'] for record in pieces.records()), 2500.1)
+
+    @override_settings(SUBDIVIDE_MAX_PARTS=10)
+    def test_part_limit(self):
+        response = self.post('subdivide_polygons', {'selected_features': ['0'], 'mode': 'grid', 'cell_size': 10})
+        self.assertEqual(response.json()['success'], False)
+        self.assertIn('limit 10', response.json()['message'])
+        self.assertEqual(len(self.processed()), 16)
+
+    def test_invalid_values(self):
+        for body in ({'mode': 'strips', 'parts': 1}, {'mode': 'grid', 'cell_size': -5}, {'mode': 'hexagons', 'cell_size': 5}):
+            with self.subTest(body=body):
+                response = self.post('subdivide_polygons', dict(body, selected_features=['0']))
+                self.assertEqual(response.json()['success'], False)
+        self.assertEqual(self.post('subdivide_polygons', {'selected_features': ['0'], 'mode': 'strips'}).status_code, 400)
+
+    async def test_async_subdivide(self):
+        response = await self.apost('subdivide_polygons_async', {'selected_features': ['3'], 'mode': 'strips', 'parts': 2})
+        self.assertEqual(response.json()['success'], True)
+        shapefile = await Shapefile.objects.aget(pk=self.shapefile.pk)
+        self.assertEqual(shapefile.processed_version, 1)
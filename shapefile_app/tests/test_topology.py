@@ -0,0 +1,51 @@
+import numpy as np
+import shapely
+from django.test import SimpleTestCase, override_settings
+
+from shapefile_app.utils.topology import build_topology, merge, replace_geometries, to_shapely, to_topojson
+
+
+@override_settings(GEOMETRY_WORKERS=0)
+class TopologyTests(SimpleTestCase):
+    def setUp(self):
+        # Two squares sharing the edge x=1, and a separate one
+        self.geoms = np.array([shapely.box(0, 0, 1, 1), shapely.box(1, 0, 2, 1), shapely.box(5, 5, 6, 6)])
+        self.topology = build_topology(self.geoms)
+
+    def test_shared_edge_is_stored_once(self):
+        refs = [ref for polygons in self.topology['geometries'][:2] for rings in polygons for ring in rings for ref in ring]
+        arc_ids = [ref if ref >= 0 else ~ref for ref in refs]
+        self.assertEqual(len(arc_ids) - len(set(arc_ids)), 1)
+
+    def test_geometries_decode_exactly(self):
+        for geom, polygons in zip(self.geoms, self.topology['geometries']):
+            self.assertTrue(shapely.equals_exact(shapely.normalize(to_shapely(self.topology, polygons)), shapely.normalize(geom)))
+
+    def test_merge_removes_shared_arcs(self):
+        merged, polygons = merge(self.topology, [0, 1])
+        self.assertEqual(merged.geom_type, 'Polygon')
+        self.assertAlmostEqual(merged.area, 2.0)
+        self.assertTrue(merged.equals(shapely.box(0, 0, 2, 1)))
+        self.assertEqual(len(polygons), 1)
+
+    def test_merge_disjoint_gives_multipolygon(self):
+        merged, polygons = merge(self.topology, [0, 2])
+        self.assertEqual(merged.geom_type, 'MultiPolygon')
+        self.assertEqual(len(polygons), 2)
+
+    def test_replace_geometries_drops_unused_arcs(self):
+        _, polygons = merge(self.topology, [0, 1])
+        replaced = replace_geometries(self.topology, [0, 1], [polygons])
+        self.assertEqual(len(replaced['geometries']), 2)
+        self.assertTrue(to_shapely(replaced, replaced['geometries'][1]).equals(shapely.box(0, 0, 2, 1)))
+        self.assertLess(len(replaced['arcs']), len(self.topology['arcs']))
+
+    def test_topojson_of_non_polygons(self):
+        topology = build_topology(np.array([shapely.box(0, 0, 1, 1), shapely.Point(3, 3)]))
+        self.assertIsNone(topology['geometries'][1])
+        topojson = to_topojson(topology, [{'a': 1}, {'a': 2}])
+        geometries = topojson['objects']['layer']['geometries']
+        self.assertEqual(geometries[0]['type'], 'Polygon')
+        self.assertEqual(geometries[1]['type'], 'GeometryCollection')
+        self.assertEqual(geometries[1]['properties'], {'a': 2})
+
@@ -0,0 +1,80 @@
+import json
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from shapefile_app.models import ChunkedUpload
+from shapefile_app.utils.uploads import chunk_error, parse_content_range
+
+
+class ContentRangeTests(SimpleTestCase):
+    def test_parse_content_range(self):
+        self.assertEqual(parse_content_range('bytes 0-9/20'), (0, 9, 20))
+        for header in (None, '', 'bytes 0-9', 'bytes a-9/20', 'items 0-9/20'):
+            self.assertIsNone(parse_content_range(header))
+
+    def test_chunk_offsets(self):
+        self.assertIsNone(chunk_error(0, 9, 0, 20))
+        self.assertIsNone(chunk_error(5, 19, 10, 20))  # retried overlap
+        self.assertIn('only 10 bytes', chunk_error(11, 19, 10, 20))  # gap
+        self.assertIn('outside', chunk_error(10, 20, 10, 20))
+        self.assertIn('outside', chunk_error(9, 8, 10, 20))
+
+
+class ChunkedUploadViewTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, CHUNKED_UPLOAD_MAX_SIZE=100)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.data = bytes(range(20))
+
+    def start(self, filename='parcels.zip', size=20):
+        return self.client.post(reverse('chunked_upload'), json.dumps({'filename': filename, 'size': size}), content_type='application/json')
+
+    def put(self, url, start, end, size=20, content_range=None):
+        return self.client.put(
+            url, self.data[start:end + 1], content_type='application/octet-stream',
+            headers={'Content-Range': content_range or f'bytes {start}-{end}/{size}'},
+        )
+
+    def test_upload_in_chunks(self):
+        response = self.start()
+        self.assertEqual(response.status_code, 201)
+        url = response.json()['url']
+
+        response = self.put(url, 0, 9)
+        self.assertEqual(response.json(), {'success': True, 'message': 'Received 10 of 20 bytes', 'received': 10, 'complete': False})
+        # A retried chunk may overlap what was received
+        self.assertEqual(self.put(url, 5, 19).json()['complete'], True)
+
+        self.assertEqual(self.client.get(url).json(), {'success': True, 'received': 20, 'size': 20, 'complete': True})
+        upload = ChunkedUpload.objects.get()
+        with open(upload.path, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_gap_is_refused(self):
+        url = self.start().json()['url']
+        self.put(url, 0, 4)
+        response = self.put(url, 10, 19)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['received'], 5)
+
+    def test_bad_content_range(self):
+        url = self.start().json()['url']
+        self.assertEqual(self.put(url, 0, 9, content_range='bytes 0-9').status_code, 400)
+        self.assertEqual(self.put(url, 0, 9, size=30).status_code, 400)
+
+    def test_bad_start_requests(self):
+        self.assertEqual(self.start(size=101).status_code, 413)
+        self.assertEqual(self.start(filename='parcels.txt').status_code, 400)
+        self.assertEqual(self.start(size=0).status_code, 400)
+        self.assertEqual(self.client.post(reverse('chunked_upload'), 'x', content_type='application/json').status_code, 400)
+
+    def test_unknown_upload(self):
+        url = reverse('chunked_upload_chunk', args=['00000000-0000-0000-0000-000000000000'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.put(url, 0, 9).status_code, 404)
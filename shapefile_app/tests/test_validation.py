@@ -0,0 +1,83 @@
+import json
+
+import shapely
+from django.test import SimpleTestCase
+
+from shapefile_app.utils.validation import MAX_REPORTED_ISSUES, repair_polygons, validate_features, validate_geodataframe
+
+
+def feature(geometry, **properties):
+    return {'type': 'Feature', 'geometry': json.loads(shapely.to_geojson(geometry)), 'properties': properties}
+
+
+BOWTIE = shapely.Polygon([(0, 0), (2, 2), (2, 0), (0, 2)])
+FLAT = shapely.Polygon([(0, 0), (1, 1), (2, 2)])
+
+
+class RepairTests(SimpleTestCase):
+    def test_repair_polygons(self):
+        repaired, was_valid, reasons = repair_polygons([BOWTIE, shapely.box(0, 0, 1, 1), FLAT])
+        self.assertEqual(was_valid.tolist(), [False, True, False])
+        self.assertEqual(repaired[0].geom_type, 'MultiPolygon')
+        self.assertAlmostEqual(repaired[0].area, 2.0)
+        self.assertTrue(repaired[1].equals(shapely.box(0, 0, 1, 1)))
+        self.assertIsNone(repaired[2])
+        self.assertIsNone(reasons[1])
+        self.assertTrue(reasons[0].startswith('Self-intersection'))
+
+
+class ValidateFeaturesTests(SimpleTestCase):
+    def setUp(self):
+        self.features = [
+            feature(BOWTIE, n=0),
+            feature(shapely.box(0, 0, 1, 1), n=1),
+            feature(shapely.Point(3, 3), n=2),
+            feature(FLAT, n=3),
+            {'type': 'Feature', 'geometry': None, 'properties': {'n': 4}},
+        ]
+
+    def test_repair(self):
+        out, report = validate_features(self.features)
+        self.assertEqual([f['properties']['n'] for f in out], [0, 1, 2])
+        self.assertEqual(out[0]['geometry']['type'], 'MultiPolygon')
+        self.assertEqual([f['properties']['geom_valid'] for f in out], [False, True, True])
+        # Valid polygons and non-polygons keep the geometry they were uploaded with
+        self.assertEqual(out[1]['geometry'], self.features[1]['geometry'])
+        self.assertEqual(out[2]['geometry'], self.features[2]['geometry'])
+
+    def test_report(self):
+        _, report = validate_features(self.features)
+        self.assertEqual(
+            {key: report[key] for key in ('features_in', 'features_out', 'invalid', 'repaired', 'dropped', 'non_polygon')},
+            {'features_in': 5, 'features_out': 3, 'invalid': 2, 'repaired': 1, 'dropped': 2, 'non_polygon': 1},
+        )
+        self.assertEqual(
+            [(issue['feature'], issue['action']) for issue in report['issues']],
+            [(0, 'repaired'), (2, 'kept'), (3, 'dropped')],
+        )
+
+    def test_non_polygon_layer_is_kept(self):
+        out, report = validate_features([feature(shapely.LineString([(0, 0), (1, 1)])), feature(shapely.Point(0, 0))])
+        self.assertEqual(len(out), 2)
+        self.assertEqual((report['non_polygon'], report['dropped']), (2, 0))
+
+    def test_issue_list_is_capped(self):
+        _, report = validate_features([feature(BOWTIE)] * (MAX_REPORTED_ISSUES + 5))
+        self.assertEqual(report['repaired'], MAX_REPORTED_ISSUES + 5)
+        self.assertEqual(len(report['issues']), MAX_REPORTED_ISSUES)
+
+    def test_unparsable_geometry_is_dropped(self):
+        out, report = validate_features([{'type': 'Feature', 'geometry': {'type': 'Polygon', 'coordinates': 'x'}, 'properties': {}}])
+        self.assertEqual(out, [])
+        self.assertEqual(report['issues'], [{'feature': 0, 'reason': 'Unreadable geometry', 'action': 'dropped'}])
+
+    def test_geodataframe_matches_features(self):
+        import geopandas as gpd
+
+        geometries = [shapely.from_geojson(json.dumps(f['geometry'])) if f['geometry'] else None for f in self.features]
+        wkb, properties, report = validate_geodataframe(gpd.GeoDataFrame({'n': range(5)}, geometry=geometries))
+        out, expected_report = validate_features(self.features)
+        self.assertEqual(report, expected_report)
+        self.assertEqual(properties.to_dict('records'), [f['properties'] for f in out])
+        for geometry, f in zip(shapely.from_wkb(wkb), out):
+            self.assertTrue(geometry.equals(shapely.from_geojson(json.dumps(f['geometry']))))
@@ -0,0 +1,207 @@
+import json
+
+import shapely
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from shapefile_app.models import HistoricalLayer, Shapefile, area_m2
+from shapefile_app.utils import feature_store
+from shapefile_app.utils.synthetic import parcels_gdf
+
+
+def create_shapefile(n=16):
+    """A saved Shapefile whose original and processed layers are n tessellated parcels"""
+    feature_collection = json.loads(parcels_gdf(n).to_json())
+    shapefile = Shapefile(name='parcels')
+    shapefile.set_original(feature_collection)
+    shapefile.set_processed(feature_collection)
+    shapefile.save()
+    return shapefile
+
+
+def cut_line(geometry):
+    """A north-south line through the middle of a polygon, in EPSG:4326"""
+    minx, miny, maxx, maxy = geometry.bounds
+    x = (minx + maxx) / 2
+    return [[x, miny - 0.001], [x, maxy + 0.001]]
+
+
+@override_settings(GEOMETRY_WORKERS=0, CRS='epsg:4326')
+class EditViewTestCase(TestCase):
+    def setUp(self):
+        self.shapefile = create_shapefile()
+
+    def post(self, name, body, pk=None):
+        url = reverse(name, args=[pk or self.shapefile.pk])
+        return self.client.post(url, json.dumps(body), content_type='application/json')
+
+    async def apost(self, name, body, pk=None):
+        url = reverse(name, args=[pk or self.shapefile.pk])
+        return await self.async_client.post(url, json.dumps(body), content_type='application/json')
+
+    def processed(self):
+        return Shapefile.objects.get(pk=self.shapefile.pk).processed_features()
+
+
+class MergeViewTests(EditViewTestCase):
+    def test_merge(self):
+        response = self.post('merge_polygons', {'selected_features': ['0', '1']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['success'], True)
+        self.assertEqual(response.json()['version'], 1)
+
+        features = self.processed()
+        self.assertEqual(len(features), 15)
+        original = self.shapefile.processed_features()
+        self.assertTrue(features.geometries[-1].equals(shapely.union(original.geometries[0], original.geometries[1])))
+        self.assertEqual(features.records()[-1]['merged_features'], ['0', '1'])
+
+    def test_merge_ids_in_query_string(self):
+        response = self.client.get(reverse('merge_polygons', args=[self.shapefile.pk]) + '?ids=0,1')
+        self.assertEqual(response.json()['success'], True)
+
+    def test_merge_needs_two_polygons(self):
+        response = self.post('merge_polygons', {'selected_features': ['0']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['success'], False)
+        self.assertEqual(len(self.processed()), 16)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.post('merge_polygons', {}).status_code, 400)
+        self.assertEqual(self.post('merge_polygons', {'selected_features': ['0', '1']}, pk=999).status_code, 404)
+
+    async def test_async_merge(self):
+        response = await self.apost('merge_polygons_async', {'selected_features': ['0', '1']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['success'], True)
+        shapefile = await Shapefile.objects.aget(pk=self.shapefile.pk)
+        self.assertEqual(shapefile.processed_version, 1)
+
+
+class CutViewTests(EditViewTestCase):
+    def test_cut(self):
+        polygon = self.shapefile.processed_features().geometries[0]
+        response = self.post('cut_polygon', {'feature_id': 0, 'cut_line': cut_line(polygon)})
+        self.assertEqual(response.json()['success'], True)
+
+        features = self.processed()
+        self.assertEqual(len(features), 17)
+        self.assertAlmostEqual(shapely.area(features.geometries[-2:]).sum(), polygon.area)
+
+    def test_line_missing_the_polygon(self):
+        response = self.post('cut_polygon', {'feature_id': 0, 'cut_line': [[0, 0], [1, 1]]})
+        self.assertEqual(response.json()['success'], False)
+        self.assertEqual(len(self.processed()), 16)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.post('cut_polygon', {'cut_line': [[0, 0], [1, 1]]}).status_code, 400)
+        self.assertEqual(self.post('cut_polygon', {'feature_id': 'x', 'cut_line': [[0, 0], [1, 1]]}).status_code, 400)
+
+    async def test_async_cut(self):
+        polygon = self.shapefile.processed_features().geometries[3]
+        response = await self.apost('cut_polygon_async', {'feature_id': 3, 'cut_line': cut_line(polygon)})
+        self.assertEqual(response.json()['success'], True)
+        self.assertEqual(response.json()['version'], 1)
+
+
+class OverlayViewTests(EditViewTestCase):
+    def setUp(self):
+        super().setUp()
+        hist = shapely.box(115.9, -34.2, 115.902, -34.198)
+        self.historical = HistoricalLayer.objects.create(name='burns', geojson_data={
+            'type': 'FeatureCollection',
+            'features': [{'type': 'Feature', 'geometry': json.loads(shapely.to_geojson(hist)), 'properties': {}}],
+        })
+
+    def test_overlay(self):
+        response = self.post('overlay_historical', {'historical_layer_id': self.historical.pk})
+        self.assertEqual(response.json()['success'], True)
+        self.assertEqual(response.json()['version'], 1)
+
+        records = self.processed().records()
+        self.assertGreater(len(records), 16)
+        self.assertEqual({record['origin'] for record in records}, {'BASE', 'CUT'})
+        self.assertEqual({record['hist_layer'] for record in records}, {'burns'})
+
+    def test_unknown_historical_layer(self):
+        self.assertEqual(self.post('overlay_historical', {'historical_layer_id': 999}).status_code, 404)
+
+
+@override_settings(GEOMETRY_WORKERS=0, CRS='epsg:4326')
+class TopoJSONViewTests(TestCase):
+    def get(self, shapefile):
+        return self.client.get(reverse('get_shapefile_geojson_processed', args=[shapefile.pk]) + '?format=topojson')
+
+    def test_polygons_come_as_topojson(self):
+        shapefile = create_shapefile()
+        response = self.get(shapefile)
+        self.assertEqual(response['X-Layer-Version'], '0')
+        topojson = response.json()
+        self.assertEqual(topojson['type'], 'Topology')
+        geometries = topojson['objects']['processed']['geometries']
+        self.assertEqual([geometry['id'] for geometry in geometries], list(range(16)))
+
+    def test_points_and_lines_come_as_geojson(self):
+        feature_collection = json.loads(parcels_gdf(4).to_json())
+        feature_collection['features'].append({
+            'type': 'Feature', 'properties': {}, 'geometry': {'type': 'LineString', 'coordinates': [[115.9, -34.2], [115.91, -34.21]]},
+        })
+        shapefile = Shapefile(name='mixed')
+        shapefile.set_original(feature_collection)
+        shapefile.set_processed(feature_collection)
+        shapefile.save()
+
+        response = self.get(shapefile)
+        self.assertEqual(response['X-Layer-Version'], '0')
+        data = response.json()
+        self.assertEqual(data['type'], 'FeatureCollection')
+        self.assertEqual(data['features'][-1]['geometry']['type'], 'LineString')
+
+    def test_no_processed_layer(self):
+        shapefile = Shapefile(name='empty')
+        shapefile.set_original(json.loads(parcels_gdf(4).to_json()))
+        shapefile.save()
+        self.assertEqual(self.get(shapefile).status_code, 404)
+
+
+class CutPreviewViewTests(EditViewTestCase):
+    def setUp(self):
+        super().setUp()
+        feature_store._cache.clear()
+        self.addCleanup(feature_store._cache.clear)
+
+    def test_preview(self):
+        polygon = self.shapefile.processed_features().geometries[0]
+        response = self.post('cut_polygon_preview', {'feature_id': 0, 'cut_line': cut_line(polygon)})
+        data = response.json()
+        self.assertEqual((data['success'], data['version']), (True, 0))
+        self.assertEqual([piece['properties']['part'] for piece in data['pieces']], [1, 2])
+        # Areas are measured in CRS_GDA94, like the overlay's
+        total = sum(piece['properties']['area_m2'] for piece in data['pieces'])
+        self.assertAlmostEqual(total, area_m2([polygon])[0], delta=0.2)
+        # Nothing is saved
+        self.assertEqual(len(self.processed()), 16)
+        self.assertEqual(Shapefile.objects.get(pk=self.shapefile.pk).processed_version, 0)
+
+    def test_repeat_previews_use_the_cached_layer(self):
+        polygon = self.shapefile.processed_features().geometries[0]
+        self.post('cut_polygon_preview', {'feature_id': 0, 'cut_line': cut_line(polygon)})
+        with self.assertNumQueries(1):
+            response = self.post('cut_polygon_preview', {'feature_id': 0, 'cut_line': cut_line(polygon)})
+        self.assertEqual(response.json()['success'], True)
+
+    def test_preview_follows_edits(self):
+        self.post('merge_polygons', {'selected_features': ['0', '1']})
+        polygon = self.processed().geometries[-1]
+        data = self.post('cut_polygon_preview', {'feature_id': 14, 'cut_line': cut_line(polygon)}).json()
+        self.assertEqual((data['success'], data['version']), (True, 1))
+
+    def test_line_missing_the_polygon(self):
+        data = self.post('cut_polygon_preview', {'feature_id': 0, 'cut_line': [[0, 0], [1, 1]]}).json()
+        self.assertEqual(data['success'], False)
+        self.assertIn('does not cross', data['message'])
+        self.assertEqual(data['pieces'], [])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.post('cut_polygon_preview', {'cut_line': [[0, 0], [1, 1]]}).status_code, 400)
+        self.assertEqual(self.post('cut_polygon_preview', {'feature_id': 0, 'cut_line': [[0, 0], [1, 1]]}, pk=999).status_code, 404)
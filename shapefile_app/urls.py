@@ -1,13 +1,33 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 #from .views import MapView, ShapefileUploadView, ShapefileGeoJSONView, DebugShapefileView, ShapefileProcessedGeoJSONView, MergePolygonsView
 
 urlpatterns = [
     path('', views.MapView.as_view(), name='map_view'),
     path('upload/', views.ShapefileUploadView.as_view(), name='upload_shapefile'),
+    path('upload/chunked/', views.ChunkedUploadView.as_view(), name='chunked_upload'),
+    path('upload/chunked/<uuid:upload_id>/', views.ChunkedUploadChunkView.as_view(), name='chunked_upload_chunk'),
     path('shapefile/<int:pk>/geojson/', views.ShapefileGeoJSONView.as_view(), name='get_shapefile_geojson'),
     path('shapefile/<int:pk>/geojson/processed/', views.ShapefileProcessedGeoJSONView.as_view(), name='get_shapefile_geojson_processed'),
     path('shapefile/<int:pk>/merge/', views.MergePolygonsView.as_view(), name='merge_polygons'),
     path('shapefile/<int:pk>/cut_polygon/', views.CutPolygonView.as_view(), name='cut_polygon'),
+    path('shapefile/<int:pk>/cut_polygon/preview/', views.CutPolygonPreviewView.as_view(), name='cut_polygon_preview'),
+    path('shapefile/<int:pk>/subdivide/', views.SubdividePolygonsView.as_view(), name='subdivide_polygons'),
+    path('shapefile/<int:pk>/slivers/', views.MergeSliversView.as_view(), name='merge_slivers'),
+    path('shapefile/<int:pk>/dissolve/', views.DissolveView.as_view(), name='dissolve'),
+    path('shapefile/<int:pk>/export/', views.ShapefileExportView.as_view(), name='export_shapefile'),
+    path('shapefile/<int:pk>/overlay/', views.OverlayHistoricalView.as_view(), name='overlay_historical'),
+    path('shapefile/<int:pk>/events/', views.ShapefileEventsView.as_view(), name='shapefile_events'),
+    re_path(r'^shapefile/(?P<pk>\d+)/preview\.(?P<fmt>png|svg)$', views.ShapefilePreviewView.as_view(), name='shapefile_preview'),
     path('debug/<int:pk>/', views.DebugShapefileView.as_view(), name='debug_shapefile'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
+
+    # Async variants, for serving under ASGI
+    path('async/shapefile/<int:pk>/geojson/', views.AsyncShapefileGeoJSONView.as_view(), name='get_shapefile_geojson_async'),
+    path('async/shapefile/<int:pk>/geojson/processed/', views.AsyncShapefileProcessedGeoJSONView.as_view(), name='get_shapefile_geojson_processed_async'),
+    path('async/shapefile/<int:pk>/merge/', views.AsyncMergePolygonsView.as_view(), name='merge_polygons_async'),
+    path('async/shapefile/<int:pk>/cut_polygon/', views.AsyncCutPolygonView.as_view(), name='cut_polygon_async'),
+    path('async/shapefile/<int:pk>/subdivide/', views.AsyncSubdividePolygonsView.as_view(), name='subdivide_polygons_async'),
+    path('async/shapefile/<int:pk>/slivers/', views.AsyncMergeSliversView.as_view(), name='merge_slivers_async'),
+    path('async/shapefile/<int:pk>/dissolve/', views.AsyncDissolveView.as_view(), name='dissolve_async'),
 ]
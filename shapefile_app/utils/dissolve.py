@@ -0,0 +1,178 @@
+"""
+Dissolve: union the features of a layer that share the values of some property columns.
+
+Only touching features need a union: one STRtree query finds the pairs of
+the same group whose bounding boxes overlap, and their connected components
+are the units of work. Components are sorted and cut into chunks of about `chunk_size`
+features, which are unioned component by component in the geometry pool, in
+parallel. A component spread over several chunks comes back as partial
+unions, which a second, much smaller round unions together, so one huge group
+(or a dissolve of everything) is parallel too. The components of a group are
+disjoint, so they are simply collected into a MultiPolygon: unioning a group
+of scattered parcels never has to merge huge multi-part geometries (a group
+that also holds points or lines becomes a GeometryCollection instead).
+Single-feature groups keep their geometry untouched.
+
+Other columns are aggregated per group with one of AGGREGATIONS:
+
+- first: the first non-null value (the default),
+- sum: the total (numeric columns only),
+- list: every value, in feature order.
+
+    from shapefile_app.utils.dissolve import dissolve_layer
+    geoms, properties = dissolve_layer(geoms, properties, ['zone'], {'area': 'sum', 'name': 'list'})
+
+Groups come out in key order; null keys form their own group.
+"""
+import numpy as np
+import pandas as pd
+import shapely
+
+from shapefile_app.utils import executor
+
+AGGREGATIONS = ('first', 'sum', 'list')
+
+
+def group_codes(properties, by):
+    """Group number of each feature, numbered in key order"""
+    return properties.groupby(by, dropna=False, sort=True).ngroup().to_numpy()
+
+
+def union_by_code_wkb(wkbs, codes):
+    """(codes, WKB) of the union of each run of equal codes; `codes` must be sorted. Runs in the pool."""
+    geoms = shapely.from_wkb(wkbs)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)]
+    unions = [geoms[i] if j - i == 1 else shapely.union_all(geoms[i:j]) for i, j in zip(starts, ends)]
+    return codes[starts], shapely.to_wkb(np.asarray(unions, dtype=object))
+
+
+def connected_components(n, a, b):
+    """Component label (0..k-1) of each of n nodes joined by the edges a[i]-b[i]"""
+    labels = np.arange(n)
+    while True:
+        # Hook both ends onto the smaller label, then jump pointers to the roots
+        low = np.minimum(labels[a], labels[b])
+        hooked = labels.copy()
+        np.minimum.at(hooked, a, low)
+        np.minimum.at(hooked, b, low)
+        while True:
+            jumped = hooked[hooked]
+            if (jumped == hooked).all():
+                break
+            hooked = jumped
+        if (hooked == labels).all():
+            return np.unique(labels, return_inverse=True)[1].ravel()
+        labels = hooked
+
+
+def union_runs(geoms, codes, chunk_size=5000, timeout=None):
+    """Union of the geometries of each code, in parallel chunks; one geometry per code 0..max"""
+    order = np.argsort(codes, kind='stable')
+    codes = codes[order]
+    wkbs = shapely.to_wkb(geoms[order])
+    bounds = list(range(0, len(codes), chunk_size)) + [len(codes)]
+    chunks = executor.run_many(
+        union_by_code_wkb,
+        ((wkbs[i:j], codes[i:j]) for i, j in zip(bounds[:-1], bounds[1:])),
+        timeout=timeout,
+    )
+    part_codes = np.concatenate([chunk[0] for chunk in chunks])
+    part_wkbs = np.concatenate([chunk[1] for chunk in chunks])
+
+    # Groups cut by a chunk boundary have one partial union per chunk
+    split = np.flatnonzero(np.bincount(part_codes) > 1)
+    result = shapely.from_wkb(part_wkbs[np.r_[True, part_codes[1:] != part_codes[:-1]]])
+    if len(split):
+        partial = np.isin(part_codes, split)
+        _, merged = executor.run(union_by_code_wkb, part_wkbs[partial], part_codes[partial], timeout=timeout)
+        result[split] = shapely.from_wkb(merged)
+    return result
+
+
+def union_groups(geoms, codes, chunk_size=5000, timeout=None):
+    """Union of the geometries of each group code; one geometry per code 0..max"""
+    geoms = np.asarray(geoms, dtype=object)
+    # Bounding boxes suffice: features that intersect are in one component
+    # either way, so components stay disjoint, and the exact test costs more
+    # than the occasional extra feature in a union
+    left, right = shapely.STRtree(geoms).query(geoms)
+    same = (left < right) & (codes[left] == codes[right])
+    component = connected_components(len(geoms), left[same], right[same])
+    unions = union_runs(geoms, component, chunk_size, timeout)
+
+    group = np.zeros(len(unions), dtype=int)
+    group[component] = codes
+    counts = np.bincount(group)
+    result = np.empty(len(counts), dtype=object)
+    single = counts[group] == 1
+    result[group[single]] = unions[single]
+    if not single.all():
+        parts, index = shapely.get_parts(unions[~single], return_index=True)
+        part_group = group[~single][index]
+        order = np.argsort(part_group, kind='stable')
+        groups, collected = collect_parts(parts[order], part_group[order])
+        result[groups] = collected
+    return result
+
+
+def collect_parts(parts, index):
+    """(groups, geometries): one geometry per distinct value of the sorted `index`, from its parts.
+
+    Groups of polygons become MultiPolygons; groups that also have points
+    or lines become GeometryCollections.
+    """
+    groups, index = np.unique(index, return_inverse=True)
+    index = index.ravel()
+    mixed = np.zeros(len(groups), dtype=bool)
+    mixed[index[shapely.get_type_id(parts) != shapely.GeometryType.POLYGON]] = True
+    result = np.empty(len(groups), dtype=object)
+    for is_mixed, collection in ((False, shapely.multipolygons), (True, shapely.geometrycollections)):
+        members = mixed[index] == is_mixed
+        if members.any():
+            # Collections are built for consecutive indices 0..k-1
+            _, member_index = np.unique(index[members], return_inverse=True)
+            result[mixed == is_mixed] = collection(parts[members], indices=member_index.ravel())
+    return groups, result
+
+
+def aggregate(properties, codes, by, aggregations):
+    """One row per group: the `by` columns, then every other column aggregated (default 'first')"""
+    grouped = properties.groupby(codes, sort=True)
+    columns = {}
+    for column in properties.columns:
+        how = 'first' if column in by else aggregations.get(column, 'first')
+        if how == 'list':
+            columns[column] = grouped[column].agg(list)
+        elif how == 'sum':
+            columns[column] = grouped[column].sum(min_count=1)
+        else:
+            columns[column] = grouped[column].first()
+    return pd.DataFrame(columns).reset_index(drop=True)
+
+
+def check_request(properties, by, aggregations):
+    """Error message for an invalid dissolve request, or None"""
+    if not by:
+        return "Choose at least one column to dissolve by"
+    unknown = [column for column in list(by) + list(aggregations) if column not in properties.columns]
+    if unknown:
+        return f"Unknown column(s): {', '.join(map(str, unknown))}"
+    for column, how in aggregations.items():
+        if how not in AGGREGATIONS:
+            return f"Unknown aggregation '{how}' for {column}; use one of {', '.join(AGGREGATIONS)}"
+        if how == 'sum' and not pd.api.types.is_numeric_dtype(properties[column]):
+            return f"Cannot sum non-numeric column {column}"
+    return None
+
+
+def dissolve_layer(geoms, properties, by, aggregations=None, chunk_size=5000, timeout=None):
+    """(geometries, properties) of the dissolved layer; properties gain dissolved_count"""
+    aggregations = aggregations or {}
+    error = check_request(properties, by, aggregations)
+    if error:
+        raise ValueError(error)
+    codes = group_codes(properties, list(by))
+    result = aggregate(properties, codes, list(by), aggregations)
+    result['dissolved_count'] = np.bincount(codes)
+    return union_groups(geoms, codes, chunk_size, timeout), result
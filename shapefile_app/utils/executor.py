@@ -0,0 +1,203 @@
+"""
+Process pool for the CPU-bound geometry work behind merge, cut and the
+layer-wide operations (ingest, overlay, dissolve, export).
+
+unary_union, split and buffer(0) hold the GIL, so running them in the request
+thread stalls the worker and threads don't help. Geometries are shipped to a
+bounded ProcessPoolExecutor as WKB and come back as WKB, alongside plain
+Python values, dicts and DataFrames where a task returns attributes too
+(e.g. ingest.convert_layer); shapely objects never cross the process boundary.
+
+    from shapefile_app.utils import executor
+    merged = executor.unary_union(gdf.geometry)
+    parts = executor.split(polygon, line, timeout=10)
+
+Set GEOMETRY_WORKERS = 0 to run everything inline (useful under a debugger).
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import shapely
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class GeometryTaskError(Exception):
+    """A geometry task could not be completed by the pool"""
+
+
+class GeometryTaskTimeout(GeometryTaskError):
+    """A geometry task exceeded its timeout: it was cancelled, or abandoned if already running"""
+
+
+_pool = None
+_slots = None
+_lock = threading.Lock()
+
+
+def max_workers():
+    return int(getattr(settings, 'GEOMETRY_WORKERS', 0) or 0)
+
+
+def default_timeout():
+    return getattr(settings, 'GEOMETRY_TASK_TIMEOUT', 60)
+
+
+def get_pool():
+    """Return the shared pool, creating it on first use"""
+    return _pool_and_slots()[0]
+
+
+def _pool_and_slots():
+    global _pool, _slots
+    with _lock:
+        if _pool is None:
+            workers = max_workers()
+            # 'spawn' keeps workers free of the parent's DB connections and threads
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            # At most two queued tasks per worker; further callers wait for a slot
+            _slots = threading.BoundedSemaphore(workers * 2)
+        return _pool, _slots
+
+
+def shutdown(terminate=False):
+    """Shut the pool down. With terminate=True running tasks are killed."""
+    global _pool, _slots
+    with _lock:
+        pool, _pool, _slots = _pool, None, None
+    if pool is not None:
+        _stop(pool, terminate)
+
+
+def _stop(pool, terminate):
+    if terminate:
+        # ProcessPoolExecutor has no public way to stop a running task
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+    pool.shutdown(wait=not terminate, cancel_futures=True)
+
+
+def _discard_broken(pool):
+    """Drop a pool whose worker died, unless another caller already replaced it"""
+    global _pool, _slots
+    with _lock:
+        if _pool is not pool:
+            return
+        _pool, _slots = None, None
+    _stop(pool, terminate=True)
+
+
+def _remaining(deadline):
+    return max(0.0, deadline - time.monotonic())
+
+
+def _submit(pool, slots, fn, args, deadline, timeout):
+    """Wait for a slot until the deadline, then submit; the slot is freed when the task ends"""
+    if not slots.acquire(timeout=_remaining(deadline)):
+        raise GeometryTaskTimeout(f'Geometry pool busy: no free slot within {timeout}s')
+    try:
+        future = pool.submit(fn, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda f: slots.release())
+    return future
+
+
+def _abandon(futures, fn, timeout):
+    """Cancel the tasks that have not started; running ones finish in their worker and are ignored.
+
+    Killing a worker would break the whole pool and every other caller's
+    tasks with it, so a slow task keeps its worker (and slot) until it ends.
+    """
+    running = [future for future in futures if not future.cancel() and not future.done()]
+    if running:
+        logger.warning('Abandoning %d running %s task(s) after %ss', len(running), fn.__name__, timeout)
+    return GeometryTaskTimeout(f'{fn.__name__} exceeded {timeout}s and was cancelled')
+
+
+def run(fn, *args, timeout=None):
+    """Run fn(*args) in the pool; `timeout` seconds bound the wait for a slot and the result together.
+
+    On timeout the task is cancelled, or left to finish unobserved if it had
+    already started.
+    """
+    if max_workers() <= 0:
+        return fn(*args)
+
+    timeout = default_timeout() if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    pool, slots = _pool_and_slots()
+    future = _submit(pool, slots, fn, args, deadline, timeout)
+    try:
+        return future.result(timeout=_remaining(deadline))
+    except FutureTimeoutError:
+        raise _abandon([future], fn, timeout)
+    except BrokenProcessPool as e:
+        _discard_broken(pool)
+        raise GeometryTaskError(f'Geometry worker died: {e}')
+
+
+def run_many(fn, args_list, timeout=None):
+    """Run fn(*args) for every tuple in args_list in the pool; return the results in order.
+
+    Tasks are submitted as slots free up, so at most two per worker are
+    queued at once however long args_list is. `timeout` bounds the whole
+    call; on timeout the remaining tasks are cancelled or abandoned.
+    """
+    if max_workers() <= 0:
+        return [fn(*args) for args in args_list]
+
+    timeout = default_timeout() if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    pool, slots = _pool_and_slots()
+    futures = []
+    try:
+        for args in args_list:
+            futures.append(_submit(pool, slots, fn, args, deadline, timeout))
+        return [future.result(timeout=_remaining(deadline)) for future in futures]
+    except (FutureTimeoutError, GeometryTaskTimeout):
+        raise _abandon(futures, fn, timeout)
+    except BrokenProcessPool as e:
+        _discard_broken(pool)
+        raise GeometryTaskError(f'Geometry worker died: {e}')
+
+
+# Task functions. These run in the worker processes, so they take and return
+# WKB/plain Python values only.
+
+def union_wkb(wkbs):
+    return shapely.to_wkb(shapely.union_all(shapely.from_wkb(wkbs)))
+
+
+def split_wkb(polygon_wkb, line_wkb):
+    from shapely.ops import split as shapely_split
+
+    result = shapely_split(shapely.from_wkb(polygon_wkb), shapely.from_wkb(line_wkb))
+    return [shapely.to_wkb(geom) for geom in result.geoms]
+
+
+def buffer0_wkb(wkb):
+    return shapely.to_wkb(shapely.from_wkb(wkb).buffer(0))
+
+
+# Caller-side helpers: take/return shapely geometries and GeoDataFrames.
+
+def unary_union(geoms, timeout=None):
+    wkbs = shapely.to_wkb(list(geoms))
+    return shapely.from_wkb(run(union_wkb, wkbs, timeout=timeout))
+
+
+def split(polygon, line, timeout=None):
+    parts = run(split_wkb, shapely.to_wkb(polygon), shapely.to_wkb(line), timeout=timeout)
+    return list(shapely.from_wkb(parts))
+
+
+def buffer0(geom, timeout=None):
+    return shapely.from_wkb(run(buffer0_wkb, shapely.to_wkb(geom), timeout=timeout))
+
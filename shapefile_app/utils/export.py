@@ -0,0 +1,131 @@
+"""
+File export of processed layers (GeoPackage, zipped Shapefile, GeoParquet, FlatGeobuf).
+
+Exports are written in the background, in the geometry pool, to
+MEDIA_ROOT/exports/<pk>-<content version>.<ext>; the file doubles as the cache,
+so every later download of the same version is served from disk:
+
+    from shapefile_app.utils import export
+    path = export.export_path(shapefile.pk, shapefile.content_version('processed'), 'gpkg')
+    state = export.start(shapefile.pk, shapefile.processed_version, 'gpkg')  # 'ready', 'pending' or an error
+
+Jobs are tracked per process; two processes may both write the same export,
+which is wasteful but safe since files are moved into place atomically.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import zipfile
+
+import shapely
+from django.conf import settings
+
+from shapefile_app.utils import executor
+
+logger = logging.getLogger(__name__)
+
+# format -> (file extension, content type)
+EXPORT_FORMATS = {
+    'gpkg': ('gpkg', 'application/geopackage+sqlite3'),
+    'shp': ('zip', 'application/zip'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'fgb': ('fgb', 'application/octet-stream'),
+}
+
+_jobs = {}
+_lock = threading.Lock()
+
+
+def export_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'exports')
+
+
+def export_path(pk, version, fmt):
+    return os.path.join(export_dir(), f'{pk}-{version}.{EXPORT_FORMATS[fmt][0]}')
+
+
+def write_export(wkbs, records, fmt, path, layer='processed'):
+    """Write a layer with the vectorized writers. Runs in the geometry pool."""
+    import geopandas as gpd
+
+    gdf = gpd.GeoDataFrame(records, geometry=shapely.from_wkb(wkbs), crs='EPSG:4326')
+    # Lists/dicts (e.g. merged_features) have no column type in these formats
+    for column in gdf.columns.drop(gdf.geometry.name):
+        if gdf[column].map(lambda value: isinstance(value, (list, dict))).any():
+            gdf[column] = gdf[column].map(lambda value: json.dumps(value) if isinstance(value, (list, dict)) else value)
+
+    # Same directory (so the final move is atomic) and same extension (drivers check it)
+    temp_path = os.path.join(os.path.dirname(path), f'.tmp-{os.getpid()}-{os.path.basename(path)}')
+    if fmt == 'parquet':
+        gdf.to_parquet(temp_path)
+    elif fmt == 'shp':
+        with tempfile.TemporaryDirectory() as temp_dir:
+            gdf.to_file(os.path.join(temp_dir, f'{layer}.shp'), driver='ESRI Shapefile', engine='pyogrio')
+            with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+                for file in sorted(os.listdir(temp_dir)):
+                    zip_ref.write(os.path.join(temp_dir, file), file)
+    else:
+        driver = {'gpkg': 'GPKG', 'fgb': 'FlatGeobuf'}[fmt]
+        gdf.to_file(temp_path, driver=driver, layer=layer, engine='pyogrio', use_arrow=True)
+    os.replace(temp_path, path)
+    return path
+
+
+def _run_export(pk, version, fmt):
+    from django.db import connection
+
+    from shapefile_app.models import Shapefile
+
+    path = export_path(pk, f'p{version}', fmt)
+    error = None
+    try:
+        shapefile = Shapefile.objects.get(pk=pk)
+        # If it was edited meanwhile, the next request starts the newer export
+        if shapefile.processed_version == version:
+            features = shapefile.processed_features()
+            wkbs, records = features.to_wkb(), features.records()
+            os.makedirs(export_dir(), exist_ok=True)
+            executor.run(write_export, wkbs, records, fmt, path, timeout=getattr(settings, 'EXPORT_TIMEOUT', 600))
+            _remove_stale(pk, path)
+    except Exception as e:
+        logger.warning('Export of shapefile %s (%s) failed: %s', pk, fmt, e)
+        error = str(e)
+    finally:
+        connection.close()
+        with _lock:
+            if error is None:
+                _jobs.pop((pk, version, fmt), None)
+            else:
+                _jobs[(pk, version, fmt)] = error
+
+
+def _remove_stale(pk, current):
+    """Delete exports of older versions of the same layer"""
+    extension = os.path.splitext(current)[1]
+    for name in os.listdir(export_dir()):
+        path = os.path.join(export_dir(), name)
+        if name.startswith(f'{pk}-') and name.endswith(extension) and path != current:
+            os.remove(path)
+
+
+def start(pk, version, fmt):
+    """Make sure an export of this layer version exists or is being written.
+
+    Returns 'ready', 'pending', or the error message of a failed attempt (the
+    next call retries).
+    """
+    if os.path.exists(export_path(pk, f'p{version}', fmt)):
+        return 'ready'
+    key = (pk, version, fmt)
+    with _lock:
+        job = _jobs.get(key)
+        if isinstance(job, str):
+            del _jobs[key]
+            return job
+        if job is None:
+            job = threading.Thread(target=_run_export, args=key, name=f'export-{pk}-{fmt}', daemon=True)
+            _jobs[key] = job
+            job.start()
+    return 'pending'
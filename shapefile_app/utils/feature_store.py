@@ -0,0 +1,233 @@
+"""
+Compact in-memory layer: a shapely geometry array plus a columnar property table.
+
+A FeatureCollection held as nested dicts and coordinate lists costs hundreds
+of bytes per coordinate (a list and two float objects each); here the
+coordinates live inside the GEOS geometries (16 bytes each) and every property
+is one pandas column. For 100k parcels that is 16 MB instead of 178 MB.
+Merge, cut, bounding box queries and serialization work on the arrays;
+GeoJSON dicts are only built at the response boundary.
+
+    from shapefile_app.utils.feature_store import FeatureStore
+    features = FeatureStore.from_feature_collection(feature_collection)
+    hits = features.query_bbox(115.8, -32.0, 115.9, -31.9)
+    edited = features.replace([3, 4], [merged_geometry], [{'name': 'Merged Polygon'}])
+    text = edited.to_geojson_text()
+
+Stores are immutable: edits return a new store. Feature ids are positions,
+and replace() keeps the remaining features in order and appends the new ones,
+which is the delta convention of the edit events (see models._edit_event).
+Geometries are in EPSG:4326.
+
+Interactive endpoints (the cut preview) keep recent stores, with their
+spatial index, in a small per-process cache keyed by layer version:
+
+    features = cache_get((pk, uploaded_at, version))
+    cache_put((pk, uploaded_at, version), features)
+"""
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import shapely
+from django.conf import settings
+
+from shapefile_app.utils.validation import parse_geometries
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _column(values):
+    """Values of one property; integers and booleans keep their type (nullable Int64/boolean) when some are null"""
+    present = [value for value in values if value is not None]
+    if present and all(type(value) is int for value in present):
+        try:
+            return pd.array(values, dtype='Int64')
+        except (OverflowError, TypeError):
+            pass
+    if present and all(type(value) is bool for value in present):
+        return pd.array(values, dtype='boolean')
+    return values
+
+
+def _nullable(properties):
+    """Integer and boolean columns as nullable dtypes, so padding a column with nulls keeps its type"""
+    for column, dtype in properties.dtypes.items():
+        if pd.api.types.is_integer_dtype(dtype) and not isinstance(dtype, pd.api.extensions.ExtensionDtype):
+            properties[column] = properties[column].astype('Int64')
+        elif pd.api.types.is_bool_dtype(dtype) and not isinstance(dtype, pd.api.extensions.ExtensionDtype):
+            properties[column] = properties[column].astype('boolean')
+    return properties
+
+
+def _json_lines(properties):
+    if properties.columns.empty or not len(properties):
+        return ['{}'] * len(properties)
+    text = properties.to_json(orient='records', lines=True, double_precision=15, date_format='iso')
+    # Newlines inside values are escaped, so each line is one record
+    return text.rstrip('\n').split('\n')
+
+
+class FeatureStore:
+    def __init__(self, geometries, properties=None, absent=None):
+        self.geometries = np.asarray(geometries, dtype=object)
+        if properties is None:
+            properties = pd.DataFrame(index=pd.RangeIndex(len(self.geometries)))
+        self.properties = _nullable(properties.reset_index(drop=True))
+        # Keys a feature did not have at all, as opposed to had with a null
+        # value: left out on output. None when every feature has every key.
+        self.absent = None
+        if absent is not None:
+            absent = absent.reset_index(drop=True).reindex(columns=self.properties.columns, fill_value=False).astype(bool)
+            if absent.to_numpy().any():
+                self.absent = absent
+        self._tree = None
+
+    @classmethod
+    def from_records(cls, geometries, records):
+        keys = list(dict.fromkeys(key for record in records for key in record))
+        index = pd.RangeIndex(len(records))
+        properties = pd.DataFrame({key: _column([record.get(key) for record in records]) for key in keys}, index=index)
+        absent = None
+        if any(len(record) < len(keys) for record in records):
+            absent = pd.DataFrame({key: [key not in record for record in records] for key in keys}, index=index)
+        return cls(geometries, properties, absent)
+
+    @classmethod
+    def from_features(cls, features):
+        geometries = parse_geometries([feature.get('geometry') for feature in features])
+        return cls.from_records(geometries, [feature.get('properties') or {} for feature in features])
+
+    @classmethod
+    def from_feature_collection(cls, feature_collection):
+        return cls.from_features(feature_collection.get('features', []))
+
+    @classmethod
+    def from_wkb(cls, wkbs, records):
+        return cls.from_records(shapely.from_wkb(wkbs), records)
+
+    @classmethod
+    def from_gdf(cls, gdf):
+        """From a GeoDataFrame (reprojected to EPSG:4326 if it has another CRS)"""
+        if gdf.crs is not None and not gdf.crs.equals('EPSG:4326'):
+            gdf = gdf.to_crs('EPSG:4326')
+        return cls(gdf.geometry.values.to_numpy(), pd.DataFrame(gdf.drop(columns=gdf.geometry.name)))
+
+    def __len__(self):
+        return len(self.geometries)
+
+    @property
+    def bounds(self):
+        """(n, 4) array of minx, miny, maxx, maxy"""
+        return shapely.bounds(self.geometries)
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = shapely.STRtree(self.geometries)
+        return self._tree
+
+    def query_bbox(self, minx, miny, maxx, maxy):
+        """Sorted positions of the features intersecting a bounding box"""
+        return np.sort(self.tree.query(shapely.box(minx, miny, maxx, maxy), predicate='intersects'))
+
+    def is_polygonal(self):
+        """Whether every feature is a Polygon or MultiPolygon (or has no geometry)"""
+        types = shapely.get_type_id(self.geometries)
+        return bool(np.isin(types, (-1, shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON)).all())
+
+    def take(self, indices):
+        indices = np.asarray(indices, dtype=int)
+        absent = None if self.absent is None else self.absent.iloc[indices]
+        return FeatureStore(self.geometries[indices], self.properties.iloc[indices], absent)
+
+    def absent_mask(self):
+        """Boolean frame of the keys each feature lacks (all False if none)"""
+        if self.absent is not None:
+            return self.absent
+        return pd.DataFrame(False, index=self.properties.index, columns=self.properties.columns)
+
+    def replace(self, removed, geometries, records, absent=None):
+        """New store without the `removed` positions and with the new features appended.
+
+        `records` is a list of property dicts or a DataFrame with one row per
+        new feature (with `absent`, a mask of the keys those features lack).
+        Keys only some features have are not padded with nulls on output.
+        """
+        keep = np.ones(len(self), dtype=bool)
+        keep[np.asarray(removed, dtype=int)] = False
+        if isinstance(records, pd.DataFrame):
+            added = FeatureStore(geometries, records, absent)
+        else:
+            added = FeatureStore.from_records(geometries, records)
+        properties = pd.concat([self.properties[keep], added.properties], ignore_index=True)
+        absent = None
+        if self.absent is not None or added.absent is not None or not self.properties.columns.equals(added.properties.columns):
+            # A column only one side has is absent from the other side's features
+            absent = pd.concat([self.absent_mask()[keep], added.absent_mask()], ignore_index=True)
+            absent = absent.reindex(columns=properties.columns).fillna(True).astype(bool)
+        return FeatureStore(np.concatenate([self.geometries[keep], added.geometries]), properties, absent)
+
+    def to_wkb(self):
+        return shapely.to_wkb(self.geometries)
+
+    def to_gdf(self, crs=None):
+        import geopandas as gpd
+
+        gdf = gpd.GeoDataFrame(self.properties.copy(), geometry=self.geometries, crs='EPSG:4326')
+        return gdf if crs is None else gdf.to_crs(crs)
+
+    def properties_json(self):
+        """One JSON object per feature with the keys it has; null values are kept"""
+        if self.absent is None:
+            return _json_lines(self.properties)
+        # One to_json() per combination of absent keys, usually only a few
+        patterns, pattern_of = np.unique(self.absent.to_numpy(), axis=0, return_inverse=True)
+        pattern_of = pattern_of.ravel()
+        lines = np.empty(len(self), dtype=object)
+        for i, pattern in enumerate(patterns):
+            rows = np.flatnonzero(pattern_of == i)
+            lines[rows] = _json_lines(self.properties.iloc[rows, np.flatnonzero(~pattern)])
+        return lines.tolist()
+
+    def records(self):
+        return json.loads('[' + ','.join(self.properties_json()) + ']')
+
+    def to_geojson_text(self, indices=None):
+        """FeatureCollection text of all features or of some positions; ids are positions"""
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices, dtype=int)
+        store = self.take(indices)
+        geometries = shapely.to_geojson(store.geometries)
+        geometries[shapely.is_missing(store.geometries)] = 'null'
+        features = [
+            f'{{"type":"Feature","id":{int(i)},"geometry":{geometry},"properties":{properties}}}'
+            for i, geometry, properties in zip(indices, geometries, store.properties_json())
+        ]
+        return '{"type":"FeatureCollection","features":[' + ','.join(features) + ']}'
+
+    def features(self, indices=None):
+        """GeoJSON feature dicts (for events and other response bodies)"""
+        return json.loads(self.to_geojson_text(indices))['features']
+
+    def to_feature_collection(self):
+        return json.loads(self.to_geojson_text())
+
+
+def cache_get(key):
+    with _cache_lock:
+        features = _cache.get(key)
+        if features is not None:
+            _cache.move_to_end(key)
+        return features
+
+
+def cache_put(key, features):
+    """Keep a store for later requests of this process; least recently used ones are dropped"""
+    with _cache_lock:
+        _cache[key] = features
+        _cache.move_to_end(key)
+        while len(_cache) > getattr(settings, 'FEATURE_CACHE_SIZE', 8):
+            _cache.popitem(last=False)
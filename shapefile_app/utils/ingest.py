@@ -0,0 +1,216 @@
+"""
+Upload ingestion: every layer of the uploaded file, converted in parallel.
+
+Accepted uploads are zipped ESRI Shapefiles and GeoPackage, FlatGeobuf and
+GeoParquet files. Each layer (each .shp in a ZIP, each GeoPackage table) is
+read, reprojected to WGS84 and validated (utils/validation.py) in its own
+geometry-pool task:
+
+    from shapefile_app.utils.ingest import convert_upload
+    for layer in convert_upload(uploaded_file):
+        layer['layer'], layer['report'], layer['timings'], layer['error']
+        features = layer_features(layer)   # a FeatureStore
+
+Shapefiles are read in place through GDAL's /vsizip/ (nothing is extracted).
+GeoPackage and FlatGeobuf go through pyogrio with Arrow, and GeoParquet
+through pyarrow, so attributes arrive as columns and geometries as one WKB
+array instead of per-feature OGR objects. Layers come back from the pool the
+same way, as a WKB array and a property DataFrame, and are only turned into
+a FeatureStore in the calling process.
+
+A layer that cannot be converted (no features, no polygons, unreadable)
+comes back with `error` set and does not stop the others.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+import shapely
+from django.conf import settings
+
+from shapefile_app.utils import executor
+from shapefile_app.utils.feature_store import FeatureStore
+from shapefile_app.utils.validation import validate_features, validate_geodataframe
+
+# Formats read with the columnar readers, by extension
+COLUMNAR_FORMATS = {'.gpkg': 'GeoPackage', '.fgb': 'FlatGeobuf', '.parquet': 'GeoParquet', '.geoparquet': 'GeoParquet'}
+UPLOAD_EXTENSIONS = ('.zip',) + tuple(COLUMNAR_FORMATS)
+
+
+def extension(path):
+    return os.path.splitext(path)[1].lower()
+
+
+def find_layers(names):
+    """The .shp members of an archive listing, in archive order"""
+    return [name for name in names if name.lower().endswith('.shp') and not name.startswith('__MACOSX/')]
+
+
+def layer_name(member):
+    return os.path.splitext(os.path.basename(member))[0]
+
+
+def read_columnar(path, layer=None):
+    """GeoDataFrame in WGS84 from a GeoPackage layer, FlatGeobuf or GeoParquet file"""
+    import geopandas as gpd
+
+    if extension(path) in ('.parquet', '.geoparquet'):
+        gdf = gpd.read_parquet(path)
+    else:
+        import pyogrio
+        gdf = pyogrio.read_dataframe(path, layer=layer, use_arrow=True)
+    if gdf.crs is not None and not gdf.crs.equals('EPSG:4326'):
+        gdf = gdf.to_crs('EPSG:4326')
+    return gdf
+
+
+def read_layer(shp_path):
+    """Read a shapefile (a path GDAL can open) into a GeoJSON FeatureCollection in WGS84"""
+    from osgeo import ogr
+
+    driver = ogr.GetDriverByName('ESRI Shapefile')
+    data_source = driver.Open(shp_path, 0)
+
+    if data_source is None:
+        raise ValueError('Could not open shapefile. Make sure all required files (.shp, .shx, .dbf) are present.')
+
+    layer = data_source.GetLayer()
+    if layer.GetFeatureCount() == 0:
+        raise ValueError('Shapefile contains no features')
+
+    # Transform to WGS84 (EPSG:4326) if needed
+    spatial_ref = layer.GetSpatialRef()
+    coord_transform = None
+    if spatial_ref:
+        wgs84_ref = ogr.osr.SpatialReference()
+        wgs84_ref.ImportFromEPSG(4326)
+        if not spatial_ref.IsSame(wgs84_ref):
+            coord_transform = ogr.osr.CoordinateTransformation(spatial_ref, wgs84_ref)
+
+    features = []
+    for feature in layer:
+        geom = feature.GetGeometryRef()
+        if geom:
+            if coord_transform:
+                geom.Transform(coord_transform)
+            properties = {}
+            for i in range(feature.GetFieldCount()):
+                properties[feature.GetFieldDefnRef(i).GetName()] = feature.GetField(i)
+            features.append({
+                'type': 'Feature',
+                'geometry': json.loads(geom.ExportToJson()),
+                'properties': properties
+            })
+    data_source = None
+
+    if not features:
+        raise ValueError('No valid geometries found in shapefile')
+
+    return {
+        'type': 'FeatureCollection',
+        'crs': {'type': 'name', 'properties': {'name': 'EPSG:4326'}},
+        'features': features
+    }
+
+
+def convert_layer(path, layer=None):
+    """Read and validate one layer (a .shp, or `layer` of a columnar file). Runs in the geometry pool."""
+    result = {
+        'layer': layer or layer_name(path), 'geometry': None, 'properties': None, 'absent': None,
+        'report': None, 'timings': {}, 'error': None,
+    }
+    try:
+        start = time.perf_counter()
+        if extension(path) == '.shp':
+            geojson_data = read_layer(path)
+            result['timings']['read'] = round(time.perf_counter() - start, 3)
+            start = time.perf_counter()
+            features, result['report'] = validate_features(geojson_data['features'])
+            features = FeatureStore.from_features(features)
+            geometry, properties, absent = features.to_wkb(), features.properties, features.absent
+        else:
+            gdf = read_columnar(path, layer)
+            result['timings']['read'] = round(time.perf_counter() - start, 3)
+            start = time.perf_counter()
+            geometry, properties, result['report'] = validate_geodataframe(gdf)
+            absent = None
+        result['timings']['validate'] = round(time.perf_counter() - start, 3)
+
+        if not len(geometry):
+            raise ValueError('No valid geometries found')
+        result['geometry'], result['properties'], result['absent'] = geometry, properties, absent
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def layer_features(result):
+    """FeatureStore of a layer convert_layer() returned, or None if it failed"""
+    if result['geometry'] is None:
+        return None
+    return FeatureStore(shapely.from_wkb(result['geometry']), result['properties'], result['absent'])
+
+
+def convert_zip_path(zip_path, timeout=None):
+    """convert_layer() for every layer of a ZIP on disk, in parallel"""
+    try:
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            members = find_layers(zip_ref.namelist())
+    except zipfile.BadZipFile:
+        raise ValueError('Invalid ZIP file')
+    if not members:
+        raise ValueError('No .shp file found in the ZIP archive')
+
+    return _convert_all([(f'/vsizip/{zip_path}/{member}',) for member in members], timeout)
+
+
+def convert_columnar_path(path, timeout=None):
+    """convert_layer() for every layer of a GeoPackage/FlatGeobuf/GeoParquet file, in parallel"""
+    if extension(path) in ('.parquet', '.geoparquet'):
+        return _convert_all([(path, None)], timeout)
+    import pyogrio
+
+    try:
+        layers = pyogrio.list_layers(path)
+    except Exception as e:
+        raise ValueError(f'Could not open {COLUMNAR_FORMATS[extension(path)]} file: {e}')
+    if extension(path) == '.fgb':
+        return _convert_all([(path, None)], timeout)
+    return _convert_all([(path, str(name)) for name, _ in layers], timeout)
+
+
+def _convert_all(tasks, timeout):
+    if timeout is None:
+        timeout = getattr(settings, 'INGEST_TIMEOUT', 600)
+    return executor.run_many(convert_layer, tasks, timeout=timeout)
+
+
+def convert_path(path, timeout=None):
+    """Convert every layer of an upload saved at `path` (dispatching on its extension)"""
+    if extension(path) == '.zip':
+        return convert_zip_path(path, timeout)
+    if extension(path) in COLUMNAR_FORMATS:
+        return convert_columnar_path(path, timeout)
+    raise ValueError(f'Unsupported file type; upload one of {", ".join(UPLOAD_EXTENSIONS)}')
+
+
+def convert_upload(upload, name=None, timeout=None):
+    """Convert every layer of a path, an uploaded file or any binary file object.
+
+    File objects without a path on disk are copied to a temporary file first;
+    `name` (default: the object's name) gives their format by extension.
+    """
+    if isinstance(upload, str):
+        return convert_path(upload, timeout)
+    suffix = extension(name or getattr(upload, 'name', '') or '')
+    if hasattr(upload, 'temporary_file_path') and extension(upload.temporary_file_path()) == suffix:
+        # Large uploads are already spooled to disk by Django
+        return convert_path(upload.temporary_file_path(), timeout)
+    with tempfile.NamedTemporaryFile(suffix=suffix) as temp_file:
+        upload.seek(0)
+        shutil.copyfileobj(upload, temp_file)
+        temp_file.flush()
+        return convert_path(temp_file.name, timeout)
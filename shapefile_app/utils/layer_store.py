@@ -0,0 +1,221 @@
+"""
+Columnar on-disk store for layer versions (settings.LAYER_STORAGE = 'arrow').
+
+Each stored layer version is an uncompressed Arrow IPC file under
+MEDIA_ROOT/layers/<pk>/ with one row per feature:
+
+    geometry     large_binary   WKB, EPSG:4326
+    properties   large_string   the feature's GeoJSON properties as JSON text
+    absent       struct<bool>   per property key, whether the feature lacks
+                                it (only when some feature lacks a key)
+
+The Shapefile row keeps only a pointer to the file. Files are memory-mapped
+on read, so opening a layer maps pages instead of parsing JSON; geometries
+are decoded by shapely straight from the mapped WKB column, and GeoJSON is
+assembled in Arrow from the mapped property text without building Python
+dicts or per-row strings. 64-bit offsets throughout, so layers with more
+than 2 GB of property text or GeoJSON still fit in one array.
+Properties stay JSON text rather than columns so lists and mixed types
+round-trip exactly. Reading a layer parses that text into columns in one
+pass of Arrow's JSON reader, falling back to json.loads for values it would
+not give back unchanged (objects, strings it takes for timestamps, a key
+holding both numbers and strings) and for files written before the
+`absent` column.
+
+Uncompressed Arrow rather than GeoParquet because Parquet pages have to be
+decoded into fresh memory; GeoParquet is what the export endpoint produces.
+
+    from shapefile_app.utils import layer_store
+    path = layer_store.write_store(pk, 'processed', version, feature_store)
+    features = layer_store.read_store(path)   # a FeatureStore
+    text = layer_store.geojson_text(path)
+"""
+import json
+import os
+import shutil
+import tempfile
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pa_json
+import shapely
+from django.conf import settings
+
+from shapefile_app.utils.feature_store import FeatureStore
+
+
+def enabled():
+    return getattr(settings, 'LAYER_STORAGE', 'database') == 'arrow'
+
+
+def layer_dir(pk):
+    return os.path.join(settings.MEDIA_ROOT, 'layers', str(pk))
+
+
+def full_path(path):
+    """Stored pointers are relative to MEDIA_ROOT"""
+    return os.path.join(settings.MEDIA_ROOT, path)
+
+
+def write_table(pk, layer, version, geometry_wkb, properties_json, absent=None):
+    """Write one layer version; returns its path relative to MEDIA_ROOT.
+
+    `absent` is the FeatureStore mask of the keys each feature lacks (None if
+    every feature has every key). Names are unique per write: concurrent
+    edits of the same version each get their own file, and only the one
+    whose pointer is saved is kept.
+    """
+    relative = os.path.join('layers', str(pk), f'{layer}-v{version}-{uuid.uuid4().hex[:8]}.arrow')
+    path = full_path(relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    columns = {'geometry': pa.array(geometry_wkb, pa.large_binary()), 'properties': pa.array(properties_json, pa.large_string())}
+    if absent is not None:
+        columns['absent'] = pa.StructArray.from_arrays(
+            [pa.array(absent[key].to_numpy(), pa.bool_()) for key in absent.columns], names=[str(key) for key in absent.columns],
+        )
+    # absent_keys marks files that have the absent column whenever a feature lacks a key
+    table = pa.table(columns, metadata={'crs': 'EPSG:4326', 'encoding': 'WKB', 'absent_keys': 'column'})
+    fd, temp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.arrow', dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        with pa.OSFile(temp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return relative
+
+
+def write_store(pk, layer, version, features):
+    """write_table() for a FeatureStore"""
+    return write_table(pk, layer, version, features.to_wkb(), features.properties_json(), features.absent)
+
+
+def read_table(path):
+    """Memory-mapped Arrow table of a stored layer (no copy is made)"""
+    return pa.ipc.open_file(pa.memory_map(full_path(path))).read_all()
+
+
+def _large(text):
+    return pa.scalar(text, pa.large_string())
+
+
+def _join(strings, separator):
+    """One string scalar of all the values of a string array, joined in Arrow without per-row Python objects"""
+    strings = strings.cast(pa.large_string())
+    strings = strings.combine_chunks() if isinstance(strings, pa.ChunkedArray) else strings
+    whole = pa.LargeListArray.from_arrays(pa.array([0, len(strings)], pa.int64()), strings)
+    return pc.binary_join(whole, _large(separator))[0]
+
+
+def _exact(value_type):
+    """Whether Arrow's JSON reader gives values of this type back as json.loads would"""
+    if pa.types.is_list(value_type):
+        return _exact(value_type.value_type)
+    return value_type in (pa.null(), pa.bool_(), pa.int64(), pa.float64(), pa.string())
+
+
+# Nullable pandas dtypes, as FeatureStore uses for these columns
+_PANDAS_TYPES = {pa.int64(): pd.Int64Dtype(), pa.bool_(): pd.BooleanDtype()}
+
+
+def read_properties(table):
+    """(properties DataFrame, absent mask) of a stored layer, parsed in bulk; None where that would not be exact"""
+    metadata = table.schema.metadata or {}
+    if metadata.get(b'absent_keys') != b'column' or not table.num_rows:
+        return None
+    try:
+        parsed = pa_json.read_json(pa.BufferReader(_join(table.column('properties'), '\n').as_buffer()))
+    except pa.ArrowInvalid:
+        return None
+    if parsed.num_rows != table.num_rows or not all(_exact(field.type) for field in parsed.schema):
+        return None
+
+    index = pd.RangeIndex(table.num_rows)
+    properties = pd.DataFrame({
+        # Lists come back as Python lists, the rest as (nullable) columns
+        name: pd.Series(column.to_pylist(), index=index, dtype=object) if pa.types.is_list(column.type)
+        else column.to_pandas(types_mapper=_PANDAS_TYPES.get)
+        for name, column in zip(parsed.column_names, parsed.columns)
+    }, index=index)
+    absent = None
+    if 'absent' in table.column_names:
+        mask = table.column('absent').combine_chunks()
+        absent = pd.DataFrame({
+            field.name: mask.field(i).to_numpy(zero_copy_only=False) for i, field in enumerate(mask.type)
+        }, index=index)
+    return properties, absent
+
+
+def read_columns(path):
+    """(geometry array, list of property dicts) of a stored layer.
+
+    Geometries are decoded by shapely straight from the mapped WKB column and
+    the properties are parsed as one JSON document joined from the mapped
+    text column.
+    """
+    table = read_table(path)
+    return shapely.from_wkb(table.column('geometry').combine_chunks()), _records(table)
+
+
+def _records(table):
+    return json.loads('[' + _join(table.column('properties'), ',').as_py() + ']')
+
+
+def read_store(path):
+    table = read_table(path)
+    geometries = shapely.from_wkb(table.column('geometry').combine_chunks())
+    columns = read_properties(table)
+    if columns is None:
+        return FeatureStore.from_records(geometries, _records(table))
+    return FeatureStore(geometries, *columns)
+
+
+def geojson_text(path):
+    """FeatureCollection text of a stored layer; feature ids are positions"""
+    table = read_table(path)
+    geoms = shapely.from_wkb(table.column('geometry').combine_chunks())
+    geometries = shapely.to_geojson(geoms)
+    geometries[shapely.is_missing(geoms)] = 'null'
+    features = pc.binary_join_element_wise(
+        _large('{"type":"Feature","id":'), pa.array(np.arange(len(geoms))).cast(pa.large_string()),
+        _large(',"geometry":'), pa.array(geometries, pa.large_string()),
+        _large(',"properties":'), table.column('properties').cast(pa.large_string()).combine_chunks(),
+        _large('}'), _large(''),
+    )
+    return '{"type":"FeatureCollection","features":[' + _join(features, ',').as_py() + ']}'
+
+
+def feature_collection(path):
+    return json.loads(geojson_text(path))
+
+
+def prune(pk, layer, *keep):
+    """Delete the stored versions of a layer other than `keep`.
+
+    Callers keep the version being replaced too: a request that read the old
+    pointer just before the edit committed can still open its file.
+    """
+    directory = layer_dir(pk)
+    if not os.path.isdir(directory):
+        return
+    keep = {os.path.basename(path) for path in keep if path}
+    for name in os.listdir(directory):
+        if name.startswith(f'{layer}-v') and name not in keep:
+            os.remove(os.path.join(directory, name))
+
+
+def discard(path):
+    """Delete a stored version that was never saved as a layer's pointer"""
+    try:
+        os.remove(full_path(path))
+    except FileNotFoundError:
+        pass
+
+
+def delete(pk):
+    shutil.rmtree(layer_dir(pk), ignore_errors=True)
@@ -0,0 +1,167 @@
+"""
+Overlay of an uploaded source layer with a stored historical layer.
+
+Each source polygon is split by the historical polygons it intersects:
+
+- one 'CUT' piece per intersecting (source, historical) pair, and
+- one 'BASE' piece for whatever is left outside every historical polygon.
+
+Multi-part results are exploded, so every output feature is a Polygon.
+Candidate pairs come from one bulk STRtree query over the historical layer
+and intersections/differences are computed on whole geometry arrays, so the
+cost grows with the number of real overlaps rather than source x historical.
+Historical polygons are assumed not to overlap each other.
+
+    from shapefile_app.utils.overlay import overlay_layers
+    gdf_processed = overlay_layers(gdf_source, gdf_hist)
+
+Large sources are partitioned: each source polygon is assigned to exactly one
+grid tile (by a point on its surface), so no piece is produced twice and no
+deduplication pass is needed. Each tile is overlaid in the geometry pool
+against only the historical polygons near it; tiles are fed to the pool as
+slots free up, so just a few tiles' inputs are serialised at any time.
+"""
+import math
+
+import numpy as np
+import shapely
+from django.conf import settings
+
+from shapefile_app.utils import executor
+
+BASE = 'BASE'
+CUT = 'CUT'
+
+
+def overlay_geometries(source, hist, min_area=0.0):
+    """Overlay two shapely geometry arrays.
+
+    Returns (geoms, source_index, hist_index, origin) as arrays, one entry per
+    output polygon; hist_index is -1 for BASE pieces. Pieces with an area of
+    `min_area` or less (slivers from shared boundaries) are dropped.
+    """
+    source = np.asarray(source, dtype=object)
+    hist = np.asarray(hist, dtype=object)
+
+    tree = shapely.STRtree(hist)
+    src_idx, hist_idx = tree.query(source, predicate='intersects')
+    order = np.lexsort((hist_idx, src_idx))
+    src_idx, hist_idx = src_idx[order], hist_idx[order]
+
+    # CUT: every candidate pair at once
+    cut = shapely.intersection(source[src_idx], hist[hist_idx])
+
+    # BASE: each source minus the union of its historical candidates
+    remainder = source.copy()
+    touched, starts = np.unique(src_idx, return_index=True)
+    if len(touched):
+        covers = np.array([
+            shapely.union_all(group) for group in np.split(hist[hist_idx], starts[1:])
+        ], dtype=object)
+        remainder[touched] = shapely.difference(source[touched], covers)
+
+    geoms = np.concatenate([cut, remainder])
+    source_index = np.concatenate([src_idx, np.arange(len(source))])
+    hist_index = np.concatenate([hist_idx, np.full(len(source), -1)])
+    origin = np.concatenate([np.full(len(cut), CUT, dtype=object), np.full(len(source), BASE, dtype=object)])
+
+    # Explode to polygons (intersections can yield collections with lines/points)
+    parts, part_of = shapely.get_parts(geoms, return_index=True)
+    keep = (shapely.get_type_id(parts) == shapely.GeometryType.POLYGON) & (shapely.area(parts) > min_area)
+    parts, part_of = parts[keep], part_of[keep]
+
+    # Source order, with each source's BASE piece ahead of its CUT pieces
+    order = np.lexsort((hist_index[part_of], source_index[part_of]))
+    part_of = part_of[order]
+    return parts[order], source_index[part_of], hist_index[part_of], origin[part_of]
+
+
+def overlay_wkb(source_wkbs, hist_wkbs, min_area):
+    """overlay_geometries() for the geometry pool: WKB in, WKB and plain arrays out"""
+    geoms, source_index, hist_index, origin = overlay_geometries(
+        shapely.from_wkb(source_wkbs), shapely.from_wkb(hist_wkbs), min_area,
+    )
+    return shapely.to_wkb(geoms), source_index, hist_index, origin.tolist()
+
+
+def tile_keys(geoms, tile_size):
+    """Grid tile of each geometry, with about `tile_size` geometries per tile on average"""
+    points = shapely.point_on_surface(geoms)
+    x, y = shapely.get_x(points), shapely.get_y(points)
+    n_side = max(1, math.ceil(math.sqrt(len(geoms) / tile_size)))
+    minx, miny, maxx, maxy = np.nanmin(x), np.nanmin(y), np.nanmax(x), np.nanmax(y)
+    col = np.clip(((x - minx) / max(maxx - minx, 1e-12) * n_side).astype(int), 0, n_side - 1)
+    row = np.clip(((y - miny) / max(maxy - miny, 1e-12) * n_side).astype(int), 0, n_side - 1)
+    return row * n_side + col
+
+
+def overlay_partitioned(source, hist, tile_size, min_area=0.0, timeout=None):
+    """overlay_geometries() over grid tiles of the source, run in parallel in the geometry pool"""
+    source = np.asarray(source, dtype=object)
+    hist = np.asarray(hist, dtype=object)
+    keys = tile_keys(source, tile_size)
+    order = np.argsort(keys, kind='stable')
+    tiles = np.split(order, np.flatnonzero(np.diff(keys[order])) + 1)
+    tree = shapely.STRtree(hist)
+
+    def tasks():
+        # Generated lazily: run_many pulls the next tile only when a slot frees up
+        for tile in tiles:
+            near = np.unique(tree.query(source[tile], predicate='intersects')[1])
+            tile_hists.append(near)
+            yield shapely.to_wkb(source[tile]), shapely.to_wkb(hist[near]), min_area
+
+    tile_hists = []
+    results = executor.run_many(overlay_wkb, tasks(), timeout=timeout)
+
+    # Stitch: map tile-local indices back to the full layers
+    geoms, source_index, hist_index, origin = [], [], [], []
+    for tile, near, (wkbs, local_source, local_hist, local_origin) in zip(tiles, tile_hists, results):
+        geoms.append(shapely.from_wkb(wkbs))
+        source_index.append(tile[local_source])
+        # -1 (BASE) indexes the appended -1
+        hist_index.append(np.append(near, -1)[local_hist])
+        origin.append(np.asarray(local_origin, dtype=object))
+    geoms, source_index, hist_index, origin = (
+        np.concatenate(a) if a else np.empty(0, dtype=dtype)
+        for a, dtype in zip((geoms, source_index, hist_index, origin), (object, int, int, object))
+    )
+    order = np.lexsort((hist_index, source_index))
+    return geoms[order], source_index[order], hist_index[order], origin[order]
+
+
+def overlay_layers(gdf_source, gdf_hist, min_area=1.0, tile_size=None, timeout=None):
+    """Overlay two GeoDataFrames in the geometry pool.
+
+    The historical layer is reprojected to the source CRS, which should be
+    projected so `min_area` (square units) is meaningful. Sources with more
+    than `tile_size` polygons (settings.OVERLAY_TILE_SIZE by default) are
+    overlaid tile by tile in parallel. The result keeps the source attributes
+    and adds origin, source_index and hist_index.
+    """
+    import geopandas as gpd
+
+    if gdf_hist.crs != gdf_source.crs:
+        gdf_hist = gdf_hist.to_crs(gdf_source.crs)
+    if tile_size is None:
+        tile_size = getattr(settings, 'OVERLAY_TILE_SIZE', 2000)
+
+    if len(gdf_source) > tile_size:
+        geoms, source_index, hist_index, origin = overlay_partitioned(
+            gdf_source.geometry.values, gdf_hist.geometry.values, tile_size, min_area, timeout=timeout,
+        )
+    else:
+        wkbs, source_index, hist_index, origin = executor.run(
+            overlay_wkb,
+            shapely.to_wkb(gdf_source.geometry.values),
+            shapely.to_wkb(gdf_hist.geometry.values),
+            min_area,
+            timeout=timeout,
+        )
+        geoms = shapely.from_wkb(wkbs)
+
+    attributes = gdf_source.drop(columns=gdf_source.geometry.name).iloc[source_index].reset_index(drop=True)
+    attributes['origin'] = list(origin)
+    attributes['source_index'] = source_index
+    attributes['hist_index'] = hist_index
+    return gpd.GeoDataFrame(attributes, geometry=geoms, crs=gdf_source.crs)
@@ -2,17 +2,50 @@ import geopandas as gpd
 
 import matplotlib.pyplot as plt
 import numpy as np
+from collections import OrderedDict
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from matplotlib.collections import PathCollection
+from matplotlib.figure import Figure
 import tkinter as tk
 from tkinter import ttk
 
+from shapefile_app.utils.render import (
+    draw_labels, draw_polygons, feature_colors, label_anchors, polygon_paths, simplify_for_display,
+)
+
 class ZoomableChart:
-    def __init__(self, fig, canvas, chart_frame):
+    """Scroll to zoom and middle-drag to pan, with a fast path for polygon layers.
+
+    While the user interacts the detailed artists (polygons with edges, labels)
+    are hidden and frames are blitted over a cached background of the empty
+    axes instead of redrawing the whole figure on every event:
+
+    - panning shifts a snapshot of the last full-resolution render;
+    - zooming draws a level-of-detail copy of the layer, simplified to about a
+      pixel, culled to the neighbourhood of the view and filled without edges.
+
+    The figure is redrawn at full resolution when the drag ends or the wheel
+    has been idle for `settle_ms`. Charts without a polygon gdf fall back to
+    plain redraws.
+    """
+    settle_ms = 250
+
+    def __init__(self, fig, canvas, chart_frame, gdf=None):
         self.fig = fig
         self.canvas = canvas
         self.chart_frame = chart_frame
+        self.gdf = gdf
         self.zoom_level = 1.0
         self.original_figsize = fig.get_size_inches()
+        self._interacting_ax = None
+        self._background = None
+        self._snapshot = None
+        self._pan_offset = [0, 0]
+        self._hidden = []
+        self._lod = None
+        self._lod_paths = {}
+        self._bounds = None
+        self._settle_timer = None
         self.setup_zoom_handlers()
 
     def setup_zoom_handlers(self):
@@ -48,50 +81,175 @@ class ZoomableChart:
                 ydata + (ylim[1] - ydata) * zoom_factor
             ]
 
-            # Apply new limits
+            # Apply new limits and blit; redraw in full once scrolling stops
+            self.begin_interaction(event.inaxes)
             event.inaxes.set_xlim(new_xlim)
             event.inaxes.set_ylim(new_ylim)
-            self.canvas.draw_idle()
+            # The snapshot no longer matches the scale
+            self._snapshot = None
+            self.blit()
+            self._schedule_settle()
 
     def on_button_press(self, event):
-        if event.button == 2:  # Middle mouse button for panning
+        if event.button == 2 and event.inaxes:  # Middle mouse button for panning
             self.dragging = True
             self.start_x = event.x
             self.start_y = event.y
             self.canvas.widgetlock(self)
+            self.begin_interaction(event.inaxes)
 
     def on_button_release(self, event):
-        if event.button == 2:
+        if event.button == 2 and self.dragging:
             self.dragging = False
             self.canvas.widgetlock.release(self)
+            self.end_interaction()
 
     def on_motion(self, event):
-        if self.dragging and event.inaxes:
+        # Keep panning when the cursor leaves the axes mid-drag
+        ax = self._interacting_ax
+        if self.dragging and ax is not None:
             dx = event.x - self.start_x
             dy = event.y - self.start_y
 
             # Convert pixel distance to data distance
-            xlim = event.inaxes.get_xlim()
-            ylim = event.inaxes.get_ylim()
+            xlim = ax.get_xlim()
+            ylim = ax.get_ylim()
 
             xrange = xlim[1] - xlim[0]
             yrange = ylim[1] - ylim[0]
 
-            # Adjust limits based on drag
-            scale_x = xrange / self.fig.bbox.width
-            scale_y = yrange / self.fig.bbox.height
+            # Adjust limits based on drag (event y grows upwards, like data y)
+            scale_x = xrange / ax.bbox.width
+            scale_y = yrange / ax.bbox.height
 
             new_xlim = [xlim[0] - dx * scale_x, xlim[1] - dx * scale_x]
-            new_ylim = [ylim[0] + dy * scale_y, ylim[1] + dy * scale_y]
+            new_ylim = [ylim[0] - dy * scale_y, ylim[1] - dy * scale_y]
 
-            event.inaxes.set_xlim(new_xlim)
-            event.inaxes.set_ylim(new_ylim)
+            ax.set_xlim(new_xlim)
+            ax.set_ylim(new_ylim)
 
             self.start_x = event.x
             self.start_y = event.y
+            self._pan_offset[0] += dx
+            self._pan_offset[1] += dy
+            self.blit()
+
+    def begin_interaction(self, ax):
+        """Cache the current render and the empty axes, and hide the detailed artists"""
+        if self._interacting_ax is ax:
+            return
+        if self._interacting_ax is not None:
+            self.end_interaction()
+        self._interacting_ax = ax
+        self._pan_offset = [0, 0]
+
+        self._lod = self._level_of_detail(ax)
+        if self._lod is None:
+            # Nothing to simplify (no gdf, or not a polygon layer): plain redraws
+            return
+        self._snapshot = self.canvas.copy_from_bbox(ax.bbox)
+        self._lod.set_animated(True)
+        detailed = [artist for artist in ax.collections + ax.artists + ax.texts if artist is not self._lod]
+        self._hidden = [artist for artist in detailed if artist.get_visible()]
+        for artist in self._hidden:
+            artist.set_visible(False)
+
+        # One draw without the heavy artists gives the background to blit over
+        self.canvas.draw()
+        self._background = self.canvas.copy_from_bbox(ax.bbox)
+
+    def blit(self):
+        ax = self._interacting_ax
+        if ax is None or self._background is None:
             self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        if self._snapshot is not None:
+            # Pan: move the last full render, cropped to the axes
+            x1, y1, x2, y2 = self._snapshot.get_extents()
+            # Region extents count rows from the top of the canvas
+            sx, sy = int(self._pan_offset[0]), -int(self._pan_offset[1])
+            self.canvas.restore_region(
+                self._snapshot,
+                bbox=(x1 + max(0, -sx), y1 + max(0, -sy), x2 - max(0, sx), y2 - max(0, sy)),
+                xy=(x1 + sx, y1 + sy),
+            )
+        else:
+            ax.draw_artist(self._lod)
+        self.canvas.blit(ax.bbox)
+
+    def end_interaction(self):
+        """Drop the level-of-detail layer and redraw at full resolution"""
+        if self._settle_timer is not None:
+            self._settle_timer.stop()
+            self._settle_timer = None
+        if self._interacting_ax is None:
+            return
+        if self._lod is not None:
+            self._lod.remove()
+            self._lod = None
+        for artist in self._hidden:
+            artist.set_visible(True)
+        self._hidden = []
+        self._background = None
+        self._snapshot = None
+        self._interacting_ax = None
+        self.canvas.draw_idle()
+
+    def _schedule_settle(self):
+        if self._settle_timer is None:
+            self._settle_timer = self.canvas.new_timer(interval=self.settle_ms)
+            self._settle_timer.single_shot = True
+            self._settle_timer.add_callback(self._settle)
+        else:
+            self._settle_timer.stop()
+        self._settle_timer.start()
+
+    def _settle(self):
+        self._settle_timer = None
+        if not self.dragging:
+            self.end_interaction()
+
+    def _level_of_detail(self, ax):
+        """Edge-less PathCollection of the layer around the view, simplified to about a pixel"""
+        if self.gdf is None or self.gdf.empty or not self.gdf.geom_type.isin(['Polygon', 'MultiPolygon']).all():
+            return None
+        # The collection draw_polygons made for this layer: one path per feature
+        polygons = [c for c in ax.collections
+                    if isinstance(c, PathCollection) and c.get_visible() and len(c.get_paths()) == len(self.gdf)]
+        if not polygons:
+            return None
+        full = polygons[0]
+
+        xlim, ylim = ax.get_xlim(), ax.get_ylim()
+        pixel = abs(xlim[1] - xlim[0]) / max(ax.bbox.width, 1)
+        # Reuse simplifications across nearby zoom levels (tolerance rounded to a power of two)
+        level = int(np.floor(np.log2(pixel))) if pixel > 0 else 0
+        paths = self._lod_paths.get(level)
+        if paths is None:
+            paths = self._lod_paths[level] = polygon_paths(self.gdf.geometry.simplify(2.0 ** level).values)
+
+        # Keep features within a view's width/height of the view, so zooming out has content
+        if self._bounds is None:
+            self._bounds = self.gdf.geometry.bounds.to_numpy()
+        width, height = abs(xlim[1] - xlim[0]), abs(ylim[1] - ylim[0])
+        minx, maxx = min(xlim) - width, max(xlim) + width
+        miny, maxy = min(ylim) - height, max(ylim) + height
+        bounds = self._bounds
+        near = np.flatnonzero(
+            (bounds[:, 2] >= minx) & (bounds[:, 0] <= maxx) & (bounds[:, 3] >= miny) & (bounds[:, 1] <= maxy)
+        )
+
+        facecolors = full.get_facecolor()
+        if len(facecolors) == len(paths):
+            facecolors = facecolors[near]
+        lod = PathCollection([paths[i] for i in near], facecolors=facecolors, linewidths=0,
+                             antialiased=False, alpha=full.get_alpha(), zorder=full.get_zorder())
+        ax.add_collection(lod, autolim=False)
+        return lod
 
-def plot_geodataframe(ax, gdf, title):
+
+def plot_geodataframe(ax, gdf, title, annotate=True):
     """Helper function to plot GeoDataFrame with annotations and color coding"""
     if gdf is not None and not gdf.empty and hasattr(gdf, 'geometry'):
         try:
@@ -101,45 +259,22 @@ def plot_geodataframe(ax, gdf, title):
             # Define default color (steelblue) for when no color column exists
             default_color = 'steelblue'
 
-            if has_color_column:
-                # Plot each geometry with its specific color
-                for idx, (geometry, color) in enumerate(zip(gdf.geometry, gdf['colour'])):
-                    # Create a temporary GeoDataFrame for this single geometry
-                    temp_gdf = gpd.GeoDataFrame([{'geometry': geometry}], crs=gdf.crs)
-
-                    # Plot with the specified color, fallback to default if color is invalid
-                    try:
-                        temp_gdf.plot(ax=ax, color=color, alpha=0.7, edgecolor='black', linewidth=0.8)
-                    except (ValueError, TypeError):
-                        # If color is invalid, use default color
-                        temp_gdf.plot(ax=ax, color=default_color, alpha=0.7, edgecolor='black', linewidth=0.8)
+            if gdf.geom_type.isin(['Polygon', 'MultiPolygon']).all():
+                # One PathCollection for the whole layer; invalid colours fall back to the default
+                colors = gdf['colour'] if has_color_column else default_color
+                draw_polygons(ax, gdf, colors, alpha=0.7, edgecolor='black', linewidth=0.8)
+            elif has_color_column:
+                # Points/lines: let geopandas draw them, validating colours the same way
+                gdf.plot(ax=ax, color=feature_colors(gdf['colour'], default_color), alpha=0.7, edgecolor='black', linewidth=0.8)
             else:
                 # Plot all geometries with default color if no color column exists
                 gdf.plot(ax=ax, color=default_color, alpha=0.7, edgecolor='black', linewidth=0.8)
 
             # Add annotations for polygons (regardless of color)
-            for idx, geometry in enumerate(gdf.geometry):
-                if hasattr(geometry, 'representative_point'):
-                    try:
-                        rep_point = geometry.representative_point()
-                        ax.annotate(str(idx),
-                                  (rep_point.x, rep_point.y),
-                                  xytext=(3, 3), textcoords="offset points",
-                                  fontsize=8, fontweight='bold',
-                                  bbox=dict(boxstyle="round,pad=0.2", facecolor='white', alpha=0.8, edgecolor='black'),
-                                  ha='center', va='center')
-                    except:
-                        # If representative_point fails, use centroid
-                        try:
-                            centroid = geometry.centroid
-                            ax.annotate(str(idx),
-                                      (centroid.x, centroid.y),
-                                      xytext=(3, 3), textcoords="offset points",
-                                      fontsize=8, fontweight='bold',
-                                      bbox=dict(boxstyle="round,pad=0.2", facecolor='white', alpha=0.8, edgecolor='black'),
-                                      ha='center', va='center')
-                        except:
-                            pass
+            if annotate:
+                draw_labels(ax, label_anchors(gdf.geometry.values), range(len(gdf)),
+                            offset=(3, 3), fontsize=8, fontweight='bold',
+                            bbox=dict(boxstyle="round,pad=0.2", facecolor='white', alpha=0.8, edgecolor='black'))
 
             ax.set_title(title, fontweight='bold')
             # Remove axis labels
@@ -211,7 +346,7 @@ class IndividualChartPopup:
         self.canvas.draw()
 
         # Make it zoomable
-        ZoomableChart(self.fig, self.canvas, chart_frame)
+        ZoomableChart(self.fig, self.canvas, chart_frame, gdf=self.gdf)
 
         # Add enhanced toolbar
         toolbar_frame = tk.Frame(chart_frame)
@@ -300,16 +435,147 @@ class IndividualChartPopup:
             self.popup_window.destroy()
             self.popup_window = None
 
-def create_tabbed_charts(*tab_lists, tab_names=None, tab_descriptions=None, chart_titles=None, chart_descriptions=None):
+class LazyChart:
+    """Chart slot in a tab whose figure is only built while it is on screen.
+
+    Until render() is called (and again after release()) the slot is a
+    placeholder of the chart's size, so tabs can lay out hundreds of charts
+    without creating a single figure. In progressive mode large layers are
+    first drawn simplified and without labels, then redrawn in full.
+    """
+    figsize = (6, 4.5)
+    dpi = 100
+    toolbar_height = 40
+    # Layers smaller than this are cheap enough to draw in full straight away
+    preview_min_features = 500
+
+    def __init__(self, parent, gdf, title, progressive=True, on_render=None):
+        self.gdf = gdf
+        self.title = title
+        self.progressive = progressive
+        self.on_render = on_render
+        self.frame = tk.Frame(parent, relief=tk.RAISED, bd=1,
+                              width=int(self.figsize[0] * self.dpi),
+                              height=int(self.figsize[1] * self.dpi) + self.toolbar_height)
+        # Keep the placeholder's size so the scroll region is right before rendering
+        self.frame.pack_propagate(False)
+        self.placeholder = tk.Label(self.frame, text='Loading chart...', bg='white', fg='grey')
+        self.placeholder.pack(fill=tk.BOTH, expand=True)
+        self.fig = None
+        self.canvas = None
+        self.toolbar_frame = None
+        self.zoom_chart = None
+        self._preview_limits = None
+        self._generation = 0
+
+    @property
+    def rendered(self):
+        return self.fig is not None
+
+    def render(self):
+        if self.rendered:
+            return
+        self._generation += 1
+        self.placeholder.pack_forget()
+
+        self.fig = Figure(figsize=self.figsize, dpi=self.dpi)
+        ax = self.fig.add_subplot()
+        preview = (self.progressive and self.gdf is not None and hasattr(self.gdf, 'geometry')
+                   and len(self.gdf) >= self.preview_min_features)
+        if preview:
+            plot_geodataframe(ax, simplify_for_display(self.gdf, self.figsize[0] * self.dpi), self.title, annotate=False)
+            self._preview_limits = (ax.get_xlim(), ax.get_ylim())
+        else:
+            plot_geodataframe(ax, self.gdf, self.title)
+
+        self.canvas = FigureCanvasTkAgg(self.fig, self.frame)
+        self.zoom_chart = ZoomableChart(self.fig, self.canvas, self.frame, gdf=self.gdf)
+
+        # Add matplotlib navigation toolbar for each chart
+        self.toolbar_frame = tk.Frame(self.frame)
+        self.toolbar_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        toolbar = NavigationToolbar2Tk(self.canvas, self.toolbar_frame)
+        toolbar.update()
+
+        self.canvas.get_tk_widget().pack(padx=5, pady=5, fill=tk.BOTH, expand=True)
+        self.canvas.draw_idle()
+        if self.on_render:
+            self.on_render(self)
+
+        if preview:
+            # Refine once Tk has painted the preview
+            generation = self._generation
+            self.frame.after_idle(lambda: self.frame.after(1, lambda: self._refine(generation)))
+
+    def _refine(self, generation):
+        if generation != self._generation or not self.rendered:
+            return
+        ax = self.fig.axes[0]
+        limits = (ax.get_xlim(), ax.get_ylim())
+        ax.clear()
+        plot_geodataframe(ax, self.gdf, self.title)
+        # Keep any zoom or pan made while the preview was showing
+        if limits != self._preview_limits:
+            ax.set_xlim(limits[0])
+            ax.set_ylim(limits[1])
+        self._preview_limits = None
+        self.canvas.draw_idle()
+
+    def release(self):
+        """Destroy the figure and its widgets, leaving the placeholder"""
+        if not self.rendered:
+            return
+        self._generation += 1
+        self.canvas.get_tk_widget().destroy()
+        self.toolbar_frame.destroy()
+        self.fig.clear()
+        self.fig = self.canvas = self.toolbar_frame = self.zoom_chart = None
+        self.placeholder.pack(fill=tk.BOTH, expand=True)
+
+
+class ChartBudget:
+    """Least-recently-shown cache of rendered LazyCharts.
+
+    show() renders the charts currently on screen and releases the ones shown
+    longest ago once more than `max_live` figures exist. Charts on screen are
+    never released, even if they alone exceed the budget.
+    """
+
+    def __init__(self, max_live=12):
+        self.max_live = max_live
+        self.charts = OrderedDict()
+
+    def show(self, visible):
+        for chart in visible:
+            chart.render()
+            self.charts[chart] = None
+            self.charts.move_to_end(chart)
+
+        for chart in list(self.charts):
+            if len(self.charts) <= self.max_live:
+                break
+            if chart not in visible:
+                del self.charts[chart]
+                chart.release()
+
+
+def create_tabbed_charts(*tab_lists, tab_names=None, tab_descriptions=None, chart_titles=None, chart_descriptions=None,
+                         max_live_charts=12, progressive=True):
     """
     Create a tabbed multi-chart canvas with vertical scrolling.
 
+    Charts are only rendered when their tab is selected and they scroll into
+    view; once more than max_live_charts figures exist the least recently
+    shown off-screen ones are released.
+
     Parameters:
     *tab_lists: Variable number of lists, each containing GeoDataFrames for a tab
     tab_names: Optional list of names for each tab
     tab_descriptions: Optional list of descriptions for each tab
     chart_titles: Optional nested list of titles for each chart
     chart_descriptions: Optional nested list of descriptions for each chart
+    max_live_charts: Number of rendered figures to keep across all tabs
+    progressive: Draw large layers simplified first, then refine them
     """
     # Create main window
     root = tk.Tk()
@@ -350,6 +616,37 @@ def create_tabbed_charts(*tab_lists, tab_names=None, tab_descriptions=None, char
     elif isinstance(tab_descriptions, list):
         tab_descriptions = {i: desc for i, desc in enumerate(tab_descriptions)}
 
+    budget = ChartBudget(max_live_charts)
+    # Per tab frame: (scroll canvas, scrollable frame, LazyCharts)
+    tab_charts = {}
+    pending_refresh = []
+
+    def refresh_visible_charts():
+        """Render the charts of the selected tab that are within (or near) the viewport"""
+        pending_refresh.clear()
+        selected = notebook.select()
+        if selected not in tab_charts:
+            return
+        canvas, scrollable_frame, charts = tab_charts[selected]
+        # Look half a screen ahead so charts are ready as they scroll in
+        height = canvas.winfo_height()
+        top = canvas.canvasy(0) - height / 2
+        bottom = canvas.canvasy(0) + height * 1.5
+        frame_y = scrollable_frame.winfo_rooty()
+        visible = []
+        for chart in charts:
+            y = chart.frame.winfo_rooty() - frame_y
+            if y + chart.frame.winfo_height() >= top and y <= bottom:
+                visible.append(chart)
+        budget.show(visible)
+
+    def schedule_refresh(*args):
+        # Coalesce bursts of scroll/resize events into one refresh
+        if not pending_refresh:
+            pending_refresh.append(root.after(50, refresh_visible_charts))
+
+    notebook.bind('<<NotebookTabChanged>>', schedule_refresh)
+
     # Create each tab
     for tab_idx, tab_gdfs in enumerate(tab_lists):
         if not tab_gdfs:
@@ -367,8 +664,9 @@ def create_tabbed_charts(*tab_lists, tab_names=None, tab_descriptions=None, char
         v_scrollbar = ttk.Scrollbar(main_container, orient=tk.VERTICAL)
         v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-        # Create canvas with vertical scrollbar
-        canvas = tk.Canvas(main_container, yscrollcommand=v_scrollbar.set, bg='white')
+        # Create canvas with vertical scrollbar; scrolling may bring charts into view
+        canvas = tk.Canvas(main_container, bg='white',
+                           yscrollcommand=lambda *args, sb=v_scrollbar: (sb.set(*args), schedule_refresh()))
         canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         # Configure scrollbar
@@ -388,6 +686,7 @@ def create_tabbed_charts(*tab_lists, tab_names=None, tab_descriptions=None, char
 
         def on_canvas_configure(event, c=canvas, cw=canvas_window):
             c.itemconfig(cw, width=event.width)
+            schedule_refresh()
 
         canvas.bind("<Configure>", lambda e, c=canvas, cw=canvas_window: on_canvas_configure(e, c, cw))
 
@@ -404,7 +703,18 @@ def create_tabbed_charts(*tab_lists, tab_names=None, tab_descriptions=None, char
         charts_container = tk.Frame(scrollable_frame, bg='white')
         charts_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        zoomable_charts = []
+        charts = []
+        tab_charts[str(tab_frame)] = (canvas, scrollable_frame, charts)
+
+        # Fix mouse wheel scrolling for this tab
+        def _on_mousewheel(event, c=canvas):
+            c.yview_scroll(int(-1*(event.delta/120)), "units")
+
+        # Bind mouse wheel to the canvas and all its children (charts rebind as they render)
+        def bind_to_children(widget, c=canvas):
+            widget.bind("<MouseWheel>", lambda e: _on_mousewheel(e, c))
+            for child in widget.winfo_children():
+                bind_to_children(child, c)
 
         # Arrange charts in rows of 3 with wrapping
         charts_per_row = 3
@@ -443,43 +753,11 @@ def create_tabbed_charts(*tab_lists, tab_names=None, tab_descriptions=None, char
                                    bg='lightgreen', width=2)
             popup_button.pack(anchor='ne', pady=(0, 2))
 
-            # Create frame for the chart
-            chart_frame = tk.Frame(chart_container, relief=tk.RAISED, bd=1)
-            chart_frame.pack(fill=tk.BOTH, expand=True)
-
-            # Create figure for each chart - larger size like in the maximized view
-            fig, ax = plt.subplots(figsize=(6, 4.5))
-
-            # Plot the GeoDataFrame with annotations and color coding
-            plot_geodataframe(ax, gdf, chart_title)
-
-            # Embed in tkinter
-            chart_canvas = FigureCanvasTkAgg(fig, chart_frame)
-            chart_canvas.draw()
-
-            # Create zoomable chart instance
-            zoom_chart = ZoomableChart(fig, chart_canvas, chart_frame)
-            zoomable_charts.append(zoom_chart)
-
-            # Add matplotlib navigation toolbar for each chart
-            toolbar_frame = tk.Frame(chart_frame)
-            toolbar_frame.pack(side=tk.BOTTOM, fill=tk.X)
-
-            toolbar = NavigationToolbar2Tk(chart_canvas, toolbar_frame)
-            toolbar.update()
-
-            # Pack the chart canvas
-            chart_canvas.get_tk_widget().pack(padx=5, pady=5, fill=tk.BOTH, expand=True)
-
-        # Fix mouse wheel scrolling for this tab
-        def _on_mousewheel(event, c=canvas):
-            c.yview_scroll(int(-1*(event.delta/120)), "units")
-
-        # Bind mouse wheel to the canvas and all its children
-        def bind_to_children(widget):
-            widget.bind("<MouseWheel>", lambda e, c=canvas: _on_mousewheel(e, c))
-            for child in widget.winfo_children():
-                bind_to_children(child)
+            # Placeholder for the chart; the figure is built when it comes into view
+            chart = LazyChart(chart_container, gdf, chart_title, progressive=progressive,
+                              on_render=lambda chart, bind=bind_to_children: bind(chart.frame))
+            chart.frame.pack(fill=tk.BOTH, expand=True)
+            charts.append(chart)
 
         # Bind mouse wheel to the canvas and scrollable frame
         canvas.bind("<MouseWheel>", lambda e, c=canvas: _on_mousewheel(e, c))
@@ -496,6 +774,7 @@ def create_tabbed_charts(*tab_lists, tab_names=None, tab_descriptions=None, char
                           font=('Arial', 8), bg='lightyellow', relief=tk.SUNKEN)
     instructions.pack(side=tk.BOTTOM, fill=tk.X)
 
+    schedule_refresh()
     root.mainloop()
 
 # Example usage function with color demonstration
@@ -504,78 +783,68 @@ def example_usage():
     Example of how to use the function with sample data including color columns.
     This requires geopandas and some sample geographic data.
     """
-    try:
-        import geopandas as gpd
-        from shapely.geometry import Polygon
-
-        # Create sample GeoDataFrames with color columns
-        # Tab 1: Urban Areas with different colors
-        urban_polys = gpd.GeoDataFrame({
-            'geometry': [
-                Polygon([(0, 0), (1, 0), (1, 1), (0, 1)]),
-                Polygon([(2, 0), (3, 0), (3, 1), (2, 1)]),
-                Polygon([(1, 2), (2, 2), (2, 3), (1, 3)]),
-                Polygon([(3, 2), (4, 2), (4, 3), (3, 3)]),
-                Polygon([(0.5, 1.5), (1.5, 1.5), (1.5, 2.5), (0.5, 2.5)]),
-                Polygon([(2.5, 1.5), (3.5, 1.5), (3.5, 2.5), (2.5, 2.5)])
-            ],
-            'colour': ['red', 'blue', 'green', 'orange', 'purple', 'brown']
-        })
-
-        # Tab 2: Rural Areas with some colors repeated
-        rural_polys = gpd.GeoDataFrame({
-            'geometry': [
-                Polygon([(5, 0), (6, 0), (6, 1), (5, 1)]),
-                Polygon([(7, 0), (8, 0), (8, 1), (7, 1)]),
-                Polygon([(5, 2), (6, 2), (6, 3), (5, 3)]),
-                Polygon([(7, 2), (8, 2), (8, 3), (7, 3)]),
-                Polygon([(6, 4), (7, 4), (7, 5), (6, 5)])
-            ],
-            'colour': ['lightblue', 'lightgreen', 'lightblue', 'lightgreen', 'yellow']
-        })
-
-        # Tab 3: Mixed Areas without color column (should use default)
-        mixed_polys = gpd.GeoDataFrame({
-            'geometry': [
-                Polygon([(0, 4), (1, 4), (1, 5), (0, 5)]),
-                Polygon([(2, 4), (3, 4), (3, 5), (2, 5)]),
-                Polygon([(4, 4), (5, 4), (5, 5), (4, 5)]),
-                Polygon([(1, 6), (2, 6), (2, 7), (1, 7)]),
-                Polygon([(3, 6), (4, 6), (4, 7), (3, 7)]),
-                Polygon([(5, 6), (6, 6), (6, 7), (5, 7)])
-            ]
-            # No 'colour' column - will use default steelblue
-        })
-
-        # Create tab lists
-        tab1 = [urban_polys]
-        tab2 = [rural_polys]
-        tab3 = [mixed_polys]
+    from shapely.geometry import Polygon
+
+    # Create sample GeoDataFrames with color columns
+    # Tab 1: Urban Areas with different colors
+    urban_polys = gpd.GeoDataFrame({
+        'geometry': [
+            Polygon([(0, 0), (1, 0), (1, 1), (0, 1)]),
+            Polygon([(2, 0), (3, 0), (3, 1), (2, 1)]),
+            Polygon([(1, 2), (2, 2), (2, 3), (1, 3)]),
+            Polygon([(3, 2), (4, 2), (4, 3), (3, 3)]),
+            Polygon([(0.5, 1.5), (1.5, 1.5), (1.5, 2.5), (0.5, 2.5)]),
+            Polygon([(2.5, 1.5), (3.5, 1.5), (3.5, 2.5), (2.5, 2.5)])
+        ],
+        'colour': ['red', 'blue', 'green', 'orange', 'purple', 'brown']
+    })
+
+    # Tab 2: Rural Areas with some colors repeated
+    rural_polys = gpd.GeoDataFrame({
+        'geometry': [
+            Polygon([(5, 0), (6, 0), (6, 1), (5, 1)]),
+            Polygon([(7, 0), (8, 0), (8, 1), (7, 1)]),
+            Polygon([(5, 2), (6, 2), (6, 3), (5, 3)]),
+            Polygon([(7, 2), (8, 2), (8, 3), (7, 3)]),
+            Polygon([(6, 4), (7, 4), (7, 5), (6, 5)])
+        ],
+        'colour': ['lightblue', 'lightgreen', 'lightblue', 'lightgreen', 'yellow']
+    })
+
+    # Tab 3: Mixed Areas without color column (should use default)
+    mixed_polys = gpd.GeoDataFrame({
+        'geometry': [
+            Polygon([(0, 4), (1, 4), (1, 5), (0, 5)]),
+            Polygon([(2, 4), (3, 4), (3, 5), (2, 5)]),
+            Polygon([(4, 4), (5, 4), (5, 5), (4, 5)]),
+            Polygon([(1, 6), (2, 6), (2, 7), (1, 7)]),
+            Polygon([(3, 6), (4, 6), (4, 7), (3, 7)]),
+            Polygon([(5, 6), (6, 6), (6, 7), (5, 7)])
+        ]
+        # No 'colour' column - will use default steelblue
+    })
 
-        # Custom tab names and descriptions
-        tab_names = ["Urban Areas (Colored)", "Rural Districts (Colored)", "Mixed Zones (Default)"]
+    # Create tab lists
+    tab1 = [urban_polys]
+    tab2 = [rural_polys]
+    tab3 = [mixed_polys]
 
-        tab_descriptions = [
-            "Urban development patterns with custom color coding for different zones",
-            "Rural land use mapping with thematic color scheme",
-            "Mixed-use zones using default color scheme (no color column provided)"
-        ]
+    # Custom tab names and descriptions
+    tab_names = ["Urban Areas (Colored)", "Rural Districts (Colored)", "Mixed Zones (Default)"]
 
-        # Call the function
-        create_tabbed_charts(
-            tab1, tab2, tab3,
-            tab_names=tab_names,
-            tab_descriptions=tab_descriptions
-        )
+    tab_descriptions = [
+        "Urban development patterns with custom color coding for different zones",
+        "Rural land use mapping with thematic color scheme",
+        "Mixed-use zones using default color scheme (no color column provided)"
+    ]
 
-    except ImportError:
-        print("geopandas or shapely not available. Using empty example.")
-        # Fallback example without actual GeoDataFrames
-        empty_tab1 = [None]  # Placeholder for GeoDataFrames
-        empty_tab2 = [None]
-        empty_tab3 = [None]
+    # Call the function
+    create_tabbed_charts(
+        tab1, tab2, tab3,
+        tab_names=tab_names,
+        tab_descriptions=tab_descriptions
+    )
 
-        create_tabbed_charts(empty_tab1, empty_tab2, empty_tab3)
 
 # Uncomment to run the example
 # example_usage()
@@ -0,0 +1,261 @@
+"""
+Headless rendering of GeoDataFrames to PNG/SVG.
+
+Figures are created with matplotlib.figure.Figure on an Agg canvas rather than
+through pyplot, so nothing depends on a display or on pyplot's global figure
+registry and renders are safe to run in web workers and pool processes.
+Importing this module leaves the pyplot backend alone: the Tk tool
+(plot_canvas) shares the process.
+
+    fig = new_figure(800, 600)
+    gdf.plot(ax=fig.add_subplot())
+    png = to_bytes(fig)
+"""
+import io
+import math
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+import shapely
+from matplotlib.artist import Artist, allow_rasterization
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PathCollection
+from matplotlib.colors import is_color_like, to_rgba
+from matplotlib.figure import Figure
+from matplotlib.font_manager import FontProperties
+from matplotlib.path import Path
+from matplotlib.text import Text
+from matplotlib.transforms import IdentityTransform
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'pdf': 'application/pdf',
+}
+
+
+def new_figure(width=1000, height=1000, dpi=100):
+    """Figure of width x height pixels attached to an Agg canvas"""
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def to_buffer(fig, fmt='png', **kwargs):
+    """Write fig to a rewound BytesIO in the given format"""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, **kwargs)
+    buffer.seek(0)
+    return buffer
+
+
+def to_bytes(fig, fmt='png', **kwargs):
+    return to_buffer(fig, fmt, **kwargs).getvalue()
+
+
+def feature_colors(values, default='steelblue'):
+    """RGBA array (n x 4) for a column of colours; missing or invalid entries get `default`"""
+    default_rgba = to_rgba(default)
+    values = pd.Series(values, dtype=object)
+    values = values.where(values.notna(), None)
+    lookup = {}
+    for value in pd.unique(values):
+        valid = value is not None and is_color_like(value)
+        lookup[value] = to_rgba(value) if valid else default_rgba
+    return np.array([lookup[value] for value in values], dtype=float).reshape(-1, 4)
+
+
+def polygon_paths(geoms):
+    """One compound Path per (multi)polygon, holes included, built from flat coordinate arrays"""
+    geoms = np.asarray(geoms, dtype=object)
+    parts, part_geom = shapely.get_parts(geoms, return_index=True)
+    rings, ring_part = shapely.get_rings(parts, return_index=True)
+    coords, coord_ring = shapely.get_coordinates(rings, return_index=True)
+
+    # Each ring is MOVETO, LINETO..., CLOSEPOLY
+    codes = np.full(len(coords), Path.LINETO, dtype=Path.code_type)
+    ring_start = np.r_[0, np.flatnonzero(np.diff(coord_ring)) + 1]
+    ring_end = np.r_[ring_start[1:], len(coords)] - 1
+    codes[ring_start] = Path.MOVETO
+    codes[ring_end] = Path.CLOSEPOLY
+
+    # Split the flat arrays at geometry boundaries
+    coord_geom = part_geom[ring_part[coord_ring]]
+    bounds = np.searchsorted(coord_geom, np.arange(len(geoms) + 1))
+    return [
+        Path(coords[start:end], codes[start:end])
+        for start, end in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+def draw_polygons(ax, gdf, colors='steelblue', **kwargs):
+    """Draw all polygons of gdf as a single PathCollection and return it.
+
+    `colors` is one colour, an (n x 4) RGBA array or a per-feature sequence
+    (see feature_colors).
+    """
+    if isinstance(colors, str):
+        facecolors = to_rgba(colors)
+    elif isinstance(colors, np.ndarray) and colors.ndim == 2:
+        facecolors = colors
+    else:
+        facecolors = feature_colors(colors)
+    collection = PathCollection(polygon_paths(gdf.geometry.values), facecolors=facecolors, **kwargs)
+    ax.add_collection(collection, autolim=True)
+    ax.autoscale_view()
+
+    # Same aspect geopandas uses: stretch geographic coordinates by latitude
+    if gdf.crs is not None and gdf.crs.is_geographic and not gdf.empty:
+        miny, maxy = gdf.total_bounds[[1, 3]]
+        ax.set_aspect(1 / math.cos(math.radians((miny + maxy) / 2)))
+    else:
+        ax.set_aspect('equal')
+    return collection
+
+
+def simplify_for_display(gdf, pixels=600):
+    """Copy of gdf with geometries simplified to about one pixel of a `pixels`-wide view"""
+    if gdf.empty:
+        return gdf
+    minx, miny, maxx, maxy = gdf.total_bounds
+    tolerance = max(maxx - minx, maxy - miny) / pixels
+    return gdf.set_geometry(gdf.geometry.simplify(tolerance))
+
+
+def label_anchors(geoms):
+    """(n, 2) label positions: points themselves, a point inside each polygon/line otherwise.
+
+    Missing or empty geometries give NaN, so rows stay aligned with the input.
+    """
+    anchors = shapely.point_on_surface(np.asarray(geoms, dtype=object))
+    return np.column_stack([shapely.get_x(anchors), shapely.get_y(anchors)])
+
+
+class LabelCollection(Artist):
+    """Text labels at data positions drawn as one artist.
+
+    On every draw the anchors are projected at the current view and labels are
+    placed greedily in input order; a label overlapping one already placed is
+    skipped, so zooming in reveals more of them. Only labels that fit on screen
+    become Text draws, which keeps annotated plots of large layers fast.
+    """
+    zorder = 3
+
+    def __init__(self, xy, labels, offset=(0, 0), fontsize=9, color='black',
+                 fontweight='normal', bbox=None, declutter=True, **kwargs):
+        super().__init__()
+        xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        keep = np.isfinite(xy).all(axis=1)
+        self.xy = xy[keep]
+        self.labels = [str(label) for label, ok in zip(labels, keep) if ok]
+        self.offset = offset
+        self.declutter = declutter
+        self.fontproperties = FontProperties(size=fontsize, weight=fontweight)
+        self._text = Text(0, 0, '', fontproperties=self.fontproperties, color=color, bbox=bbox,
+                          ha='center', va='center', transform=IdentityTransform())
+        self._char_sizes = {}
+        self.update(kwargs)
+
+    def _label_sizes(self, renderer):
+        """Approximate (width, height) in pixels of each label, summing cached glyph widths"""
+        sizes = np.empty((len(self.labels), 2))
+        for i, label in enumerate(self.labels):
+            width = height = 0.0
+            for char in label:
+                size = self._char_sizes.get(char)
+                if size is None:
+                    w, h, _ = renderer.get_text_width_height_descent(char, self.fontproperties, ismath=False)
+                    size = self._char_sizes[char] = (w, h)
+                width += size[0]
+                height = max(height, size[1])
+            sizes[i] = width, height
+        # Breathing room between labels, plus the padding of a bbox if there is one
+        margin = 1.0 if self._text.get_bbox_patch() else 0.4
+        sizes += renderer.points_to_pixels(self.fontproperties.get_size_in_points() * margin)
+        return sizes
+
+    def _placed(self, renderer):
+        """Indices of labels to draw and their display positions"""
+        if not len(self.labels):
+            return np.empty(0, dtype=int), np.empty((0, 2))
+        points = self.get_transform().transform(self.xy)
+        points = points + renderer.points_to_pixels(np.asarray(self.offset, dtype=float))
+
+        candidates = np.arange(len(points))
+        if self.axes:
+            x0, y0, x1, y1 = self.axes.bbox.extents
+            inside = (points[:, 0] >= x0) & (points[:, 0] <= x1) & (points[:, 1] >= y0) & (points[:, 1] <= y1)
+            candidates = candidates[inside]
+        if not self.declutter or not len(candidates):
+            return candidates, points[candidates]
+
+        sizes = self._label_sizes(renderer)
+
+        # Two labels centred within the smallest label size of each other always
+        # collide, so keep only the first candidate per cell of that size ...
+        fine = np.floor(points[candidates] / sizes[candidates].min(axis=0)).astype(np.int64)
+        _, first = np.unique(fine, axis=0, return_index=True)
+        candidates = candidates[np.sort(first)]
+
+        # ... then place the rest greedily, checking neighbours in a coarse grid
+        cell = sizes[candidates].max(axis=0)
+        grid = defaultdict(list)
+        placed = []
+        for i in candidates:
+            (x, y), (w, h) = points[i], sizes[i]
+            cx, cy = int(x // cell[0]), int(y // cell[1])
+            neighbours = (
+                j
+                for gx in (cx - 1, cx, cx + 1)
+                for gy in (cy - 1, cy, cy + 1)
+                for j in grid.get((gx, gy), ())
+            )
+            if any(abs(x - points[j, 0]) * 2 < w + sizes[j, 0] and abs(y - points[j, 1]) * 2 < h + sizes[j, 1]
+                   for j in neighbours):
+                continue
+            grid[cx, cy].append(i)
+            placed.append(i)
+        placed = np.asarray(placed, dtype=int)
+        return placed, points[placed]
+
+    @allow_rasterization
+    def draw(self, renderer):
+        if not self.get_visible():
+            return
+        renderer.open_group('labelcollection', gid=self.get_gid())
+        self._text.set_figure(self.figure)
+        self._text.set_alpha(self.get_alpha())
+        indices, positions = self._placed(renderer)
+        for i, (x, y) in zip(indices, positions):
+            self._text.set_text(self.labels[i])
+            self._text.set_position((x, y))
+            self._text.draw(renderer)
+        renderer.close_group('labelcollection')
+        self.stale = False
+
+
+def draw_labels(ax, xy, labels, **kwargs):
+    """Add a LabelCollection to ax and return it (see LabelCollection for options)"""
+    collection = LabelCollection(xy, labels, **kwargs)
+    ax.add_artist(collection)
+    return collection
+
+
+def render_preview(gdf, width=400, height=400, fmt='png'):
+    """Borderless thumbnail of a layer, scaled to fill the image"""
+    fig = new_figure(width, height)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+    if not gdf.empty:
+        gdf.plot(ax=ax, color='steelblue', alpha=0.7, edgecolor='black', linewidth=0.3)
+    ax.set_aspect('equal', adjustable='datalim')
+    return to_bytes(fig, fmt, transparent=True)
+
+
+def render_preview_wkb(wkbs, crs, width, height, fmt):
+    """render_preview() for the geometry pool: geometries arrive as WKB"""
+    import geopandas as gpd
+
+    gdf = gpd.GeoDataFrame(geometry=shapely.from_wkb(wkbs), crs=crs)
+    return render_preview(gdf, width, height, fmt)
@@ -0,0 +1,109 @@
+"""
+Sliver detection and clean-up for a whole layer in one pass.
+
+A sliver is a polygon whose area is below `min_area` (square metres) or whose
+thinness ratio 4*pi*area / perimeter**2 (1 for a circle, ~0.79 for a square,
+towards 0 for long thin strips) is below `min_thinness`. Detection runs on
+projected (metre) coordinates.
+
+Each sliver is merged into the non-sliver neighbour it shares the longest
+boundary with. Neighbour candidates come from one bulk STRtree query, and
+shared boundary lengths are computed for every (sliver, neighbour) pair at
+once. Slivers that touch only other slivers join the group of the sliver they
+share the most boundary with, in later rounds. Slivers with no neighbour
+(islands) are left alone.
+
+    from shapefile_app.utils.slivers import find_slivers, merge_targets, union_groups
+    is_sliver = find_slivers(metric_geoms, min_area=1.0, min_thinness=0.05)
+    target = merge_targets(metric_geoms, is_sliver)   # -1 where nothing to merge into
+    targets, merged, groups = union_groups(geoms, target)
+"""
+import numpy as np
+import shapely
+
+
+def thinness(geoms):
+    """Thinness ratio 4*pi*area / perimeter**2 of each polygon (0 for empty ones)"""
+    area = shapely.area(geoms)
+    perimeter = shapely.length(geoms)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(perimeter > 0, 4 * np.pi * area / perimeter ** 2, 0.0)
+
+
+def find_slivers(geoms, min_area=0.0, min_thinness=0.0):
+    """Boolean mask of the polygons under either threshold (0 disables a threshold)"""
+    geoms = np.asarray(geoms, dtype=object)
+    present = ~(shapely.is_missing(geoms) | shapely.is_empty(geoms))
+    return present & ((shapely.area(geoms) < min_area) | (thinness(geoms) < min_thinness))
+
+
+def shared_boundaries(geoms, is_sliver):
+    """(sliver, neighbour, shared length) arrays for every sliver/neighbour pair sharing an edge"""
+    geoms = np.asarray(geoms, dtype=object)
+    slivers = np.flatnonzero(is_sliver)
+    tree = shapely.STRtree(geoms)
+    query_index, neighbour = tree.query(geoms[slivers], predicate='intersects')
+    sliver = slivers[query_index]
+    other = sliver != neighbour
+    sliver, neighbour = sliver[other], neighbour[other]
+
+    shared = shapely.length(shapely.intersection(shapely.boundary(geoms[sliver]), shapely.boundary(geoms[neighbour])))
+    # Touching at a point only is not a shared edge
+    edge = shared > 0
+    return sliver[edge], neighbour[edge], shared[edge]
+
+
+def merge_targets(geoms, is_sliver):
+    """Non-sliver polygon each polygon is to be merged into; -1 for non-slivers and unresolved slivers"""
+    is_sliver = np.asarray(is_sliver, dtype=bool)
+    sliver, neighbour, shared = shared_boundaries(geoms, is_sliver)
+    # Longest shared boundary first within each sliver
+    order = np.lexsort((-shared, sliver))
+    sliver, neighbour = sliver[order], neighbour[order]
+
+    # group: the non-sliver a polygon ends up in (itself for non-slivers)
+    group = np.where(is_sliver, -1, np.arange(len(is_sliver)))
+    while True:
+        eligible = (group[sliver] < 0) & (group[neighbour] >= 0)
+        if not eligible.any():
+            break
+        candidates, first = np.unique(sliver[eligible], return_index=True)
+        group[candidates] = group[neighbour[eligible][first]]
+    return np.where(is_sliver, group, -1)
+
+
+def union_groups(geoms, target):
+    """Union each target polygon with the slivers assigned to it.
+
+    Returns (targets, merged geometries, slivers per target as lists of
+    positions). Unions run on whole arrays, one round per sliver rank, so the
+    number of rounds is the largest number of slivers any one polygon absorbs.
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    slivers = np.flatnonzero(target >= 0)
+    slivers = slivers[np.argsort(target[slivers], kind='stable')]
+    targets, start, counts = np.unique(target[slivers], return_index=True, return_counts=True)
+    rank = np.arange(len(slivers)) - np.repeat(start, counts)
+    slot = np.repeat(np.arange(len(targets)), counts)
+
+    merged = geoms[targets].copy()
+    for r in range(counts.max(initial=0)):
+        this_round = rank == r
+        merged[slot[this_round]] = shapely.union(merged[slot[this_round]], geoms[slivers[this_round]])
+    groups = [group.tolist() for group in np.split(slivers, start[1:])] if len(targets) else []
+    return targets, merged, groups
+
+
+def merge_slivers_wkb(wkbs, metric_wkbs, min_area, min_thinness):
+    """Detect and merge slivers, for the geometry pool.
+
+    Detection uses `metric_wkbs` (the layer in a metre CRS); unions use
+    `wkbs`, so untouched vertices stay bit for bit what neighbours share.
+    Returns (targets, merged WKBs, slivers per target, unresolved slivers).
+    """
+    metric = shapely.from_wkb(metric_wkbs)
+    is_sliver = find_slivers(metric, min_area, min_thinness)
+    target = merge_targets(metric, is_sliver)
+    targets, merged, groups = union_groups(shapely.from_wkb(wkbs), target)
+    unresolved = np.flatnonzero(is_sliver & (target < 0))
+    return targets, shapely.to_wkb(merged), groups, unresolved
@@ -0,0 +1,175 @@
+"""
+Small multiples: any number of layers rendered side by side on one scale.
+
+Every panel shares the same extent and the same colour mapping, so a feature
+looks the same in each processing stage. Panels are rendered on Agg in the
+geometry pool (one task per panel, geometries shipped as WKB) and composed
+into a single PNG, or into a PDF with `per_page` panels per page.
+
+    from shapefile_app.utils.small_multiples import render_grid
+    png = render_grid([gdf_stage1, gdf_stage2, ...], ncols=4)
+    pdf = render_grid(stages, fmt='pdf', per_page=12)
+"""
+import io
+import math
+
+import numpy as np
+import pandas as pd
+import shapely
+from matplotlib import colormaps
+from matplotlib.colors import to_rgba
+
+from shapefile_app.utils import executor
+from shapefile_app.utils.render import (
+    draw_labels, draw_polygons, feature_colors, label_anchors, new_figure,
+)
+
+ORIGIN_COLOURS = {'BASE': 'limegreen', 'CUT': 'cyan'}
+DEFAULT_COLOUR = 'cornflowerblue'
+
+
+def shared_extent(gdfs, margin=0.02):
+    """(minx, miny, maxx, maxy) covering every layer, padded by `margin` of its size"""
+    bounds = np.array([gdf.total_bounds for gdf in gdfs if not gdf.empty])
+    if not len(bounds):
+        return 0.0, 0.0, 1.0, 1.0
+    minx, miny = bounds[:, :2].min(axis=0)
+    maxx, maxy = bounds[:, 2:].max(axis=0)
+    pad = max(maxx - minx, maxy - miny, 1e-9) * margin
+    return minx - pad, miny - pad, maxx + pad, maxy + pad
+
+
+def shared_colours(gdfs, colour_by=None, cmap='tab20'):
+    """Per-layer RGBA arrays using one mapping for all layers.
+
+    colour_by='index' colours features by index value, any other column name
+    by its values (both through `cmap`). Without colour_by a 'colour' column is
+    used as is, an 'origin' column highlights BASE/CUT features, and anything
+    else is drawn in DEFAULT_COLOUR.
+    """
+    if colour_by is not None:
+        values = [
+            gdf.index if colour_by == 'index'
+            else gdf[colour_by] if colour_by in gdf.columns
+            else [None] * len(gdf)
+            for gdf in gdfs
+        ]
+        categories = pd.unique(pd.concat([pd.Series(v, dtype=object) for v in values], ignore_index=True))
+        palette = colormaps[cmap]
+        lookup = {value: palette(i % palette.N) for i, value in enumerate(categories)}
+        return [np.array([lookup[value] for value in v], dtype=float).reshape(-1, 4) for v in values]
+
+    colours = []
+    for gdf in gdfs:
+        if 'colour' in gdf.columns:
+            colours.append(feature_colors(gdf['colour'], DEFAULT_COLOUR))
+        elif 'origin' in gdf.columns:
+            colours.append(feature_colors(gdf['origin'].map(ORIGIN_COLOURS), DEFAULT_COLOUR))
+        else:
+            colours.append(np.tile(to_rgba(DEFAULT_COLOUR), (len(gdf), 1)))
+    return colours
+
+
+def panel_title(gdf):
+    npolys = len(gdf)
+    area_ha = round(gdf.area.sum()/10000, 2) if gdf.crs is None or gdf.crs.is_projected else None
+    return f'Polys {npolys}. Area Ha {area_ha}' if area_ha is not None else f'Polys {npolys}'
+
+
+def panel_labels(gdf):
+    """Index labels, 'BASE (idx)' for BASE features (as annotate_plot)"""
+    labels = gdf.index.astype(str)
+    if 'origin' in gdf.columns:
+        labels = labels.where(gdf['origin'].to_numpy() != 'BASE', 'BASE (' + labels + ')')
+    return labels.tolist()
+
+
+def render_panel(wkbs, facecolors, labels, extent, aspect, title, width, height):
+    """Render one panel to an RGBA array (height x width x 4). Runs in the geometry pool."""
+    import geopandas as gpd
+
+    geoms = shapely.from_wkb(wkbs)
+    fig = new_figure(width, height)
+    ax = fig.add_subplot()
+    gdf = gpd.GeoDataFrame(geometry=geoms)
+    if len(gdf) and gdf.geom_type.isin(['Polygon', 'MultiPolygon']).all():
+        draw_polygons(ax, gdf, facecolors, edgecolor='black', linewidth=0.5)
+    elif len(gdf):
+        gdf.plot(ax=ax, color=facecolors, edgecolor='black', linewidth=0.5)
+    if labels:
+        draw_labels(ax, label_anchors(geoms), labels, offset=(3, 3), fontsize=8)
+
+    minx, miny, maxx, maxy = extent
+    ax.set_xlim(minx, maxx)
+    ax.set_ylim(miny, maxy)
+    ax.set_aspect(aspect, adjustable='box')
+    ax.set_title(title, fontsize=10)
+    ax.tick_params(labelsize=7)
+    fig.tight_layout()
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba()).copy()
+
+
+def render_grid(gdfs, titles=None, ncols=3, panel_size=(500, 400), fmt='png', per_page=None,
+                colour_by=None, annotate=True, timeout=None):
+    """Render gdfs as a grid of panels and return PNG or PDF bytes.
+
+    All layers are drawn in the CRS of the first one. For 'pdf', `per_page`
+    panels go on each page (default: all on one page).
+    """
+    if not gdfs:
+        raise ValueError('At least one GeoDataFrame is required')
+    if fmt not in ('png', 'pdf'):
+        raise ValueError(f'Unsupported format: {fmt}')
+
+    crs = gdfs[0].crs
+    gdfs = [gdf.to_crs(crs) if crs is not None and gdf.crs is not None and gdf.crs != crs else gdf for gdf in gdfs]
+    titles = list(titles or []) + [panel_title(gdf) for gdf in gdfs[len(titles or []):]]
+    extent = shared_extent(gdfs)
+    colours = shared_colours(gdfs, colour_by)
+    # Geographic layers are stretched by latitude, as geopandas does
+    aspect = 1 / math.cos(math.radians((extent[1] + extent[3]) / 2)) if crs is not None and crs.is_geographic else 1.0
+
+    width, height = panel_size
+    panels = executor.run_many(render_panel, [
+        (shapely.to_wkb(gdf.geometry.values), colour, panel_labels(gdf) if annotate else [],
+         extent, aspect, title, width, height)
+        for gdf, colour, title in zip(gdfs, colours, titles)
+    ], timeout=timeout)
+
+    if fmt == 'png':
+        return _compose_png(panels, ncols, width, height)
+    return _compose_pdf(panels, ncols, width, height, per_page or len(panels))
+
+
+def _compose_png(panels, ncols, width, height):
+    from matplotlib.image import imsave
+
+    ncols = min(ncols, len(panels))
+    nrows = math.ceil(len(panels) / ncols)
+    sheet = np.full((nrows * height, ncols * width, 4), 255, dtype=np.uint8)
+    for i, panel in enumerate(panels):
+        row, col = divmod(i, ncols)
+        sheet[row * height:(row + 1) * height, col * width:(col + 1) * width] = panel
+    buffer = io.BytesIO()
+    imsave(buffer, sheet, format='png')
+    return buffer.getvalue()
+
+
+def _compose_pdf(panels, ncols, width, height, per_page):
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    buffer = io.BytesIO()
+    with PdfPages(buffer) as pdf:
+        for start in range(0, len(panels), per_page):
+            page = panels[start:start + per_page]
+            cols = min(ncols, len(page))
+            rows = math.ceil(len(page) / cols)
+            fig = new_figure(cols * width, rows * height)
+            for i, panel in enumerate(page):
+                row, col = divmod(i, cols)
+                ax = fig.add_axes((col / cols, 1 - (row + 1) / rows, 1 / cols, 1 / rows))
+                ax.imshow(panel, interpolation='nearest')
+                ax.set_axis_off()
+            pdf.savefig(fig)
+    return buffer.getvalue()
@@ -0,0 +1,180 @@
+"""
+Automatic subdivision of polygons into grid cells or equal-area strips.
+
+Works on projected (metre) coordinates, vectorized across every polygon at
+once:
+
+- grid: cells of a regular grid with a given cell size, aligned on multiples
+  of the cell size so that the cells of neighbouring polygons line up;
+- strips: N strips of equal area, cut across the longer side of each
+  polygon's bounding box. The cut positions are found by false position
+  (regula falsi), one intersection/area call per round for all cuts that
+  have not converged yet.
+
+Cells and strips are laid out in metres, but for geographic layers only the
+cutters are projected back: the polygons are cut in their own CRS, so the
+pieces' outer edges stay on the original edges (reprojecting whole pieces
+would bow them off their neighbours' edges by a fraction of a millimetre,
+enough for a later union to leave gaps).
+
+As in the overlay, multi-part pieces are exploded so every piece is a
+Polygon; a strip of a concave polygon may therefore come back as several
+pieces.
+
+    from shapefile_app.utils.subdivide import subdivide
+    pieces, source_index = subdivide(metric_geoms, 'grid', 100.0)
+    pieces, source_index = subdivide(geoms_4326, 'strips', 4, crs='epsg:28350')
+"""
+import numpy as np
+import shapely
+from pyproj import Transformer
+
+MODES = ('grid', 'strips')
+
+# Pieces smaller than this share of a cell/strip are numerical debris
+_MIN_AREA_SHARE = 1e-9
+
+
+def grid_ranges(geoms, cell_size):
+    """First and last grid column/row touched by each polygon's bounding box"""
+    bounds = shapely.bounds(geoms)
+    first = np.floor(bounds[:, :2] / cell_size).astype(np.int64)
+    last = np.maximum(np.ceil(bounds[:, 2:] / cell_size).astype(np.int64) - 1, first)
+    return first, last
+
+
+def count_grid_cells(geoms, cell_size):
+    """Candidate cells of a grid subdivision (an upper bound on the pieces)"""
+    first, last = grid_ranges(geoms, cell_size)
+    return int(np.prod(last - first + 1, axis=1).sum())
+
+
+def grid_cells(geoms, cell_size):
+    """(cells, source_index): the grid cells of `cell_size` over each polygon's bounding box"""
+    first, last = grid_ranges(geoms, cell_size)
+    nx, ny = (last - first + 1).T
+    counts = nx * ny
+    source = np.repeat(np.arange(len(geoms)), counts)
+    # Position of each cell within its polygon's block of cells
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    x0 = (first[source, 0] + local % nx[source]) * cell_size
+    y0 = (first[source, 1] + local // nx[source]) * cell_size
+    return shapely.box(x0, y0, x0 + cell_size, y0 + cell_size), source
+
+
+def equal_area_cuts(geoms, parts, tolerance=1e-6, max_iterations=60):
+    """Cut positions, shape (n, parts - 1), along each polygon's longer bounding-box side.
+
+    Each cut leaves k/parts of the polygon's area to its left (or below it),
+    to within `tolerance` of the polygon's area. Returns (cuts, vertical):
+    `vertical` is True where the cuts are x values.
+    """
+    bounds = shapely.bounds(geoms)
+    vertical = (bounds[:, 2] - bounds[:, 0]) >= (bounds[:, 3] - bounds[:, 1])
+    lo = np.where(vertical, bounds[:, 0], bounds[:, 1])
+    hi = np.where(vertical, bounds[:, 2], bounds[:, 3])
+
+    # One row per (polygon, cut); f(position) = area below the cut - target
+    source = np.repeat(np.arange(len(geoms)), parts - 1)
+    area = shapely.area(geoms)[source]
+    target = area * np.tile(np.arange(1, parts), len(geoms)) / parts
+    low, high = lo[source].copy(), hi[source].copy()
+    f_low, f_high = -target, area - target
+    position = (low + high) / 2
+    side = np.zeros(len(source), dtype=np.int8)
+    active = np.ones(len(source), dtype=bool)
+
+    # Illinois false position: area is monotonic in the cut position and
+    # piecewise smooth, so few rounds are needed; each round only evaluates
+    # the cuts not yet within tolerance
+    for _ in range(max_iterations):
+        rows = np.flatnonzero(active)
+        if not len(rows):
+            break
+        # f_low < 0 <= f_high, so the secant always crosses zero inside the bracket
+        guess = high[rows] - f_high[rows] * (high[rows] - low[rows]) / (f_high[rows] - f_low[rows])
+        guess = np.where((guess > low[rows]) & (guess < high[rows]), guess, (low[rows] + high[rows]) / 2)
+        position[rows] = guess
+        f = shapely.area(shapely.intersection(geoms[source[rows]], _lower_part(bounds[source[rows]], vertical[source[rows]], guess))) - target[rows]
+
+        below = f < 0
+        # Same end moved twice in a row: halve the other end's value
+        f_high[rows] = np.where(below & (side[rows] == -1), f_high[rows] / 2, f_high[rows])
+        f_low[rows] = np.where(~below & (side[rows] == 1), f_low[rows] / 2, f_low[rows])
+        low[rows] = np.where(below, guess, low[rows])
+        f_low[rows] = np.where(below, f, f_low[rows])
+        high[rows] = np.where(below, high[rows], guess)
+        f_high[rows] = np.where(below, f_high[rows], f)
+        side[rows] = np.where(below, -1, 1)
+        active[rows] = np.abs(f) > area[rows] * tolerance
+    return position.reshape(len(geoms), parts - 1), vertical
+
+
+def equal_area_strips(geoms, parts):
+    """(strips, source_index): boxes that cut each polygon into `parts` pieces of equal area"""
+    cuts, vertical = equal_area_cuts(geoms, parts)
+    bounds = shapely.bounds(geoms)
+    lo = np.where(vertical, bounds[:, 0], bounds[:, 1])
+    hi = np.where(vertical, bounds[:, 2], bounds[:, 3])
+    edges = np.column_stack([lo, cuts, hi])
+
+    source = np.repeat(np.arange(len(geoms)), parts)
+    start, end = edges[:, :-1].ravel(), edges[:, 1:].ravel()
+    b = bounds[source]
+    strips = np.where(
+        vertical[source],
+        shapely.box(start, b[:, 1], end, b[:, 3]),
+        shapely.box(b[:, 0], start, b[:, 2], end),
+    )
+    return strips, source
+
+
+def subdivide(geoms, mode, value, crs=None):
+    """(pieces, source_index) for mode 'grid' (value: cell size) or 'strips' (value: number of strips).
+
+    Without `crs` the geometries are in metres already; with it they are
+    EPSG:4326 and `crs` is the metre CRS the cells/strips are laid out in.
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    if crs is None:
+        metric = geoms
+    else:
+        metric = shapely.transform(geoms, Transformer.from_crs('EPSG:4326', crs, always_xy=True).transform, interleaved=False)
+
+    if mode == 'grid':
+        cutters, source = grid_cells(metric, float(value))
+    else:
+        cutters, source = equal_area_strips(metric, int(value))
+    if crs is not None:
+        # Corners only: neighbouring cells/strips share corner coordinates, so they still line up
+        cutters = shapely.transform(cutters, Transformer.from_crs(crs, 'EPSG:4326', always_xy=True).transform, interleaved=False)
+
+    shapely.prepare(geoms)
+    hit = shapely.intersects(geoms[source], cutters)
+    cutters, source = cutters[hit], source[hit]
+    return _polygon_parts(shapely.intersection(geoms[source], cutters), source, shapely.area(cutters))
+
+
+def subdivide_wkb(wkbs, mode, value, crs=None):
+    """subdivide() on WKB, for the geometry pool"""
+    pieces, source = subdivide(shapely.from_wkb(wkbs), mode, value, crs)
+    return shapely.to_wkb(pieces), source
+
+
+def _lower_part(bounds, vertical, position):
+    """Boxes covering each bounding box up to `position` (left of it, or below it)"""
+    return np.where(
+        vertical,
+        shapely.box(bounds[:, 0], bounds[:, 1], position, bounds[:, 3]),
+        shapely.box(bounds[:, 0], bounds[:, 1], bounds[:, 2], position),
+    )
+
+
+def _polygon_parts(pieces, source, reference_area):
+    """Explode pieces into Polygons, dropping lines/points and debris (relative to each piece's cutter area)"""
+    parts, index = shapely.get_parts(pieces, return_index=True)
+    reference_area = np.broadcast_to(reference_area, len(pieces))[index]
+    keep = (shapely.get_type_id(parts) == 3) & (shapely.area(parts) > reference_area * _MIN_AREA_SHARE)
+    return parts[keep], source[index[keep]]
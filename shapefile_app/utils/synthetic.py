@@ -0,0 +1,72 @@
+"""
+Synthetic polygon layers for benchmarks.
+
+Tessellations share their interior edges exactly, like the parcel layers we
+get from upstream, so union/merge/cut behave as they do on real data.
+"""
+import io
+import math
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+import shapely
+
+
+def grid_polygons(nx, ny, size=100.0, origin=(0.0, 0.0)):
+    """Return an nx * ny square tessellation as a shapely geometry array"""
+    ix, iy = np.meshgrid(np.arange(nx), np.arange(ny))
+    x0 = origin[0] + ix.ravel() * size
+    y0 = origin[1] + iy.ravel() * size
+    return shapely.box(x0, y0, x0 + size, y0 + size)
+
+
+def tessellation(n, cell=0.001, origin=(115.9, -34.2), jitter=0.3, seed=0):
+    """Return n quadrilateral parcels on a jittered grid (lon/lat degrees).
+
+    Interior vertices are moved by up to `jitter` cells, so parcels are
+    irregular but neighbours still share their edges vertex for vertex.
+    Features are in row-major order: i and i + 1 are usually neighbours.
+    """
+    nx = int(math.ceil(math.sqrt(n)))
+    ny = int(math.ceil(n / nx))
+    rng = np.random.default_rng(seed)
+
+    xs, ys = np.meshgrid(np.arange(nx + 1, dtype=float), np.arange(ny + 1, dtype=float))
+    interior = np.zeros(xs.shape, dtype=bool)
+    interior[1:-1, 1:-1] = True
+    xs[interior] += rng.uniform(-jitter, jitter, interior.sum())
+    ys[interior] += rng.uniform(-jitter, jitter, interior.sum())
+    vertices = np.stack([origin[0] + xs * cell, origin[1] + ys * cell], axis=-1)
+
+    # Ring per cell: (r, c) -> (r, c+1) -> (r+1, c+1) -> (r+1, c) -> (r, c)
+    rings = np.stack([
+        vertices[:-1, :-1], vertices[:-1, 1:], vertices[1:, 1:], vertices[1:, :-1], vertices[:-1, :-1],
+    ], axis=2).reshape(-1, 5, 2)
+    return shapely.polygons(rings[:n])
+
+
+def parcels_gdf(n, crs='epsg:4326', **kwargs):
+    """tessellation() as a GeoDataFrame with a few attribute columns"""
+    import geopandas as gpd
+
+    geoms = tessellation(n, **kwargs)
+    return gpd.GeoDataFrame({
+        'parcel_id': np.arange(len(geoms)),
+        'name': [f'Parcel {i}' for i in range(len(geoms))],
+        'zone': np.arange(len(geoms)) % 7,
+    }, geometry=geoms, crs=crs)
+
+
+def shapefile_zip(gdf, name='parcels'):
+    """Write gdf as a zipped ESRI Shapefile and return it as a BytesIO"""
+    buffer = io.BytesIO()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        gdf.to_file(os.path.join(temp_dir, f'{name}.shp'), driver='ESRI Shapefile')
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+            for file in sorted(os.listdir(temp_dir)):
+                zip_ref.write(os.path.join(temp_dir, file), file)
+    buffer.seek(0)
+    buffer.name = f'{name}.zip'
+    return buffer
@@ -0,0 +1,232 @@
+"""
+Shared-arc topology for polygon layers.
+
+Parcel layers are tessellations: every interior edge belongs to two polygons
+and is stored twice in GeoJSON. Here each ring is split at junctions (points
+where three or more edges meet) into arcs, identical arcs are stored once, and
+every polygon becomes lists of arc references, TopoJSON style: `i` is arc i
+as stored, `~i` (-i - 1) is arc i reversed.
+
+    topology = build_topology(geoms)     # {'arcs': [...], 'geometries': [...]}
+    merged, polygons = merge(topology, [3, 7])
+    topojson = to_topojson(topology, properties)
+
+Arcs keep full-precision coordinates, so geometries decode exactly; to_topojson()
+quantizes and delta-encodes them for the wire. Merging is arc removal: arcs
+used by two of the merged polygons are dropped and the rest are chained into
+rings, so the merged outline is made of the very arcs its neighbours use and
+no gaps or slivers can appear between them.
+
+Each entry of `geometries` is None (no polygon geometry) or a list of
+polygons, each a list of rings (exterior first), each a list of arc refs.
+Exteriors run counter-clockwise and holes clockwise.
+"""
+import numpy as np
+import shapely
+
+
+def build_topology(geoms):
+    """Topology of a geometry array; one entry of 'geometries' per input"""
+    geoms = np.asarray(geoms, dtype=object)
+    parts, part_of = shapely.get_parts(geoms, return_index=True)
+    polygonal = (shapely.get_type_id(parts) == shapely.GeometryType.POLYGON) & ~shapely.is_empty(parts)
+    polys, poly_of = shapely.orient_polygons(parts[polygonal]), part_of[polygonal]
+
+    rings, ring_of = shapely.get_rings(polys, return_index=True)
+    coords, vertex_ring = shapely.get_coordinates(rings, return_index=True)
+    points, point_ids = np.unique(coords, axis=0, return_inverse=True)
+    point_ids = point_ids.ravel()
+
+    # Junctions: points with other than two distinct edges (rings are closed,
+    # so each vertex is joined to the next one of the same ring)
+    same_ring = vertex_ring[:-1] == vertex_ring[1:]
+    a, b = point_ids[:-1][same_ring], point_ids[1:][same_ring]
+    edges = np.unique(np.column_stack([np.minimum(a, b), np.maximum(a, b)]), axis=0)
+    degree = np.bincount(edges.ravel(), minlength=len(points))
+    junction = degree != 2
+
+    arcs, arc_index = [], {}
+
+    def arc_ref(ids):
+        key = tuple(ids)
+        if key in arc_index:
+            return arc_index[key]
+        reverse = key[::-1]
+        if reverse in arc_index:
+            return ~arc_index[reverse]
+        arc_index[key] = len(arcs)
+        arcs.append(points[ids].tolist())
+        return arc_index[key]
+
+    ring_refs = []
+    for ids in np.split(point_ids, np.flatnonzero(np.diff(vertex_ring)) + 1):
+        ids = ids[:-1]
+        cuts = np.flatnonzero(junction[ids])
+        # Rings without junctions are one arc, started at a canonical point so
+        # a ring shared whole (an island and its hole) is found either way
+        start = cuts[0] if len(cuts) else int(np.argmin(ids))
+        ids = np.roll(ids, -start)
+        cuts = cuts - start if len(cuts) else np.array([0])
+        bounds = np.append(cuts, len(ids))
+        ids = np.append(ids, ids[0])
+        ring_refs.append([arc_ref(ids[i:j + 1]) for i, j in zip(bounds[:-1], bounds[1:])])
+
+    geometries = [None] * len(geoms)
+    ring_starts = np.searchsorted(ring_of, np.arange(len(polys) + 1))
+    for p, feature in enumerate(poly_of):
+        if geometries[feature] is None:
+            geometries[feature] = []
+        geometries[feature].append(ring_refs[ring_starts[p]:ring_starts[p + 1]])
+    return {'arcs': arcs, 'geometries': geometries}
+
+
+def build_topology_wkb(wkbs):
+    """build_topology() for the geometry pool"""
+    return build_topology(shapely.from_wkb(wkbs))
+
+
+def _arc_coords(arcs, ref):
+    return arcs[ref] if ref >= 0 else arcs[~ref][::-1]
+
+
+def ring_coords(arcs, refs):
+    """Coordinates of a ring given as arc refs (each arc starts where the last ended)"""
+    coords = list(_arc_coords(arcs, refs[0]))
+    for ref in refs[1:]:
+        coords.extend(_arc_coords(arcs, ref)[1:])
+    return coords
+
+
+def to_shapely(topology, polygons):
+    """Polygon or MultiPolygon for one entry of topology['geometries']"""
+    if not polygons:
+        return None
+    arcs = topology['arcs']
+    shapes = [
+        shapely.Polygon(ring_coords(arcs, rings[0]), [ring_coords(arcs, ring) for ring in rings[1:]])
+        for rings in polygons
+    ]
+    return shapes[0] if len(shapes) == 1 else shapely.MultiPolygon(shapes)
+
+
+def merge(topology, indices):
+    """Merge geometries by removing the arcs they share.
+
+    Returns (geometry, polygons): the shapely result and its arc-ref form.
+    Arcs used by two of the merged polygons are dropped and the remaining
+    directed arcs are chained into rings; counter-clockwise rings become
+    exteriors and clockwise ones holes of the exterior that contains them.
+    Returns (None, None) if nothing polygonal is selected.
+    """
+    arcs = topology['arcs']
+    refs = [ref for i in indices for rings in (topology['geometries'][i] or []) for ring in rings for ref in ring]
+    if not refs:
+        return None, None
+    arc_ids = [ref if ref >= 0 else ~ref for ref in refs]
+    counts = np.bincount(arc_ids)
+    boundary = [ref for ref, arc_id in zip(refs, arc_ids) if counts[arc_id] == 1]
+
+    # Chain directed arcs end to start
+    starting_at = {}
+    for ref in boundary:
+        starting_at.setdefault(tuple(_arc_coords(arcs, ref)[0]), []).append(ref)
+    rings = []
+    for ref in boundary:
+        start = tuple(_arc_coords(arcs, ref)[0])
+        if ref not in starting_at.get(start, []):
+            continue
+        ring = []
+        while True:
+            starting_at[start].remove(ref)
+            ring.append(ref)
+            start = tuple(_arc_coords(arcs, ref)[-1])
+            if not starting_at.get(start):
+                break
+            ref = starting_at[start][0]
+        rings.append(ring)
+
+    linear = [shapely.LinearRing(ring_coords(arcs, ring)) for ring in rings]
+    ccw = shapely.is_ccw(linear)
+    exteriors = [i for i in range(len(rings)) if ccw[i]]
+    holes = {i: [] for i in exteriors}
+    for i in np.flatnonzero(~ccw):
+        point = shapely.Point(linear[i].coords[0])
+        owner = next((e for e in exteriors if shapely.Polygon(linear[e]).covers(point)), None)
+        if owner is not None:
+            holes[owner].append(i)
+    polygons = [[rings[e]] + [rings[h] for h in holes[e]] for e in exteriors]
+    return to_shapely(topology, polygons), polygons
+
+
+def replace_geometries(topology, removed, added):
+    """Topology with the geometries at `removed` dropped and `added` appended.
+
+    Arcs no longer referenced are dropped and the references renumbered.
+    """
+    removed = set(removed)
+    geometries = [g for i, g in enumerate(topology['geometries']) if i not in removed] + list(added)
+    used = sorted({ref if ref >= 0 else ~ref for g in geometries for rings in (g or []) for ring in rings for ref in ring})
+    renumber = {old: new for new, old in enumerate(used)}
+
+    def remap(ref):
+        return renumber[ref] if ref >= 0 else ~renumber[~ref]
+
+    return {
+        'arcs': [topology['arcs'][i] for i in used],
+        'geometries': [
+            None if g is None else [[[remap(ref) for ref in ring] for ring in rings] for rings in g]
+            for g in geometries
+        ],
+    }
+
+
+def to_topojson(topology, properties=None, name='layer', quantization=1000000):
+    """TopoJSON document for a topology.
+
+    Coordinates are quantized to a `quantization` x `quantization` grid over
+    the layer's bounding box and arcs are delta-encoded. Geometry ids are
+    feature positions; `properties` (one dict per geometry) is attached as is.
+    Features without polygons become empty GeometryCollections.
+    """
+    arcs = topology['arcs']
+    if arcs:
+        flat = np.concatenate([np.asarray(arc, dtype=float) for arc in arcs])
+        x0, y0 = flat.min(axis=0)
+        x1, y1 = flat.max(axis=0)
+    else:
+        x0 = y0 = 0.0
+        x1 = y1 = 1.0
+    kx = (x1 - x0) / (quantization - 1) or 1.0
+    ky = (y1 - y0) / (quantization - 1) or 1.0
+
+    encoded = []
+    for arc in arcs:
+        q = np.rint((np.asarray(arc, dtype=float) - (x0, y0)) / (kx, ky)).astype(np.int64)
+        delta = np.diff(q, axis=0, prepend=[[0, 0]])
+        # Points that collapse onto the previous one carry no information
+        keep = np.ones(len(delta), dtype=bool)
+        keep[1:-1] = delta[1:-1].any(axis=1)
+        q = q[keep]
+        encoded.append(np.diff(q, axis=0, prepend=[[0, 0]]).tolist())
+
+    objects = []
+    for i, polygons in enumerate(topology['geometries']):
+        obj = {'id': i}
+        if not polygons:
+            # Not polygonal (or missing): valid TopoJSON that draws nothing
+            obj.update(type='GeometryCollection', geometries=[])
+        elif len(polygons) == 1:
+            obj.update(type='Polygon', arcs=polygons[0])
+        else:
+            obj.update(type='MultiPolygon', arcs=polygons)
+        if properties is not None:
+            obj['properties'] = properties[i]
+        objects.append(obj)
+
+    return {
+        'type': 'Topology',
+        'bbox': [x0, y0, x1, y1],
+        'transform': {'scale': [kx, ky], 'translate': [x0, y0]},
+        'arcs': encoded,
+        'objects': {name: {'type': 'GeometryCollection', 'geometries': objects}},
+    }
@@ -0,0 +1,30 @@
+"""
+Content-Range bookkeeping for chunked uploads (see models.ChunkedUpload).
+
+A chunk is `bytes start-end/size` (end inclusive). It may overlap what was
+already received (a retried chunk) but may not leave a gap, and must lie
+inside the upload:
+
+    start, end, size = parse_content_range(request.headers.get('Content-Range', ''))
+    error = chunk_error(start, end, upload.received, upload.total_size)
+"""
+import re
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+def parse_content_range(header):
+    """(start, end, size) of a `bytes start-end/size` header, or None"""
+    match = CONTENT_RANGE.match(header or '')
+    if not match:
+        return None
+    return tuple(int(value) for value in match.groups())
+
+
+def chunk_error(start, end, received, total_size):
+    """Error message for a chunk that cannot be written after `received` bytes, or None"""
+    if start > received:
+        return f"Chunk starts at {start} but only {received} bytes were received"
+    if end >= total_size or end < start:
+        return f"Chunk {start}-{end} is outside the upload ({total_size} bytes)"
+    return None
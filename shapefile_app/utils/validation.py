@@ -0,0 +1,165 @@
+"""
+Geometry validation and repair for uploaded layers.
+
+Runs once at upload over the whole layer instead of buffer(0)/is_valid on
+single geometries during every edit:
+
+    features, report = validate_features(geojson_data['features'])
+
+Invalid polygons are repaired with make_valid; collections it returns are
+reduced to their polygonal parts (one Polygon/MultiPolygon per feature, so
+feature properties stay attached), and polygons with no area left are
+dropped. Points, lines and other non-polygonal geometries are kept as
+uploaded and listed in the report. Each kept feature gets a `geom_valid`
+property saying whether its geometry was valid as uploaded.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import shapely
+
+# Issues listed individually in the report; the counts cover the rest
+MAX_REPORTED_ISSUES = 100
+
+POLYGON_TYPES = [shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON]
+
+
+def repair_polygons(geoms):
+    """Validate and repair a geometry array.
+
+    Returns (repaired, was_valid, reasons): repaired holds a Polygon or
+    MultiPolygon per input, or None if nothing polygonal is left; reasons
+    holds the GEOS explanation for invalid inputs and None otherwise.
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    was_valid = shapely.is_valid(geoms)
+    invalid = np.flatnonzero(~was_valid)
+    reasons = np.full(len(geoms), None, dtype=object)
+    reasons[invalid] = shapely.is_valid_reason(geoms[invalid])
+
+    fixed = geoms.copy()
+    fixed[invalid] = shapely.make_valid(geoms[invalid])
+
+    # Keep the polygonal parts of every geometry (make_valid can return collections)
+    parts, part_of = shapely.get_parts(fixed, return_index=True)
+    polygonal = (shapely.get_type_id(parts) == shapely.GeometryType.POLYGON) & ~shapely.is_empty(parts)
+    parts, part_of = parts[polygonal], part_of[polygonal]
+    counts = np.bincount(part_of, minlength=len(geoms))
+
+    repaired = np.full(len(geoms), None, dtype=object)
+    single = counts == 1
+    repaired[single] = parts[np.isin(part_of, np.flatnonzero(single))]
+    multi = np.flatnonzero(counts > 1)
+    if len(multi):
+        in_multi = np.isin(part_of, multi)
+        # multipolygons() groups by consecutive index values 0..n-1
+        _, group = np.unique(part_of[in_multi], return_inverse=True)
+        repaired[multi] = shapely.multipolygons(parts[in_multi], indices=group)
+    return repaired, was_valid, reasons
+
+
+def parse_geometries(geometries):
+    """Shapely array from GeoJSON geometry dicts; unparsable ones become None"""
+    try:
+        # One encode/parse for the whole layer; the collection's members come back in order
+        collection = shapely.from_geojson(json.dumps({'type': 'GeometryCollection', 'geometries': geometries}))
+        geoms = shapely.get_parts(collection)
+        if len(geoms) == len(geometries):
+            return geoms
+    except shapely.errors.GEOSException:
+        pass
+    # Some geometry is broken: parse one by one so only that one is lost
+    return shapely.from_geojson([json.dumps(geometry) for geometry in geometries], on_invalid='ignore')
+
+
+def repair_layer(geoms):
+    """repair_polygons() for the polygons of a layer; other geometries pass through untouched.
+
+    Returns (geometries, was_valid, reasons, polygonal): missing entries stay
+    None, as do polygons with nothing polygonal left after repair.
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    polygonal = np.isin(shapely.get_type_id(geoms), POLYGON_TYPES)
+    result = geoms.copy()
+    was_valid = shapely.is_valid(geoms)
+    reasons = np.full(len(geoms), None, dtype=object)
+    result[polygonal], was_valid[polygonal], reasons[polygonal] = repair_polygons(geoms[polygonal])
+    return result, was_valid, reasons, polygonal
+
+
+def _issues(positions, geoms, kept, was_valid, reasons, polygonal):
+    """Report entries for the dropped, repaired and non-polygonal geometries, by feature number"""
+    issues = []
+    for feature, position in positions:
+        if not kept[position]:
+            reason = reasons[position] or ('No polygon area left' if polygonal[position] else 'Unreadable geometry')
+            issues.append({'feature': feature, 'reason': reason, 'action': 'dropped'})
+        elif not polygonal[position]:
+            issues.append({'feature': feature, 'reason': f'Not a polygon ({geoms[position].geom_type})', 'action': 'kept'})
+        elif not was_valid[position]:
+            issues.append({'feature': feature, 'reason': reasons[position], 'action': 'repaired'})
+    return issues
+
+
+def validate_features(features):
+    """Repair the polygons of a list of GeoJSON features.
+
+    Returns (features, report). Features without geometry are dropped and
+    counted; `report` summarises what was found and done.
+    """
+    with_geometry = [i for i, feature in enumerate(features) if feature.get('geometry')]
+    geoms = parse_geometries([features[i]['geometry'] for i in with_geometry])
+    repaired, was_valid, reasons, polygonal = repair_layer(geoms)
+
+    kept = ~shapely.is_missing(repaired)
+    changed = kept & polygonal & ~was_valid
+    geojson = np.full(len(repaired), None, dtype=object)
+    geojson[changed] = shapely.to_geojson(repaired[changed])
+
+    out = []
+    for position, i in enumerate(with_geometry):
+        if not kept[position]:
+            continue
+        feature = features[i]
+        geometry = json.loads(geojson[position]) if changed[position] else feature['geometry']
+        properties = dict(feature.get('properties') or {}, geom_valid=bool(was_valid[position]))
+        out.append({'type': 'Feature', 'geometry': geometry, 'properties': properties})
+
+    flagged = np.flatnonzero(~kept | ~polygonal | ~was_valid)
+    issues = _issues([(with_geometry[position], position) for position in flagged], geoms, kept, was_valid, reasons, polygonal)
+    return out, _report(len(features), len(out), polygonal, was_valid, kept, issues, len(features) - len(with_geometry))
+
+
+def validate_geodataframe(gdf):
+    """validate_features() for a GeoDataFrame read by a columnar reader.
+
+    Returns (geometry_wkb, properties, report): the kept features' repaired
+    geometries as a WKB array and their attributes, plus `geom_valid`, as a
+    DataFrame. Both stay columnar, so a pool worker hands them back as a few
+    buffers rather than a dict per feature.
+    """
+    geoms = np.asarray(gdf.geometry.array, dtype=object)
+    present = np.flatnonzero(~shapely.is_missing(geoms))
+    repaired, was_valid, reasons, polygonal = repair_layer(geoms[present])
+
+    kept = ~shapely.is_missing(repaired)
+    flagged = np.flatnonzero(~kept | ~polygonal | ~was_valid)
+    issues = _issues([(int(present[position]), position) for position in flagged], geoms[present], kept, was_valid, reasons, polygonal)
+
+    properties = gdf.drop(columns=gdf.geometry.name).iloc[present[kept]].reset_index(drop=True)
+    properties['geom_valid'] = was_valid[kept]
+    report = _report(len(gdf), len(properties), polygonal, was_valid, kept, issues, len(gdf) - len(present))
+    return shapely.to_wkb(repaired[kept]), pd.DataFrame(properties), report
+
+
+def _report(features_in, features_out, polygonal, was_valid, kept, issues, missing):
+    return {
+        'features_in': features_in,
+        'features_out': features_out,
+        'invalid': int((polygonal & ~was_valid).sum()),
+        'repaired': int((kept & polygonal & ~was_valid).sum()),
+        'dropped': int((~kept).sum()) + missing,
+        'non_polygon': int((kept & ~polygonal).sum()),
+        'issues': issues[:MAX_REPORTED_ISSUES],
+    }
@@ -1,14 +1,32 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
-from django.urls import reverse_lazy
+from django.contrib import messages
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.db.models import Q
+from django.urls import reverse, reverse_lazy
 from django.views.generic import ListView, CreateView, DetailView
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.utils import timezone
+from django.utils.text import slugify
+from . import events, instrumentation
+from .instrumentation import span
 from .forms import ShapefileUploadForm
-from .models import Shapefile
+from .models import ChunkedUpload, HistoricalLayer, Shapefile
+from .utils import export
+from .utils.export import EXPORT_FORMATS
+from .utils.ingest import UPLOAD_EXTENSIONS
+from .utils.render import CONTENT_TYPES
+from .utils.uploads import parse_content_range
 import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
 
 class MapView(ListView):
     model = Shapefile
@@ -25,59 +43,101 @@ class MapView(ListView):
         context['shapefiles_json'] = json.dumps(list(Shapefile.objects.values('id', 'name')))
         return context
 
+def parse_merge_ids(request):
+    """Read polygon ids from ?ids=[1,2] / ?ids=1,2 or a JSON body with selected_features"""
+    selected_feature_ids = []
+
+    # Try GET parameters first
+    ids_param = request.GET.get('ids', '')
+    if ids_param:
+        try:
+            selected_feature_ids = json.loads(ids_param)
+            if not isinstance(selected_feature_ids, list):
+                selected_feature_ids = [selected_feature_ids]
+        except json.JSONDecodeError:
+            # Handle comma-separated list format
+            selected_feature_ids = [id.strip() for id in ids_param.split(',') if id.strip()]
+    else:
+        # Try POST body
+        try:
+            data = json.loads(request.body)
+            selected_feature_ids = data.get('selected_features', [])
+        except (json.JSONDecodeError, AttributeError):
+            pass
+
+    return selected_feature_ids
+
+class InvalidEditRequest(ValueError):
+    """A request an edit view cannot run; the message tells the client what to send"""
+
+
+def edit_response(shapefile, success, message):
+    # 409: the edit was computed from a version another edit has replaced
+    return JsonResponse({
+        'success': success,
+        'message': message,
+        'has_processed_data': shapefile.has_processed_data,
+        'version': shapefile.processed_version
+    }, status=409 if shapefile.edit_conflict else 200)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
-class MergePolygonsView(View):
-    def get(self, request, pk):
-        return self._handle_merge_request(request, pk)
+class ProcessedEditView(View):
+    """POST applies one edit to the processed layer.
 
-    def post(self, request, pk):
-        return self._handle_merge_request(request, pk)
-
-    def _handle_merge_request(self, request, pk):
-        try:
-            shapefile = Shapefile.objects.get(pk=pk)
-            selected_feature_ids = []
-
-            # Try GET parameters first
-            ids_param = request.GET.get('ids', '')
-            if ids_param:
-                try:
-                    selected_feature_ids = json.loads(ids_param)
-                    if not isinstance(selected_feature_ids, list):
-                        selected_feature_ids = [selected_feature_ids]
-                except json.JSONDecodeError:
-                    # Handle comma-separated list format
-                    selected_feature_ids = [id.strip() for id in ids_param.split(',') if id.strip()]
-            else:
-                # Try POST body
-                try:
-                    data = json.loads(request.body)
-                    selected_feature_ids = data.get('selected_features', [])
-                except (json.JSONDecodeError, AttributeError):
-                    pass
-
-            print(f"Merge request for shapefile {pk}, features: {selected_feature_ids}")
-
-            if not selected_feature_ids:
-                return JsonResponse({
-                    'success': False,
-                    'message': 'No polygon IDs provided. Use ?ids=[1,2,3] or POST with selected_features'
-                }, status=400)
-
-            import ipdb; ipdb.set_trace()
-            success, message = shapefile.merge_selected_polygons(selected_feature_ids)
+    Subclasses name the Shapefile method in `edit` and set `parse` to a
+    function of the request returning the method's arguments; it raises
+    InvalidEditRequest, or any ValueError, for a bad request.
+    AsyncProcessedEditView runs the same edit through the method's async twin.
+    """
+    edit = None
+    parse = None
 
-            return JsonResponse({
-                'success': success,
-                'message': message,
-                'has_processed_data': shapefile.geojson_data_processed is not None
-            })
+    def post(self, request, pk):
+        try:
+            with span('orm'):
+                shapefile = Shapefile.objects.get(pk=pk)
+            args = self.parse(request)
+            logger.info('%s for shapefile %s: %s', self.edit, pk, args)
+            return edit_response(shapefile, *getattr(shapefile, self.edit)(*args))
+        except Exception as e:
+            return self.error_response(pk, e)
 
-        except Shapefile.DoesNotExist:
+    def error_response(self, pk, error):
+        if isinstance(error, Shapefile.DoesNotExist):
             return JsonResponse({'success': False, 'message': 'Shapefile not found'}, status=404)
+        if isinstance(error, InvalidEditRequest):
+            return JsonResponse({'success': False, 'message': str(error)}, status=400)
+        if isinstance(error, (json.JSONDecodeError, TypeError, ValueError)):
+            return JsonResponse({'success': False, 'message': f'Invalid request: {error}'}, status=400)
+        logger.exception('%s failed for shapefile %s', self.edit, pk)
+        return JsonResponse({'success': False, 'message': str(error)}, status=500)
+
+
+class AsyncProcessedEditView(ProcessedEditView):
+    async def post(self, request, pk):
+        try:
+            with span('orm'):
+                shapefile = await Shapefile.objects.aget(pk=pk)
+            args = self.parse(request)
+            logger.info('%s for shapefile %s: %s', self.edit, pk, args)
+            return edit_response(shapefile, *await getattr(shapefile, f'a{self.edit}')(*args))
         except Exception as e:
-            print(f"Merge error: {e}")
-            return JsonResponse({'success': False, 'message': str(e)}, status=500)
+            return self.error_response(pk, e)
+
+
+def parse_merge_request(request):
+    selected_feature_ids = parse_merge_ids(request)
+    if not selected_feature_ids:
+        raise InvalidEditRequest('No polygon IDs provided. Use ?ids=[1,2,3] or POST with selected_features')
+    return (selected_feature_ids,)
+
+class MergePolygonsView(ProcessedEditView):
+    edit = 'merge_selected_polygons'
+    parse = staticmethod(parse_merge_request)
+
+    def get(self, request, pk):
+        return self.post(request, pk)
 
 ##@method_decorator(csrf_exempt, name='dispatch')
 #class MergePolygonsView(View):
@@ -101,7 +161,7 @@ class MergePolygonsView(View):
 #            return JsonResponse({
 #                'success': success,
 #                'message': message,
-#                'has_processed_data': shapefile.geojson_data_processed is not None
+#                'has_processed_data': shapefile.has_processed_data
 #            })
 #
 #        except Shapefile.DoesNotExist:
@@ -120,6 +180,8 @@ class ShapefileUploadView(CreateView):
     def form_valid(self, form):
         try:
             response = super().form_valid(form)
+            for line in form.layer_summary():
+                messages.info(self.request, line)
             # Add zoom parameter to success URL
             redirect_url = f"{self.success_url}?zoom_to={self.object.id}"
             return redirect(redirect_url)
@@ -127,23 +189,177 @@ class ShapefileUploadView(CreateView):
             form.add_error(None, f'Error saving shapefile: {str(e)}')
             return self.form_invalid(form)
 
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ChunkedUploadView(View):
+    """Start a resumable upload: POST {"filename": ..., "size": ...}
+
+    The file is then sent with PUTs to the returned url, each carrying a
+    `Content-Range: bytes start-end/size` header. A GET on that url tells a
+    client that lost its connection where to resume. Once complete, the
+    upload form is posted with upload_id instead of the file.
+    """
+
+    def post(self, request):
+        try:
+            data = json.loads(request.body or '{}')
+            filename = data.get('filename', '')
+            size = int(data.get('size', 0))
+        except (json.JSONDecodeError, TypeError, ValueError):
+            return JsonResponse({'success': False, 'message': 'Expected JSON with filename and size'}, status=400)
+        if not filename.lower().endswith(UPLOAD_EXTENSIONS):
+            return JsonResponse({'success': False, 'message': f'Please upload one of: {", ".join(UPLOAD_EXTENSIONS)}'}, status=400)
+        if size <= 0:
+            return JsonResponse({'success': False, 'message': 'size must be a positive number of bytes'}, status=400)
+        if size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+            return JsonResponse({
+                'success': False,
+                'message': f'Uploads are limited to {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes',
+            }, status=413)
+
+        ChunkedUpload.delete_stale()
+        upload = ChunkedUpload.objects.create(filename=filename, total_size=size)
+        upload.create_file()
+        return JsonResponse({
+            'success': True,
+            'upload_id': str(upload.upload_id),
+            'url': reverse('chunked_upload_chunk', args=[upload.upload_id]),
+            'chunk_size': settings.UPLOAD_CHUNK_SIZE,
+            'received': 0,
+        }, status=201)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ChunkedUploadChunkView(View):
+    def get(self, request, upload_id):
+        try:
+            upload = ChunkedUpload.objects.get(upload_id=upload_id)
+        except ChunkedUpload.DoesNotExist:
+            return JsonResponse({'success': False, 'message': 'Upload not found'}, status=404)
+        return JsonResponse({
+            'success': True,
+            'received': upload.received,
+            'size': upload.total_size,
+            'complete': upload.is_complete,
+        })
+
+    def put(self, request, upload_id):
+        try:
+            upload = ChunkedUpload.objects.get(upload_id=upload_id)
+        except ChunkedUpload.DoesNotExist:
+            return JsonResponse({'success': False, 'message': 'Upload not found'}, status=404)
+
+        content_range = parse_content_range(request.headers.get('Content-Range'))
+        if content_range is None:
+            return JsonResponse({'success': False, 'message': 'Content-Range: bytes start-end/size is required'}, status=400)
+        start, end, size = content_range
+        if size != upload.total_size:
+            return JsonResponse({'success': False, 'message': f'Upload size is {upload.total_size} bytes'}, status=400)
+
+        try:
+            # Streamed from the request to the file; the chunk is never held in memory
+            with span('write_chunk'):
+                success, message = upload.write_chunk(request, start, end)
+        except Exception as e:
+            logger.exception('Chunked upload %s failed', upload_id)
+            return JsonResponse({'success': False, 'message': str(e)}, status=500)
+
+        # 409: the client should resume from `received`
+        return JsonResponse({
+            'success': success,
+            'message': message,
+            'received': upload.received,
+            'complete': upload.is_complete,
+        }, status=200 if success else 409)
+
+def parse_bbox(request):
+    """?bbox=minx,miny,maxx,maxy (EPSG:4326) as four floats, or None"""
+    bbox = request.GET.get('bbox')
+    if not bbox:
+        return None
+    values = [float(value) for value in bbox.split(',')]
+    if len(values) != 4:
+        raise ValueError('bbox must be minx,miny,maxx,maxy')
+    return values
+
+def geojson_response(shapefile, layer='original', bbox=None):
+    """GeoJSON response for a layer, or for the features intersecting `bbox`.
+
+    Layers kept in files are sent as read, without a dict in between; bbox
+    queries run on the layer's FeatureStore and keep positions as feature ids.
+    """
+    if bbox is not None:
+        features = shapefile.layer_features(layer)
+        if features is None:
+            return JsonResponse({'error': 'No processed data available'}, status=404)
+        with span('serialize'):
+            response = HttpResponse(features.to_geojson_text(features.query_bbox(*bbox)), content_type='application/json')
+        if layer == 'processed':
+            response['X-Layer-Version'] = shapefile.processed_version
+        return response
+
+    text = shapefile.layer_geojson_text(layer)
+    if text is not None:
+        response = HttpResponse(text, content_type='application/json')
+    elif layer == 'processed':
+        processed_data = shapefile.get_processed_geojson_feature_collection()
+        if not processed_data:
+            return JsonResponse({'error': 'No processed data available'}, status=404)
+        with span('serialize'):
+            response = JsonResponse(processed_data)
+    else:
+        with span('serialize'):
+            response = JsonResponse(shapefile.get_geojson_feature_collection())
+    if layer == 'processed':
+        response['X-Layer-Version'] = shapefile.processed_version
+    return response
+
 class ShapefileGeoJSONView(DetailView):
+    """Uploaded layer as GeoJSON; ?bbox=minx,miny,maxx,maxy limits it to the features in a box"""
     model = Shapefile
 
     def get(self, request, *args, **kwargs):
-        self.object = self.get_object()
-        return JsonResponse(self.object.get_geojson_feature_collection())
+        try:
+            bbox = parse_bbox(request)
+        except ValueError:
+            return JsonResponse({'error': 'bbox must be minx,miny,maxx,maxy'}, status=400)
+        with span('orm'):
+            self.object = self.get_object()
+        return geojson_response(self.object, bbox=bbox)
+
+def processed_topojson_response(shapefile):
+    """TopoJSON response for the processed layer, cached under its content version.
+
+    Layers holding points or lines are answered with GeoJSON instead; clients
+    tell the two apart by the document's type.
+    """
+    cache_key = f'shapefile-topojson:{shapefile.pk}:{shapefile.content_version("processed")}'
+    content = cache.get(cache_key)
+    if content is None:
+        topojson = shapefile.get_processed_topojson()
+        if topojson is None:
+            # No layer (404), or one with points or lines: those go as GeoJSON
+            return geojson_response(shapefile, 'processed')
+        with span('serialize'):
+            content = json.dumps(topojson, separators=(',', ':'))
+        cache.set(cache_key, content, timeout=None)
+    response = HttpResponse(content, content_type='application/json')
+    response['X-Layer-Version'] = shapefile.processed_version
+    return response
 
 class ShapefileProcessedGeoJSONView(DetailView):
+    """Processed layer as GeoJSON (optionally only inside ?bbox=), or as TopoJSON with ?format=topojson"""
     model = Shapefile
 
     def get(self, request, *args, **kwargs):
-        self.object = self.get_object()
-        processed_data = self.object.get_processed_geojson_feature_collection()
-        if processed_data:
-            return JsonResponse(processed_data)
-        else:
-            return JsonResponse({'error': 'No processed data available'}, status=404)
+        try:
+            bbox = parse_bbox(request)
+        except ValueError:
+            return JsonResponse({'error': 'bbox must be minx,miny,maxx,maxy'}, status=400)
+        with span('orm'):
+            self.object = self.get_object()
+        if request.GET.get('format') == 'topojson':
+            return processed_topojson_response(self.object)
+        return geojson_response(self.object, 'processed', bbox)
 
 class DebugShapefileView(DetailView):
     model = Shapefile
@@ -186,27 +402,309 @@ class DebugShapefileView(DetailView):
         })
         return context
 
+def parse_cut_request(request):
+    """(feature_id, cut_line) from a JSON body"""
+    data = json.loads(request.body)
+    if data.get('feature_id') is None:
+        raise InvalidEditRequest('feature_id is required')
+    return int(data['feature_id']), data.get('cut_line', [])
+
+class CutPolygonView(ProcessedEditView):
+    edit = 'cut_polygon'
+    parse = staticmethod(parse_cut_request)
+
 @method_decorator(csrf_exempt, name='dispatch')
-class CutPolygonView(View):
+class CutPolygonPreviewView(View):
+    """Dry run of a cut: the would-be pieces and their areas, without saving.
+
+    Served from the per-process cache of the processed layer and its spatial
+    index, so the map can call it (debounced) while the cut line is drawn.
+    """
+
     def post(self, request, pk):
         try:
-            shapefile = Shapefile.objects.get(pk=pk)
             data = json.loads(request.body)
             feature_id = data.get('feature_id')
             cut_line = data.get('cut_line', [])
-
-            print(f"Cut request for shapefile {pk}, feature {feature_id}")
-
-            success, message = shapefile.cut_polygon(feature_id, cut_line)
-
+            if feature_id is None:
+                return JsonResponse({'success': False, 'message': 'feature_id is required'}, status=400)
+            success, message, version, pieces = Shapefile.preview_cut(pk, feature_id, cut_line)
             return JsonResponse({
                 'success': success,
                 'message': message,
-                'has_processed_data': shapefile.geojson_data_processed is not None
+                'version': version,
+                'pieces': pieces.features() if pieces is not None else [],
             })
 
         except Shapefile.DoesNotExist:
             return JsonResponse({'success': False, 'message': 'Shapefile not found'}, status=404)
+        except (json.JSONDecodeError, TypeError, ValueError) as e:
+            return JsonResponse({'success': False, 'message': f'Invalid request: {e}'}, status=400)
+        except Exception as e:
+            logger.exception('Cut preview failed for shapefile %s', pk)
+            return JsonResponse({'success': False, 'message': str(e)}, status=500)
+
+
+def parse_subdivide_request(request):
+    """(selected_features, mode, value) from a JSON body; value is cell_size for 'grid', parts for 'strips'"""
+    data = json.loads(request.body)
+    mode = data.get('mode', 'grid')
+    value = data.get('parts') if mode == 'strips' else data.get('cell_size')
+    selected_feature_ids = data.get('selected_features', [])
+    if not selected_feature_ids or value is None:
+        raise InvalidEditRequest('POST selected_features and mode "grid" with cell_size or mode "strips" with parts')
+    return selected_feature_ids, mode, value
+
+class SubdividePolygonsView(ProcessedEditView):
+    """Split selected polygons into a grid of cell_size metres or into N equal-area strips"""
+    edit = 'subdivide_polygons'
+    parse = staticmethod(parse_subdivide_request)
+
+def parse_sliver_thresholds(data):
+    """(min_area, min_thinness) from query parameters or a JSON body; None falls back to settings"""
+    return data.get('min_area'), data.get('min_thinness')
+
+def parse_sliver_request(request):
+    return parse_sliver_thresholds(json.loads(request.body or '{}'))
+
+class MergeSliversView(ProcessedEditView):
+    """GET lists the slivers of the processed layer; POST merges them all into their neighbours"""
+    edit = 'merge_slivers'
+    parse = staticmethod(parse_sliver_request)
+
+    def get(self, request, pk):
+        try:
+            with span('orm'):
+                shapefile = Shapefile.objects.get(pk=pk)
+            slivers = shapefile.sliver_ids(*parse_sliver_thresholds(request.GET))
+            return JsonResponse({'success': True, 'slivers': slivers, 'version': shapefile.processed_version})
+        except Exception as e:
+            return self.error_response(pk, e)
+
+def parse_dissolve_request(request):
+    """(by, aggregations) from a JSON body; `by` may be a list or a comma-separated string"""
+    data = json.loads(request.body)
+    by = data.get('by', [])
+    if isinstance(by, str):
+        by = [column.strip() for column in by.split(',') if column.strip()]
+    aggregations = data.get('aggregations') or {}
+    if not by or not isinstance(aggregations, dict):
+        raise InvalidEditRequest('POST by (column or list of columns) and optionally aggregations ({"column": "sum"})')
+    return by, aggregations
+
+class DissolveView(ProcessedEditView):
+    """Union the processed features sharing the values of some columns; aggregations: first, sum or list"""
+    edit = 'dissolve'
+    parse = staticmethod(parse_dissolve_request)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class OverlayHistoricalView(View):
+    """Overlay the uploaded layer with a historical layer into the processed layer"""
+
+    def post(self, request, pk):
+        try:
+            with span('orm'):
+                shapefile = Shapefile.objects.get(pk=pk)
+                data = json.loads(request.body or '{}')
+                historical_layer = HistoricalLayer.objects.get(pk=data.get('historical_layer_id'))
+
+            success, message = shapefile.overlay_historical(historical_layer, min_area=float(data.get('min_area', 1.0)))
+            return edit_response(shapefile, success, message)
+
+        except Shapefile.DoesNotExist:
+            return JsonResponse({'success': False, 'message': 'Shapefile not found'}, status=404)
+        except HistoricalLayer.DoesNotExist:
+            return JsonResponse({'success': False, 'message': 'Historical layer not found'}, status=404)
         except Exception as e:
-            print(f"Cut error: {e}")
+            logger.exception('Overlay failed for shapefile %s', pk)
             return JsonResponse({'success': False, 'message': str(e)}, status=500)
+
+
+# Async variants for ASGI deployments (uvicorn ol_project.asgi:application).
+# ORM access uses the async API and geometry work runs in a thread (which in
+# turn uses the geometry process pool), so a single worker keeps serving reads
+# while merges and cuts are computed.
+
+class AsyncShapefileGeoJSONView(View):
+    async def get(self, request, pk):
+        try:
+            bbox = parse_bbox(request)
+        except ValueError:
+            return JsonResponse({'error': 'bbox must be minx,miny,maxx,maxy'}, status=400)
+        try:
+            with span('orm'):
+                shapefile = await Shapefile.objects.aget(pk=pk)
+        except Shapefile.DoesNotExist:
+            return JsonResponse({'error': 'Shapefile not found'}, status=404)
+        # Reading and encoding a large layer is CPU work too; keep it off the event loop
+        return await sync_to_async(geojson_response, thread_sensitive=False)(shapefile, bbox=bbox)
+
+class AsyncShapefileProcessedGeoJSONView(View):
+    async def get(self, request, pk):
+        try:
+            bbox = parse_bbox(request)
+        except ValueError:
+            return JsonResponse({'error': 'bbox must be minx,miny,maxx,maxy'}, status=400)
+        try:
+            with span('orm'):
+                shapefile = await Shapefile.objects.aget(pk=pk)
+        except Shapefile.DoesNotExist:
+            return JsonResponse({'error': 'Shapefile not found'}, status=404)
+        if request.GET.get('format') == 'topojson':
+            return await sync_to_async(processed_topojson_response, thread_sensitive=False)(shapefile)
+        return await sync_to_async(geojson_response, thread_sensitive=False)(shapefile, 'processed', bbox)
+
+class AsyncMergePolygonsView(AsyncProcessedEditView):
+    edit = 'merge_selected_polygons'
+    parse = staticmethod(parse_merge_request)
+
+    async def get(self, request, pk):
+        return await self.post(request, pk)
+
+class AsyncCutPolygonView(AsyncProcessedEditView):
+    edit = 'cut_polygon'
+    parse = staticmethod(parse_cut_request)
+
+class AsyncSubdividePolygonsView(AsyncProcessedEditView):
+    edit = 'subdivide_polygons'
+    parse = staticmethod(parse_subdivide_request)
+
+class AsyncMergeSliversView(AsyncProcessedEditView):
+    edit = 'merge_slivers'
+    parse = staticmethod(parse_sliver_request)
+
+class AsyncDissolveView(AsyncProcessedEditView):
+    edit = 'dissolve'
+    parse = staticmethod(parse_dissolve_request)
+
+class ShapefileEventsView(View):
+    """Server-Sent Events stream of edit deltas for one shapefile (see events.py)"""
+    heartbeat = 15
+
+    async def get(self, request, pk):
+        if not isinstance(request, ASGIRequest):
+            # A WSGI worker would be held for the lifetime of the stream.
+            # 204 tells EventSource not to reconnect; clients fall back to reloading.
+            return HttpResponse(status=204)
+        if not await Shapefile.objects.filter(pk=pk).aexists():
+            return JsonResponse({'error': 'Shapefile not found'}, status=404)
+
+        async def stream():
+            subscription = events.subscribe(pk)
+            try:
+                yield 'retry: 3000\n\n'
+                while True:
+                    event = await subscription.get(timeout=self.heartbeat)
+                    if event is None:
+                        # Comment line keeps proxies from closing an idle connection
+                        yield ': ping\n\n'
+                        continue
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            finally:
+                subscription.close()
+
+        response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+class MetricsView(View):
+    """Per-endpoint latency histograms of this process (local requests only)"""
+
+    def get(self, request):
+        if request.META.get('REMOTE_ADDR') not in ('127.0.0.1', '::1'):
+            return JsonResponse({'error': 'Metrics are only available locally'}, status=403)
+        return JsonResponse({'endpoints': instrumentation.latency_snapshot()})
+
+class ShapefilePreviewView(View):
+    """Rendered thumbnail of a layer: preview.png?layer=processed&w=400&h=300
+
+    Images are cached under the layer's content version, so a cache hit only
+    costs a metadata query and edits invalidate old thumbnails automatically.
+    """
+    default_size = 400
+    max_size = 2000
+
+    def get(self, request, pk, fmt='png'):
+        layer = request.GET.get('layer', 'original')
+        if layer not in ('original', 'processed'):
+            return JsonResponse({'error': "layer must be 'original' or 'processed'"}, status=400)
+        try:
+            width = min(max(int(request.GET.get('w', self.default_size)), 16), self.max_size)
+            height = min(max(int(request.GET.get('h', self.default_size)), 16), self.max_size)
+        except ValueError:
+            return JsonResponse({'error': 'w and h must be integers'}, status=400)
+
+        try:
+            with span('orm'):
+                meta = Shapefile.objects.only('id', 'uploaded_at', 'processed_version').get(pk=pk)
+        except Shapefile.DoesNotExist:
+            return JsonResponse({'error': 'Shapefile not found'}, status=404)
+
+        cache_key = f'shapefile-preview:{pk}:{layer}:{meta.content_version(layer)}:{width}x{height}.{fmt}'
+        etag = f'"{cache_key}"'
+        if request.headers.get('If-None-Match') == etag:
+            return HttpResponse(status=304)
+
+        image = cache.get(cache_key)
+        if image is None:
+            with span('orm'):
+                shapefile = Shapefile.objects.get(pk=pk)
+            if layer == 'processed' and not shapefile.has_processed_data:
+                return JsonResponse({'error': 'No processed data available'}, status=404)
+            image = shapefile.render_preview(layer, width, height, fmt)
+            cache.set(cache_key, image, timeout=None)
+
+        response = HttpResponse(image, content_type=CONTENT_TYPES[fmt])
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=60'
+        return response
+
+class ShapefileExportView(View):
+    """Processed layer as a file: export/?format=gpkg|shp|parquet|fgb
+
+    The first request for a layer version starts writing the file in the
+    background and answers 202 (ask again after Retry-After). Once written
+    the file is streamed from disk, so repeat downloads of that version cost
+    a metadata query. HEAD reports the same status without sending the file.
+    """
+
+    def get(self, request, pk):
+        return self._respond(request, pk, send_file=True)
+
+    def head(self, request, pk):
+        return self._respond(request, pk, send_file=False)
+
+    def _respond(self, request, pk, send_file):
+        fmt = request.GET.get('format', 'gpkg')
+        if fmt not in EXPORT_FORMATS:
+            return JsonResponse({'error': f'format must be one of {", ".join(EXPORT_FORMATS)}'}, status=400)
+        try:
+            with span('orm'):
+                meta = Shapefile.objects.only('id', 'name', 'uploaded_at', 'processed_version').get(pk=pk)
+        except Shapefile.DoesNotExist:
+            return JsonResponse({'error': 'Shapefile not found'}, status=404)
+
+        path = export.export_path(pk, meta.content_version('processed'), fmt)
+        if not os.path.exists(path):
+            has_processed = Q(geojson_data_processed__isnull=False) | ~Q(processed_store='')
+            if not Shapefile.objects.filter(has_processed, pk=pk).exists():
+                return JsonResponse({'error': 'No processed data available'}, status=404)
+            state = export.start(pk, meta.processed_version, fmt)
+            if state == 'pending':
+                response = JsonResponse({'status': 'pending', 'version': meta.processed_version}, status=202)
+                response['Retry-After'] = 1
+                return response
+            if state != 'ready':
+                return JsonResponse({'error': f'Export failed: {state}'}, status=500)
+
+        extension, content_type = EXPORT_FORMATS[fmt]
+        filename = f'{slugify(meta.name) or "layer"}-processed.{extension}'
+        if send_file:
+            # Streamed in blocks by the server; the file is never read whole
+            response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename, content_type=content_type)
+        else:
+            response = HttpResponse(content_type=content_type)
+            response['Content-Length'] = os.path.getsize(path)
+        response['X-Layer-Version'] = meta.processed_version
+        return response